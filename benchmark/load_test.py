@@ -0,0 +1,279 @@
+"""
+HTTP/WebSocket 부하 테스트: 실행 중인 서버에 실제와 비슷한 요청 혼합을 보내고
+엔드포인트별 지연 분포, 에러율, WebSocket 브로드캐스트 지연을 측정.
+
+    python -m benchmark.load_test --base-url http://localhost:8000 --duration 60 --rate 200 \\
+        --property-ids 1,2,3 --users 1-200 --subscribers 2000
+
+- 주문/취소/보유 토큰 조회는 인증이 필요하므로 서버와 같은 .env(SECRET_KEY/ALGORITHM)로 --users 범위의
+  JWT를 직접 만들어 쿠키로 전송. 해당 사용자들은 DB에 존재하고 잔고/토큰이 충분해야 함
+- 요청은 --rate(초당 요청 수)로 열린 루프(open loop) 방식으로 보냄 → 서버가 느려져도 부하가 줄지 않음
+- 브로드캐스트 지연: delta 메시지의 ts(Redis 발행 시각)부터 구독자가 받을 때까지 (같은 시계를 쓰는 장비에서 실행)
+- 구독자가 많으면 열린 파일 수 제한을 올릴 것 (ulimit -n)
+"""
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import random
+import time
+import httpx
+import websockets
+from core.jwt import create_access_token
+
+DEFAULT_MIX = "buy=30,sell=30,cancel=10,buildings=15,ownerships=15"
+# 지연 분포 출력 구간 (ms)
+HISTOGRAM_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class LatencyStats:
+    """지연 시간(ms) 표본과 상태 코드별 건수."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.statuses = defaultdict(int)
+        self.errors = 0
+
+    def record(self, latency_ms: float, status, ok: bool):
+        self.samples.append(latency_ms)
+        self.statuses[status] += 1
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    def histogram(self) -> Dict[str, int]:
+        buckets = {f"<={bound}ms": 0 for bound in HISTOGRAM_BOUNDS}
+        buckets[f">{HISTOGRAM_BOUNDS[-1]}ms"] = 0
+        for sample in self.samples:
+            for bound in HISTOGRAM_BOUNDS:
+                if sample <= bound:
+                    buckets[f"<={bound}ms"] += 1
+                    break
+            else:
+                buckets[f">{HISTOGRAM_BOUNDS[-1]}ms"] += 1
+        return buckets
+
+    def summary(self, duration: float) -> dict:
+        count = len(self.samples)
+        return {
+            "count": count,
+            "rate": round(count / duration, 1) if duration else 0,
+            "error_rate": round(self.errors / count, 4) if count else 0,
+            "p50_ms": round(self.percentile(0.5), 2),
+            "p90_ms": round(self.percentile(0.9), 2),
+            "p99_ms": round(self.percentile(0.99), 2),
+            "max_ms": round(max(self.samples), 2) if self.samples else 0,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+            "histogram": self.histogram(),
+        }
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        weights[name.strip()] = int(weight)
+    unknown = set(weights) - {"buy", "sell", "cancel", "buildings", "ownerships"}
+    if unknown:
+        raise ValueError(f"unknown request types: {sorted(unknown)}")
+    return weights
+
+
+def parse_range(value: str) -> List[int]:
+    if "-" in value:
+        start, end = value.split("-")
+        return list(range(int(start), int(end) + 1))
+    return [int(part) for part in value.split(",")]
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.mix = parse_mix(args.mix)
+        self.property_ids = parse_range(args.property_ids)
+        self.user_ids = parse_range(args.users)
+        self.cookies = {user_id: f"access_token={create_access_token(user_id)}" for user_id in self.user_ids}
+        self.http = defaultdict(LatencyStats)  # 요청 종류 -> 통계
+        self.open_orders = defaultdict(deque)  # user_id -> 취소 가능한 주문 ID
+        self.broadcast = LatencyStats()
+        self.ws = {"connected": 0, "failed": 0, "disconnected": 0, "snapshots": 0, "deltas": 0, "gaps": 0}
+        self.in_flight = None
+        self.stopping = None
+
+    # ---------------- HTTP ----------------
+    def _order_body(self) -> dict:
+        price = self.args.price + self.rng.randint(-self.args.spread, self.args.spread)
+        return {"quantity": self.rng.randint(1, self.args.max_quantity), "price_per_token": max(1, price)}
+
+    def _pick_request(self):
+        kind = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        user_id = self.rng.choice(self.user_ids)
+        if kind == "cancel" and not self.open_orders[user_id]:
+            kind = "buy"  # 취소할 주문이 없으면 주문으로 대체
+        return kind, user_id
+
+    async def _send(self, client: httpx.AsyncClient, kind: str, user_id: int):
+        headers = {"Cookie": self.cookies[user_id]}
+        property_id = self.rng.choice(self.property_ids)
+        if kind in ("buy", "sell"):
+            request = client.post(f"/api/orders/{property_id}/{kind}", json=self._order_body(), headers=headers)
+        elif kind == "cancel":
+            order_id = self.open_orders[user_id].popleft()
+            request = client.delete(f"/api/orders/{order_id}", headers=headers)
+        elif kind == "buildings":
+            request = client.get("/api/buildings")
+        else:
+            request = client.get("/api/ownerships/", headers=headers)
+
+        started = time.perf_counter()
+        try:
+            response = await request
+            status, ok = response.status_code, response.status_code < 500
+        except httpx.HTTPError as e:
+            self.http[kind].record((time.perf_counter() - started) * 1000, type(e).__name__, False)
+            return
+        self.http[kind].record((time.perf_counter() - started) * 1000, status, ok)
+        if kind in ("buy", "sell") and status == 200:
+            order_id = response.json().get("order_id")
+            if order_id is not None:
+                self.open_orders[user_id].append(order_id)
+
+    async def _request(self, client, kind, user_id):
+        try:
+            await self._send(client, kind, user_id)
+        finally:
+            self.in_flight.release()
+
+    async def run_http(self, duration: float):
+        limits = httpx.Limits(max_connections=self.args.max_in_flight, max_keepalive_connections=self.args.max_in_flight)
+        async with httpx.AsyncClient(base_url=self.args.base_url, limits=limits, timeout=self.args.timeout) as client:
+            tasks = set()
+            deadline = time.perf_counter() + duration
+            next_at = time.perf_counter()
+            while time.perf_counter() < deadline:
+                # 포아송 도착 간격
+                next_at += self.rng.expovariate(self.args.rate)
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.in_flight.acquire()
+                task = asyncio.create_task(self._request(client, *self._pick_request()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+
+    # ---------------- WebSocket ----------------
+    async def _subscriber(self, property_id: int, connect_delay: float):
+        await asyncio.sleep(connect_delay)
+        url = f"{self.args.ws_url}/api/ws/orders/{property_id}"
+        try:
+            async with websockets.connect(url, open_timeout=self.args.timeout, max_queue=None) as ws:
+                self.ws["connected"] += 1
+                last_seq = None
+                while not self.stopping.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    received_ms = time.time() * 1000
+                    message = json.loads(raw)
+                    if message.get("type") == "snapshot":
+                        self.ws["snapshots"] += 1
+                        last_seq = message["seq"]
+                    elif message.get("type") == "delta":
+                        self.ws["deltas"] += 1
+                        if "ts" in message:
+                            self.broadcast.record(received_ms - message["ts"], "delta", True)
+                        if last_seq is not None and message["seq"] > last_seq + 1:
+                            # 누락: 서버 프로토콜대로 스냅샷 재요청
+                            self.ws["gaps"] += 1
+                            await ws.send(json.dumps({"type": "resync"}))
+                        last_seq = max(last_seq or 0, message["seq"])
+        except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake):
+            self.ws["failed"] += 1
+        except websockets.ConnectionClosed:
+            self.ws["disconnected"] += 1
+
+    async def run(self) -> dict:
+        # 이벤트 루프 안에서 생성 (Python 3.9)
+        self.in_flight = asyncio.Semaphore(self.args.max_in_flight)
+        self.stopping = asyncio.Event()
+        subscribers = [
+            asyncio.create_task(self._subscriber(
+                self.property_ids[i % len(self.property_ids)],
+                self.args.ramp * i / max(1, self.args.subscribers),
+            ))
+            for i in range(self.args.subscribers)
+        ]
+        # 구독자 연결이 끝난 뒤 요청 시작
+        await asyncio.sleep(self.args.ramp)
+        started = time.perf_counter()
+        await self.run_http(self.args.duration)
+        elapsed = time.perf_counter() - started
+        # 마지막 변경분이 도착할 시간
+        await asyncio.sleep(self.args.drain)
+        self.stopping.set()
+        await asyncio.gather(*subscribers, return_exceptions=True)
+
+        return {
+            "duration": round(elapsed, 2),
+            "http": {kind: stats.summary(elapsed) for kind, stats in sorted(self.http.items())},
+            "websocket": dict(self.ws, subscribers=self.args.subscribers),
+            "broadcast_lag": self.broadcast.summary(elapsed),
+        }
+
+
+def print_report(report: dict):
+    print(f"duration {report['duration']}s")
+    header = f"{'request':<11} {'count':>7} {'req/s':>8} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  statuses"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["http"].items()) + [("ws lag", report["broadcast_lag"])]
+    for name, s in rows:
+        print(f"{name:<11} {s['count']:>7} {s['rate']:>8} {s['error_rate'] * 100:>6.2f} {s['p50_ms']:>8} "
+              f"{s['p90_ms']:>8} {s['p99_ms']:>8} {s['max_ms']:>8}  {s['statuses']}")
+    print()
+    for name, s in rows:
+        print(f"{name} histogram: " + ", ".join(f"{bucket}={n}" for bucket, n in s["histogram"].items() if n))
+    print(f"websocket: {report['websocket']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket 부하 테스트")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--ws-url", help="기본값: --base-url의 http(s)를 ws(s)로 바꾼 주소")
+    parser.add_argument("--duration", type=float, default=60, help="요청을 보내는 시간 (초)")
+    parser.add_argument("--rate", type=float, default=100, help="초당 HTTP 요청 수")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="요청 종류별 가중치")
+    parser.add_argument("--property-ids", default="1", help="대상 매물 (예: 1,2,3 또는 1-50)")
+    parser.add_argument("--users", default="1-100", help="요청에 사용할 user_id 범위")
+    parser.add_argument("--subscribers", type=int, default=1000, help="WebSocket 구독자 수 (매물별로 고르게 분배)")
+    parser.add_argument("--ramp", type=float, default=10, help="구독자 연결을 나눠 여는 시간 (초)")
+    parser.add_argument("--drain", type=float, default=3, help="요청 종료 후 브로드캐스트 수신 대기 (초)")
+    parser.add_argument("--price", type=int, default=10000, help="주문 기준 가격")
+    parser.add_argument("--spread", type=int, default=20, help="주문 가격 범위 (기준 가격 ±)")
+    parser.add_argument("--max-quantity", type=int, default=5)
+    parser.add_argument("--max-in-flight", type=int, default=500, help="동시에 진행 중인 최대 HTTP 요청 수")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="결과를 JSON으로 저장")
+    args = parser.parse_args(argv)
+    args.ws_url = args.ws_url or args.base_url.replace("http", "ws", 1)
+
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+매칭 엔진 벤치마크: 합성 주문 흐름을 매칭/정산 코드에 그대로 재생하고 처리량을 측정.
+
+    python -m benchmark.matching_benchmark                          # 전체 프로필, 메모리 호가창
+    python -m benchmark.matching_benchmark --profile deep --rounds 500
+    python -m benchmark.matching_benchmark --mode continuous        # 접속 매매
+    python -m benchmark.matching_benchmark --redis                  # .env의 Redis 사용 (Lua 스크립트 포함)
+    python -m benchmark.matching_benchmark --save baseline.json
+    python -m benchmark.matching_benchmark --compare baseline.json  # 성능 저하 시 종료 코드 1
+
+정산(settle_fills)은 MySQL 대신 SQL을 기록만 하는 커서로 실행하여 라운드당 SQL 실행 수를 측정.
+--redis는 실제 Redis에 벤치마크 전용 property_id(--property-id)로 호가창을 만들고 끝나면 삭제하므로
+운영 Redis가 아닌 로컬 Redis에서 실행할 것.
+"""
+from typing import Dict, List, Optional
+import argparse
+import json
+import time
+from benchmark.order_flow import PROFILES, generate_rounds
+from domain.order.order_book import BUY, SELL, OrderBook
+from domain.order.clearing_price import find_clearing_price
+from domain.order.settlement import compute_fills, compute_continuous_fills, settle_fills
+
+# --compare 허용 오차 (처리량 감소 / p99 증가 비율)
+DEFAULT_TOLERANCE = 0.2
+
+
+class RecordingCursor:
+    """
+    settle_fills용 MySQL 대역: SQL을 실행하지 않고 횟수만 기록.
+    주문자/수량 조회(1단계)만 재생 중인 주문 정보로 응답.
+    """
+
+    def __init__(self, order_users: Dict[int, int], order_quantities: Dict[int, int]):
+        self.order_users = order_users
+        self.order_quantities = order_quantities
+        self.statements = 0
+        self.rows = 0
+        self._result = []
+
+    def execute(self, query: str, params=None):
+        self.statements += 1
+        self.rows += 1
+        self._result = []
+        if " ".join(query.split()).startswith("SELECT id, user_id, quantity FROM Order_Archive"):
+            self._result = [(order_id, self.order_users[order_id], self.order_quantities[order_id])
+                            for order_id in params if order_id in self.order_users]
+        return len(self._result)
+
+    def executemany(self, query: str, args):
+        args = list(args)
+        self.statements += 1
+        self.rows += len(args)
+        return len(args)
+
+    def fetchall(self):
+        return self._result
+
+
+class MemoryBook:
+    """메모리 호가창 (매칭 계산 + 정산 SQL만 측정)."""
+
+    def __init__(self, property_id: int):
+        self.book = OrderBook(property_id)
+
+    def add(self, order_id: int, side: str, price: int, quantity: int):
+        self.book.add(order_id, side, price, quantity)
+
+    def load(self) -> OrderBook:
+        return self.book
+
+    def apply(self, removed, updated):
+        pass  # compute_*_fills가 이미 book에 반영
+
+    def close(self):
+        pass
+
+
+class RedisBook:
+    """Redis 호가창 (주문 추가 Lua 스크립트, 호가창 로드, 체결 반영까지 측정)."""
+
+    def __init__(self, property_id: int):
+        from domain.order import order_book
+        self.order_book = order_book
+        self.property_id = property_id
+        self.close()
+
+    def add(self, order_id: int, side: str, price: int, quantity: int):
+        self.order_book.add_order(self.property_id, order_id, side, price, quantity)
+
+    def load(self) -> OrderBook:
+        return self.order_book.load_order_book(self.property_id)
+
+    def apply(self, removed, updated):
+        self.order_book.apply_fills(self.property_id, removed, updated)
+
+    def close(self):
+        client = self.order_book.REDIS_CLIENT
+        keys = list(client.scan_iter(match=f"order_book:{self.property_id}:*"))
+        if keys:
+            client.delete(*keys)
+        client.srem(self.order_book.DIRTY_BOOKS_KEY, self.property_id)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _match(book: OrderBook, mode: str, reference_price: Optional[int]):
+    """(체결가, 체결 수량, fills, touched). 체결이 없으면 fills가 빈 목록."""
+    if mode == "continuous":
+        fills, touched = compute_continuous_fills(book)
+        if not fills:
+            return None, 0, fills, touched
+        return fills[-1].price, sum(fill.quantity for fill in fills), fills, touched
+
+    price, volume = find_clearing_price(
+        [(level.price, level.quantity) for level in book.levels(BUY)],
+        [(level.price, level.quantity) for level in book.levels(SELL)],
+        reference_price=reference_price,
+    )
+    if price is None:
+        return None, 0, [], []
+    fills, touched = compute_fills(book, price)
+    return price, volume, fills, touched
+
+
+def run_profile(profile: str, rounds: int, orders_per_round: int, users: int, mode: str,
+                use_redis: bool = False, property_id: int = 900000000, seed: int = 0) -> dict:
+    """
+    프로필 하나를 재생하고 측정 결과 반환.
+    단일가 매매는 라운드마다 신규 주문을 모두 넣은 뒤 1회 매칭,
+    접속 매매는 주문 1건마다 매칭 (라운드 시간 = 그 라운드 주문들의 처리 시간 합).
+    """
+    flow = generate_rounds(profile, rounds, orders_per_round, users=users, seed=seed)
+    store = RedisBook(property_id) if use_redis else MemoryBook(property_id)
+    order_users = {}
+    order_quantities = {}
+    reference_price = None
+    round_times, fill_counts = [], []
+    statements = rows = 0
+
+    def match_once():
+        nonlocal reference_price, statements, rows
+        book = store.load()
+        price, volume, fills, touched = _match(book, mode, reference_price)
+        if not fills:
+            return 0
+        cursor = RecordingCursor(order_users, order_quantities)
+        removed, updated = settle_fills(cursor, property_id, price, volume, fills, touched)
+        store.apply(removed, updated)
+        statements += cursor.statements
+        rows += cursor.rows
+        reference_price = price
+        for _, _, order_id in removed:
+            del order_users[order_id]
+            del order_quantities[order_id]
+        for _, _, order_id, remaining in updated:
+            order_quantities[order_id] = remaining
+        return len(fills)
+
+    started = time.perf_counter()
+    try:
+        for batch in flow:
+            round_started = time.perf_counter()
+            filled = 0
+            for order_id, user_id, side, price, quantity in batch:
+                order_users[order_id] = user_id
+                order_quantities[order_id] = quantity
+                store.add(order_id, side, price, quantity)
+                if mode == "continuous":
+                    filled += match_once()
+            if mode != "continuous":
+                filled += match_once()
+            round_times.append(time.perf_counter() - round_started)
+            fill_counts.append(filled)
+    finally:
+        store.close()
+    elapsed = time.perf_counter() - started
+
+    orders = rounds * orders_per_round
+    fills = sum(fill_counts)
+    return {
+        "profile": profile,
+        "mode": mode,
+        "backend": "redis" if use_redis else "memory",
+        "orders": orders,
+        "fills": fills,
+        "resting_orders": len(order_users),
+        "seconds": round(elapsed, 4),
+        "orders_per_sec": round(orders / elapsed, 1),
+        "fills_per_sec": round(fills / elapsed, 1),
+        "round_p50_ms": round(_percentile(round_times, 0.5) * 1000, 3),
+        "round_p99_ms": round(_percentile(round_times, 0.99) * 1000, 3),
+        "sql_statements": statements,
+        "sql_statements_per_round": round(statements / rounds, 2),
+        "sql_rows": rows,
+    }
+
+
+def find_regressions(results: List[dict], baseline: List[dict], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """기준 결과 대비 처리량 감소, p99 증가, SQL 실행 수 증가 목록."""
+    previous = {(entry["profile"], entry["mode"], entry["backend"]): entry for entry in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["profile"], result["mode"], result["backend"]))
+        if before is None:
+            continue
+        name = f"{result['profile']}/{result['mode']}/{result['backend']}"
+        if result["orders_per_sec"] < before["orders_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: orders/sec {before['orders_per_sec']} -> {result['orders_per_sec']}")
+        if result["round_p99_ms"] > before["round_p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['round_p99_ms']}ms -> {result['round_p99_ms']}ms")
+        if result["sql_statements_per_round"] > before["sql_statements_per_round"]:
+            regressions.append(
+                f"{name}: SQL/round {before['sql_statements_per_round']} -> {result['sql_statements_per_round']}")
+    return regressions
+
+
+def print_results(results: List[dict]):
+    header = f"{'profile':<8} {'mode':<10} {'backend':<7} {'orders/s':>10} {'fills/s':>10} " \
+             f"{'p50 ms':>8} {'p99 ms':>8} {'SQL/round':>9} {'resting':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['profile']:<8} {r['mode']:<10} {r['backend']:<7} {r['orders_per_sec']:>10} "
+              f"{r['fills_per_sec']:>10} {r['round_p50_ms']:>8} {r['round_p99_ms']:>8} "
+              f"{r['sql_statements_per_round']:>9} {r['resting_orders']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="매칭 엔진 벤치마크")
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append",
+                        help="주문 흐름 프로필 (여러 번 지정 가능, 생략 시 전체)")
+    parser.add_argument("--mode", choices=["call", "continuous"], default="call", help="단일가 / 접속 매매")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--orders-per-round", type=int, default=500)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis", action="store_true", help="메모리 대신 Redis 호가창 사용")
+    parser.add_argument("--property-id", type=int, default=900000000, help="--redis에서 사용할 벤치마크 전용 property_id")
+    parser.add_argument("--save", help="결과를 JSON으로 저장")
+    parser.add_argument("--compare", help="기준 결과(JSON)와 비교하여 성능 저하 시 종료 코드 1")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    results = [
+        run_profile(profile, args.rounds, args.orders_per_round, args.users, args.mode,
+                    use_redis=args.redis, property_id=args.property_id, seed=args.seed)
+        for profile in (args.profile or sorted(PROFILES))
+    ]
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
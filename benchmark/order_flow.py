@@ -0,0 +1,54 @@
+"""
+벤치마크용 합성 주문 흐름 생성.
+
+    uniform  기준가 주변에 고르게 분포, 사용자도 고르게 분포
+    skewed   기준가 근처에 몰린 가격(정규분포), 소수 사용자에게 주문 집중
+    deep     넓은 가격 범위 → 가격 레벨이 많고 대기 주문이 쌓이는 호가창
+    shallow  좁은 가격 범위 → 가격 레벨이 적고 대부분 체결되는 호가창
+"""
+import random
+from typing import Dict, List, Tuple
+
+# order_id, user_id, side, price, quantity
+SyntheticOrder = Tuple[int, int, str, int, int]
+
+PROFILES: Dict[str, dict] = {
+    "uniform": {"spread": 20, "distribution": "uniform", "user_skew": 0.0, "max_quantity": 10},
+    "skewed": {"spread": 20, "distribution": "normal", "user_skew": 1.2, "max_quantity": 10},
+    "deep": {"spread": 200, "distribution": "uniform", "user_skew": 0.0, "max_quantity": 20},
+    "shallow": {"spread": 3, "distribution": "uniform", "user_skew": 0.0, "max_quantity": 5},
+}
+
+
+def _user_weights(users: int, skew: float) -> List[float]:
+    # Zipf 분포 가중치 (skew=0이면 균등)
+    return [1 / (rank ** skew) for rank in range(1, users + 1)]
+
+
+def generate_rounds(profile: str, rounds: int, orders_per_round: int, users: int = 1000,
+                    mid_price: int = 10000, seed: int = 0) -> List[List[SyntheticOrder]]:
+    """라운드별 신규 주문 목록. 같은 seed면 항상 같은 흐름."""
+    params = PROFILES[profile]
+    rng = random.Random(seed)
+    user_ids = list(range(1, users + 1))
+    weights = _user_weights(users, params["user_skew"])
+    spread = params["spread"]
+
+    flow = []
+    order_id = 0
+    for _ in range(rounds):
+        # 기준가가 라운드마다 조금씩 움직임
+        mid_price = max(spread + 1, mid_price + rng.randint(-1, 1))
+        batch = []
+        for user_id in rng.choices(user_ids, weights=weights, k=orders_per_round):
+            order_id += 1
+            side = "buy" if rng.random() < 0.5 else "sell"
+            if params["distribution"] == "normal":
+                offset = int(rng.gauss(0, spread / 3))
+            else:
+                offset = rng.randint(-spread, spread)
+            # 매수/매도 가격이 기준가 주변에서 겹치므로 일부는 바로 교차해 체결되고 나머지는 대기
+            price = mid_price - offset if side == "buy" else mid_price + offset
+            batch.append((order_id, user_id, side, max(1, price), rng.randint(1, params["max_quantity"])))
+        flow.append(batch)
+    return flow
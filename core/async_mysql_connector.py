@@ -0,0 +1,115 @@
+from contextlib import asynccontextmanager
+from typing import Any, List, Optional, Sequence
+from core.mysql_connector import (
+    DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_MAX_LIFETIME, row_class, column_names,
+)
+import aiomysql
+import asyncio
+
+
+class AsyncRowCursor(aiomysql.Cursor):
+    """동기 RowCursor와 같은 Row 객체를 반환하는 aiomysql 커서."""
+    _row_class = None
+
+    async def _do_get_result(self):
+        await super()._do_get_result()
+        if self._description:
+            self._row_class = row_class(column_names(self._result.fields))
+            if self._rows:
+                self._rows = list(map(self._row_class._make, self._rows))
+
+    def _conv_row(self, row):
+        if row is None:
+            return None
+        return self._row_class._make(row)
+
+
+# 비동기 라우터용 aiomysql 커넥션 풀 (이벤트 루프를 막지 않음)
+ASYNC_DB_CONFIG = {
+    'host': DB_CONFIG['host'],
+    'user': DB_CONFIG['user'],
+    'password': DB_CONFIG['password'],
+    'db': DB_CONFIG['database'],
+    'charset': DB_CONFIG['charset'],
+    'cursorclass': AsyncRowCursor,
+}
+
+_pool = None
+_pool_lock = None
+
+
+async def get_async_pool() -> aiomysql.Pool:
+    """처음 호출 시 풀 생성 (이벤트 루프가 떠 있는 상태에서 만들어야 함)."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                minsize=DB_POOL_MIN_SIZE,
+                maxsize=DB_POOL_MAX_SIZE,
+                pool_recycle=int(DB_POOL_MAX_LIFETIME),
+                autocommit=False,
+                **ASYNC_DB_CONFIG,
+            )
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is None:
+        return
+    pool, _pool = _pool, None
+    pool.close()
+    await pool.wait_closed()
+
+
+# 비동기 데이터베이스 연결 대여 (async with 블록이 끝나면 풀에 반납)
+@asynccontextmanager
+async def get_async_db_connection():
+    pool = await get_async_pool()
+    async with pool.acquire() as connection:
+        try:
+            yield connection
+        finally:
+            # 커밋되지 않은 트랜잭션은 반납 전에 정리
+            if not connection.closed and connection.get_transaction_status():
+                try:
+                    await connection.rollback()
+                except Exception:
+                    connection.close()  # 끊긴 연결은 풀이 폐기
+
+
+# 단순 조회/변경용 헬퍼 (core.mysql_connector의 fetch_one/fetch_all/execute와 같은 동작)
+async def fetch_one(query: str, params: Optional[Sequence[Any]] = None):
+    async with get_async_db_connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchone()
+
+
+async def fetch_all(query: str, params: Optional[Sequence[Any]] = None) -> List:
+    async with get_async_db_connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def execute(query: str, params: Optional[Sequence[Any]] = None) -> int:
+    """변경 쿼리 1건 실행 후 커밋, 영향받은 행 수 반환."""
+    async with get_async_db_connection() as connection, connection.cursor() as cursor:
+        affected = await cursor.execute(query, params)
+        await connection.commit()
+        return affected
+
+
+def async_pool_metrics() -> dict:
+    if _pool is None:
+        return {"size": 0, "idle": 0, "in_use": 0, "min_size": DB_POOL_MIN_SIZE, "max_size": DB_POOL_MAX_SIZE}
+    return {
+        "size": _pool.size,
+        "idle": _pool.freesize,
+        "in_use": _pool.size - _pool.freesize,
+        "min_size": _pool.minsize,
+        "max_size": _pool.maxsize,
+    }
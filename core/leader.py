@@ -0,0 +1,147 @@
+from core.settings import REDIS_CLIENT, REDIS_ASYNC_CLIENT
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+import asyncio
+import os
+import socket
+
+# 백그라운드 작업(매칭, 청약 처리)은 여러 워커/노드 중 리더 1개에서만 실행
+# - 락 값(토큰)은 락을 얻을 때마다 새로 만들어, 이전 리더 임기에 시작된 작업이 새 임기로 통과하지 못하게 함
+# - 리더 상실/종료 시 작업을 취소하고 끝날 때까지 기다린 뒤, on_stop(스레드 풀 작업 대기 등)을 실행하고 락 반납
+# - 스레드에서 이미 진행 중인 정산은 취소되지 않으므로, 커밋 직전에 ensure_leader()로 토큰을 다시 확인 (펜싱)
+LEADER_KEY = "background_jobs:leader"
+LEADER_TTL = int(os.getenv("LEADER_LOCK_TTL", 15))  # 초
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+# 현재 리더 임기의 락 토큰 (리더가 아니면 None)
+_leader_token: Optional[str] = None
+
+
+class LeadershipLostError(Exception):
+    """리더 락을 잃은 뒤 리더 작업이 커밋하려 한 경우."""
+
+# 내가 리더일 때만 만료 시간 연장 / 삭제
+_RENEW_SCRIPT = REDIS_ASYNC_CLIENT.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+""")
+_RELEASE_SCRIPT = REDIS_ASYNC_CLIENT.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+
+
+async def _acquire() -> Optional[str]:
+    token = f"{INSTANCE_ID}:{uuid4().hex[:8]}"
+    if await REDIS_ASYNC_CLIENT.set(LEADER_KEY, token, nx=True, ex=LEADER_TTL):
+        return token
+    return None
+
+
+async def _renew(token: str) -> bool:
+    return bool(await _RENEW_SCRIPT(keys=[LEADER_KEY], args=[token, LEADER_TTL]))
+
+
+async def _release(token: str):
+    await _RELEASE_SCRIPT(keys=[LEADER_KEY], args=[token])
+
+
+def ensure_leader():
+    """
+    현재 임기의 리더 락을 아직 가지고 있는지 확인, 아니면 LeadershipLostError.
+    리더 작업이 DB 트랜잭션을 커밋하기 직전에 호출 (동기 함수, 워커 스레드에서 사용).
+    """
+    token = _leader_token
+    if token is None or REDIS_CLIENT.get(LEADER_KEY) != token:
+        raise LeadershipLostError(f"leader lock lost: {INSTANCE_ID}")
+
+
+def _report_stopped(task: asyncio.Task, job):
+    name = getattr(job, "__name__", repr(job))
+    if task.cancelled():
+        print(f"Leader job cancelled: {name}, restarting")
+    elif task.exception() is not None:
+        print(f"Leader job crashed: {name}: {task.exception()!r}, restarting")
+    else:
+        print(f"Leader job finished: {name}, restarting")
+
+
+async def _stop_jobs(running: Dict[asyncio.Task, Callable[[], Awaitable]],
+                     on_stop: List[Callable[[], None]]):
+    """작업을 취소하고 끝날 때까지 기다린 뒤 on_stop 실행 (스레드에서 진행 중인 작업 대기)."""
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    loop = asyncio.get_running_loop()
+    for stop in on_stop:
+        try:
+            await loop.run_in_executor(None, stop)
+        except Exception as e:
+            print(f"Leader job stop error: {e}")
+
+
+async def run_as_leader(jobs: List[Callable[[], Awaitable]], on_stop: List[Callable[[], None]] = ()):
+    """
+    Redis 리더 락을 얻은 동안에만 jobs를 실행.
+    락은 LEADER_TTL/3 주기로 연장하며, 연장에 실패하면(리더 상실) 작업을 중단하고 다시 후보로 대기.
+    리더인 동안 종료된(예외 포함) 작업은 기록 후 다음 연장 주기에 다시 시작 (작업이 멈춘 채 락만 유지되지 않도록).
+    작업을 중단할 때는 취소한 작업과 on_stop(블로킹 함수, 스레드에서 실행)이 끝난 뒤에 다시 후보가 되거나 락을 반납.
+    """
+    global _leader_token
+    interval = LEADER_TTL / 3
+    loop = asyncio.get_running_loop()
+    while True:
+        running: Dict[asyncio.Task, Callable[[], Awaitable]] = {}
+        token = None
+        try:
+            token = await _acquire()
+            if token is None:
+                await asyncio.sleep(interval)
+                continue
+
+            _leader_token = token
+            print(f"Leader lock acquired: {token}")
+            running = {asyncio.create_task(job()): job for job in jobs}
+            stopped = []
+            next_renew = loop.time() + interval
+            while True:
+                timeout = max(0.0, next_renew - loop.time())
+                if running:
+                    done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = set()
+                    await asyncio.sleep(timeout)
+                for task in done:
+                    job = running.pop(task)
+                    _report_stopped(task, job)
+                    stopped.append(job)
+                if loop.time() < next_renew:
+                    continue
+                if not await _renew(token):
+                    print(f"Leader lock lost: {token}")
+                    break
+                next_renew = loop.time() + interval
+                # 종료된 작업은 연장 주기마다 한 번만 재시작 (즉시 실패하는 작업이 루프를 점유하지 않도록)
+                for job in stopped:
+                    running[asyncio.create_task(job())] = job
+                stopped = []
+        except asyncio.CancelledError:
+            # 종료 시 진행 중인 작업이 끝난 뒤 락을 바로 반납하여 다른 워커가 이어받도록 함
+            await _stop_jobs(running, on_stop if token else [])
+            _leader_token = None
+            if token:
+                try:
+                    await _release(token)
+                except Exception as e:
+                    print(f"Leader lock release error: {e}")
+            raise
+        except Exception as e:
+            print(f"Leader election error: {e}")
+        # 리더 상실(또는 오류): 작업과 스레드 작업이 모두 끝난 뒤 다시 후보로 대기
+        _leader_token = None
+        await _stop_jobs(running, on_stop if token else [])
+        await asyncio.sleep(interval)
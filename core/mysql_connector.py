@@ -1,27 +1,292 @@
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.constants import SERVER_STATUS
+from pymysql.cursors import Cursor, SSCursor
 from contextlib import contextmanager
+from collections import deque, namedtuple
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
+import threading
+import time
 import os
 
 # .env 파일 로드
 load_dotenv()
 
-# 환경 변수에서 데이터베이스 설정 불러오기
+
+# 조회 결과 행: 컬럼 이름별 namedtuple (행마다 dict를 만들지 않음)
+# - row[0], row["name"], row.name, row.get("name"), 언패킹 모두 지원
+# - JSON으로 그대로 반환할 때는 row._asdict() 사용 (tuple은 배열로 직렬화됨)
+@lru_cache(maxsize=512)
+def row_class(columns: Tuple[str, ...]):
+    base = namedtuple("Row", columns, rename=True)
+    index = {name: i for i, name in enumerate(columns)}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        i = index.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def keys(self):
+        return columns
+
+    def _asdict(self):
+        return dict(zip(columns, self))
+
+    return type("Row", (base,), {
+        "__slots__": (),
+        "__getitem__": __getitem__,
+        "get": get,
+        "keys": keys,
+        "_asdict": _asdict,
+    })
+
+
+def column_names(fields) -> Tuple[str, ...]:
+    """DictCursor와 같은 규칙: 중복된 컬럼 이름은 "테이블.컬럼"으로 구분."""
+    names = []
+    for field in fields:
+        name = field.name
+        if name in names:
+            name = f"{field.table_name}.{name}"
+        names.append(name)
+    return tuple(names)
+
+
+class RowCursorMixin:
+    _row_class = None
+
+    def _do_get_result(self):
+        super()._do_get_result()
+        if self.description:
+            self._row_class = row_class(column_names(self._result.fields))
+            if self._rows:
+                self._rows = list(map(self._row_class._make, self._rows))
+
+    def _conv_row(self, row):
+        if row is None:
+            return None
+        return self._row_class._make(row)
+
+
+class RowCursor(RowCursorMixin, Cursor):
+    """기본 커서: Row 객체 반환."""
+
+
+class SSRowCursor(RowCursorMixin, SSCursor):
+    """서버 사이드(스트리밍) 커서: 큰 결과를 한 행씩 읽을 때 사용."""
+
+
+# 환경 변수에서 데이터베이스 설정 불러오기 (모든 모듈이 이 설정과 풀을 사용)
 DB_CONFIG = {
     'host': os.getenv("DB_HOST"),
     'user': os.getenv("DB_USER"),
     'password': os.getenv("DB_PASSWORD"),
     'database': os.getenv("DB_NAME"),
     'charset': os.getenv("DB_CHARSET"),
-    'cursorclass': DictCursor
+    'cursorclass': RowCursor
 }
 
-# 데이터베이스 연결 생성
+# 커넥션 풀 설정
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 3600))  # 초
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))  # 대여 대기 제한 (초)
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", 5))  # 이 시간 이상 쉬었던 연결만 ping (초)
+
+
+class PoolTimeout(pymysql.MySQLError):
+    """풀의 모든 연결이 사용 중이고 대기 시간이 초과됨."""
+
+
+class _PooledConnection:
+    __slots__ = ("connection", "created_at", "released_at")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.released_at = self.created_at
+
+
+class ConnectionPool:
+    """
+    스레드 안전한 pymysql 커넥션 풀.
+    - 대여 시 오래 쉬었던 연결은 ping으로 상태 확인, 끊긴 연결은 새로 생성
+    - max_lifetime이 지난 연결은 폐기 후 재생성
+    - 반납 시 열린 트랜잭션은 rollback (다음 사용자에게 이전 스냅샷이 남지 않도록)
+    """
+
+    def __init__(self, config: dict, min_size: int, max_size: int, max_lifetime: float,
+                 timeout: float, ping_interval: float):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {"created": 0, "closed": 0, "checkouts": 0, "waits": 0, "timeouts": 0, "ping_failures": 0}
+
+    def _create(self) -> _PooledConnection:
+        connection = pymysql.connect(**self.config)
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(connection)
+
+    def _close(self, pooled: _PooledConnection):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["closed"] += 1
+
+    def _discard(self, pooled: _PooledConnection):
+        """연결을 폐기하고 자리를 비움."""
+        self._close(pooled)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def warm(self):
+        """min_size만큼 연결을 미리 생성."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            pooled = None
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"DB 커넥션 풀 대기 시간 초과 (max_size={self.max_size})")
+                    self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+                if self._idle:
+                    pooled = self._idle.pop()  # 최근 반납된 연결 우선 (LIFO)
+                else:
+                    self._size += 1
+
+            if pooled is None:
+                try:
+                    pooled = self._create()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(pooled):
+                self._discard(pooled)
+                continue
+
+            with self._cond:
+                self._in_use[id(pooled.connection)] = pooled
+                self._stats["checkouts"] += 1
+            return pooled.connection
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            return False
+        if now - pooled.released_at < self.ping_interval:
+            return True
+        try:
+            pooled.connection.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["ping_failures"] += 1
+            return False
+
+    def release(self, connection):
+        with self._cond:
+            pooled = self._in_use.pop(id(connection), None)
+        if pooled is None:
+            connection.close()
+            return
+        try:
+            if not connection.open:
+                raise pymysql.err.InterfaceError("connection closed")
+            if connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                connection.rollback()
+        except Exception:
+            self._discard(pooled)
+            return
+        pooled.released_at = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    timeout=DB_POOL_TIMEOUT,
+    ping_interval=DB_POOL_PING_INTERVAL,
+)
+
+
+# 데이터베이스 연결 대여 (with 블록이 끝나면 풀에 반납)
 @contextmanager
 def get_db_connection():
-    connection = pymysql.connect(**DB_CONFIG)
+    connection = db_pool.acquire()
     try:
         yield connection
     finally:
-        connection.close()
\ No newline at end of file
+        db_pool.release(connection)
+
+
+# 단순 조회/변경용 헬퍼 (쿼리 파라미터는 항상 %s 바인딩)
+def fetch_one(query: str, params: Optional[Sequence[Any]] = None):
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+
+def fetch_all(query: str, params: Optional[Sequence[Any]] = None) -> List:
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+def execute(query: str, params: Optional[Sequence[Any]] = None) -> int:
+    """변경 쿼리 1건 실행 후 커밋, 영향받은 행 수 반환."""
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        affected = cursor.execute(query, params)
+        connection.commit()
+        return affected
@@ -1,33 +1,73 @@
-from core.settings import REDIS_CLIENT
+from core.settings import REDIS_CLIENT, REDIS_ASYNC_CLIENT
 from core.websockets import manager
 import asyncio
 import json
+import os
+
+# 호가창 변경 채널: order_book_updates:{property_id}
+# 채널 이름에 property_id가 있으므로 수신 측은 메시지를 디코딩하지 않고 그대로 전달
+ORDER_BOOK_CHANNEL = "order_book_updates"
+
+# 리스너와 브로드캐스터 사이 대기열 크기
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", 1000))
+
+# 재연결 대기 시간 (초)
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+
+
+def _enqueue(queue: asyncio.Queue, item):
+    """대기열이 가득 차면 가장 오래된 메시지를 버리고 추가 (클라이언트는 seq 누락으로 재동기화)."""
+    if queue.full():
+        queue.get_nowait()
+        print("Broadcast queue full, dropping oldest message")
+    queue.put_nowait(item)
+
+
+async def _broadcast_worker(queue: asyncio.Queue):
+    while True:
+        property_id, data = await queue.get()
+        try:
+            await manager.broadcast(data, property_id)
+        except Exception as e:
+            print(f"Broadcast error: {e}")
+
 
 # Redis Pub/Sub Listener
 async def redis_listener():
-    # Redis 채널 구독
-    pubsub = REDIS_CLIENT.pubsub()
-    pubsub.subscribe("order_book_updates")
-    print("Redis listener started, subscribed to 'order_book_updates'")
+    queue = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+    broadcaster = asyncio.create_task(_broadcast_worker(queue))
+    delay = RECONNECT_MIN_DELAY
     try:
         while True:
-            # Redis에서 메시지 수신
-            message = pubsub.get_message()
-            if message and message["type"] == "message":
-                data = json.loads(message["data"])
-                property_id = data.get("property_id")
-                if property_id:
-                    # WebSocket으로 브로드캐스트
-                    await manager.broadcast(json.dumps(data), property_id)
-            await asyncio.sleep(0.01)  # Redis 메시지 폴링 간격
-    except Exception as e:
-        print(f"Redis listener error: {e}")
-
-# Redis 데이터 업데이트 및 Pub/Sub 메시지 발행
-def update_order_book_in_redis(property_id: int, order_book: dict):
-    redis_key = f"order_book:{property_id}"
-    REDIS_CLIENT.hset(redis_key, "order_book", json.dumps(order_book))
-    update_message = {"property_id": property_id, "order_book": order_book}
-    REDIS_CLIENT.publish("order_book_updates", json.dumps(update_message))
+            pubsub = REDIS_ASYNC_CLIENT.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Redis 채널 구독 (재연결 시 다시 구독)
+                await pubsub.psubscribe(f"{ORDER_BOOK_CHANNEL}:*")
+                print(f"Redis listener started, subscribed to '{ORDER_BOOK_CHANNEL}:*'")
+                delay = RECONNECT_MIN_DELAY
+                # 메시지가 올 때까지 블로킹 대기 (폴링 없음)
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    property_id = int(message["channel"].rsplit(":", 1)[1])
+                    _enqueue(queue, (property_id, message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis listener error: {e}, reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+            finally:
+                await pubsub.aclose()
+    finally:
+        broadcaster.cancel()
+
+
+def order_book_channel(property_id: int) -> str:
+    return f"{ORDER_BOOK_CHANNEL}:{property_id}"
 
 
+# 호가창 변경 Pub/Sub 메시지 발행
+def publish_order_book_message(message: dict):
+    REDIS_CLIENT.publish(order_book_channel(message["property_id"]), json.dumps(message))
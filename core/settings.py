@@ -1,18 +1,12 @@
 import os
 from dotenv import load_dotenv
 import redis
+import redis.asyncio
 
 # .env 파일 로드
 load_dotenv()
 print(os.getenv("DB_HOST"))
-# MySQL 설정
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "database": os.getenv("DB_NAME"),
-    "charset": os.getenv("DB_CHARSET"),
-}
+# MySQL 설정은 core.mysql_connector에서 관리
 
 # Redis 설정
 REDIS_CLIENT = redis.Redis(
@@ -22,6 +16,14 @@ REDIS_CLIENT = redis.Redis(
     decode_responses=True,
 )
 
+# 비동기 Redis 클라이언트 (Pub/Sub 수신용)
+REDIS_ASYNC_CLIENT = redis.asyncio.Redis(
+    host=os.getenv("REDIS_HOST"),
+    port=int(os.getenv("REDIS_PORT")),
+    db=int(os.getenv("REDIS_DB")),
+    decode_responses=True,
+)
+
 # 기타 설정 (예: JWT)
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "defaultsecretkey")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -1,37 +1,98 @@
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from fastapi import WebSocket
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import os
+
+# 연결별 전송 대기열 크기 (초과 시 대기 중인 메시지를 버리고 최신 스냅샷으로 대체)
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 100))
+# 메시지 1건 전송 제한 시간 (초과 시 연결 종료)
+SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 10))
+
+# 전송 대기열에 넣는 "최신 스냅샷 전송" 표시
+_SNAPSHOT = object()
+
+
+class ClientConnection:
+    """WebSocket 연결 1개와 전용 전송 대기열/전송 태스크."""
+    __slots__ = ("websocket", "property_id", "queue", "task")
+
+    def __init__(self, websocket: WebSocket, property_id: int):
+        self.websocket = websocket
+        self.property_id = property_id
+        self.queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.task = None
+
+    def offer(self, message):
+        """전송 대기열에 추가 (블로킹 없음). 가득 차면 대기 메시지를 비우고 스냅샷으로 대체."""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_SNAPSHOT)
 
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.active_connections: Dict[int, Dict[WebSocket, ClientConnection]] = {}
+        # property_id -> 최신 스냅샷(JSON 문자열)을 만드는 함수 (도메인에서 등록)
+        self.snapshot_provider: Optional[Callable[[int], Awaitable[str]]] = None
 
     async def connect(self, websocket: WebSocket, property_id: int):
         """WebSocket 연결을 수립."""
         await websocket.accept()
-        if property_id not in self.active_connections:
-            self.active_connections[property_id] = []
-        self.active_connections[property_id].append(websocket)
+        client = ClientConnection(websocket, property_id)
+        client.task = asyncio.create_task(self._sender(client))
+        self.active_connections.setdefault(property_id, {})[websocket] = client
         print(f"WebSocket 연결 성공: property_id={property_id}")
 
     def disconnect(self, websocket: WebSocket, property_id: int):
         """WebSocket 연결을 종료."""
-        if property_id in self.active_connections:
-            self.active_connections[property_id].remove(websocket)
-            if not self.active_connections[property_id]:
-                del self.active_connections[property_id]
-            print(f"WebSocket 연결 종료: property_id={property_id}")
+        clients = self.active_connections.get(property_id)
+        if clients is None or websocket not in clients:
+            return
+        client = clients.pop(websocket)
+        if not clients:
+            del self.active_connections[property_id]
+        if client.task is not asyncio.current_task():
+            client.task.cancel()
+        print(f"WebSocket 연결 종료: property_id={property_id}")
+
+    def send_snapshot(self, websocket: WebSocket, property_id: int):
+        """해당 연결에 최신 스냅샷 전송을 요청 (전송 태스크가 순서대로 처리)."""
+        client = self.active_connections.get(property_id, {}).get(websocket)
+        if client is not None:
+            client.offer(_SNAPSHOT)
 
     async def broadcast(self, message: str, property_id: int):
-        """WebSocket 메시지를 연결된 클라이언트에 브로드캐스트."""
-        if property_id in self.active_connections:
-            print(f"Broadcasting message to {len(self.active_connections[property_id])} clients for property_id {property_id}")
-            for connection in self.active_connections[property_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    print(f"Error sending message to WebSocket client: {e}")
+        """WebSocket 메시지를 연결된 클라이언트에 브로드캐스트 (연결별 대기열에 추가만 하고 반환)."""
+        clients = self.active_connections.get(property_id)
+        if not clients:
+            return
+        for client in list(clients.values()):
+            client.offer(message)
+
+    async def _sender(self, client: ClientConnection):
+        """연결별 전송 루프: 느린 연결이 다른 연결의 전송을 막지 않음."""
+        try:
+            while True:
+                message = await client.queue.get()
+                if message is _SNAPSHOT:
+                    if self.snapshot_provider is None:
+                        continue
+                    message = await self.snapshot_provider(client.property_id)
+                await asyncio.wait_for(client.websocket.send_text(message), SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 전송 실패/지연된 연결은 제거
+            print(f"Error sending message to WebSocket client: {e}")
+            self.disconnect(client.websocket, client.property_id)
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
 
 
 # WebSocket 연결 관리 인스턴스 생성
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
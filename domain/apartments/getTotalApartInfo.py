@@ -1,7 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from core.mysql_connector import get_db_connection
-from pymysql.cursors import DictCursor
 import json
 
 router = APIRouter()
@@ -79,7 +78,7 @@ def fetch_latest_transactions(building_id: int, max_results=5):
     """
     try:
         with get_db_connection() as connection:
-            with connection.cursor(DictCursor) as cursor:
+            with connection.cursor() as cursor:
                 query = """
                     SELECT trade_year, trade_month, trade_day, trade_amount, trade_size, floor
                     FROM Property_Trade
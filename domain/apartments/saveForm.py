@@ -1,4 +1,4 @@
-from datetime import datetime,timedelta
+from datetime import datetime
 from pymysql import connect
 from core.mysql_connector import get_db_connection
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
@@ -8,6 +8,7 @@ import os, requests, json
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from core.jwt import extract_user_id
+from domain.subscription.deadlines import schedule_subscription_close
 
 router = APIRouter()
 IMAGE_DIR = "static/images/"
@@ -102,13 +103,6 @@ async def create_property(
     # owner_id를 인증된 사용자 ID로 설정
     owner_id = user_id
 
-    #period 현재시간 - 현재시간+3분 설정
-    current_time = datetime.now()
-    future_time = current_time+timedelta(minutes=3)
-
-    current_time_str = current_time.strftime("%Y.%m.%d")
-    future_time_str = future_time.strftime("%Y.%m.%d %H:%M:%S")
-    period = current_time_str +"-"+ future_time_str
     if not legalNotice:
         raise HTTPException(status_code=400, detail="이용 약관에 동의해야 합니다.")
 
@@ -212,15 +206,30 @@ async def create_property(
                     shutil.copyfileobj(legalDocs.file, file_object)
 
             # Property_Detail 테이블에 데이터 삽입
+            # period/청약 마감 시각: 현재시간 - 현재시간+3분 (청약 접수/마감 판단과 같은 DB 시계 기준)
             insert_detail_query = """
-                INSERT INTO Property_Detail (property_id, token_supply, token_cost, period, detail_floor, home_size, room_cnt, maintenance_cost, home_photos, legalDocs, legalNotice,owner_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                INSERT INTO Property_Detail (property_id, token_supply, token_cost, period, subscription_end_date, detail_floor, home_size, room_cnt, maintenance_cost, home_photos, legalDocs, legalNotice,owner_id)
+                VALUES (%s, %s, %s,
+                        CONCAT(DATE_FORMAT(NOW(), '%%Y.%%m.%%d'), '-', DATE_FORMAT(NOW() + INTERVAL 3 MINUTE, '%%Y.%%m.%%d %%H:%%i:%%s')),
+                        NOW() + INTERVAL 3 MINUTE, %s, %s, %s, %s, %s, %s, %s, %s)
             """
             cursor.execute(insert_detail_query, (
-                property_id,token_supply,token_cost,period, detail_floor, home_size, room_cnt, maintenance_cost, home_photos_json, legalDocs_path, int(legalNotice), owner_id
+                property_id,token_supply,token_cost, detail_floor, home_size, room_cnt, maintenance_cost, home_photos_json, legalDocs_path, int(legalNotice), owner_id
             ))
+            property_detail_id = cursor.lastrowid
+            # 저장된 마감 시각을 epoch 초로 다시 읽어 대기열 score로 사용
+            cursor.execute(
+                "SELECT UNIX_TIMESTAMP(subscription_end_date) AS close_at FROM Property_Detail WHERE id = %s",
+                (property_detail_id,),
+            )
+            close_at = cursor.fetchone()['close_at']
 
             conn.commit()
+            # 청약 마감 시각에 정산되도록 등록
+            try:
+                schedule_subscription_close(property_detail_id, close_at)
+            except Exception as e:
+                print(f"청약 마감 등록 실패: property_detail_id={property_detail_id}, {e}")
             return {"message": "데이터가 성공적으로 저장되었습니다.", "property_id": property_id}
 
         except Exception as e:
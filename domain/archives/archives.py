@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Request, Query
-from core.settings import DB_CONFIG
+from core.async_mysql_connector import get_async_db_connection
 from core.jwt import extract_user_id
 import pymysql
 
@@ -23,74 +23,69 @@ async def get_user_order_archives(
         raise HTTPException(status_code=401, detail=f"유효하지 않은 토큰: {e}")
 
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            # 주문 상태별로 필터링하여 주문 기록 조회
+            if status:
+                await cursor.execute(
+                    """
+                    SELECT 
+                        oa.id,
+                        oa.order_type, 
+                        oa.price_per_token, 
+                        oa.quantity, 
+                        oa.status, 
+                        oa.created_at,
+                        pd.detail_floor,
+                        b.name AS building_name
+                    FROM Order_Archive oa
+                    LEFT JOIN Property_Detail pd ON oa.property_detail_id = pd.id
+                    LEFT JOIN Properties b ON pd.property_id = b.id
+                    WHERE oa.user_id = %s AND oa.status = %s
+                    ORDER BY oa.created_at DESC
+                    """,
+                    (user_id, status)
+                )
+            else:
+                await cursor.execute(
+                    """
+                    SELECT 
+                        oa.id,
+                        oa.order_type, 
+                        oa.price_per_token, 
+                        oa.quantity, 
+                        oa.status, 
+                        oa.created_at,
+                        pd.detail_floor,
+                        b.name AS building_name
+                    FROM Order_Archive oa
+                    LEFT JOIN Property_Detail pd ON oa.property_detail_id = pd.id
+                    LEFT JOIN Properties b ON pd.property_id = b.id
+                    WHERE oa.user_id = %s
+                    ORDER BY oa.created_at DESC
+                    """,
+                    (user_id,)
+                )
 
-        # 주문 상태별로 필터링하여 주문 기록 조회
-        if status:
-            cursor.execute(
-                """
-                SELECT 
-                    oa.id,
-                    oa.order_type, 
-                    oa.price_per_token, 
-                    oa.quantity, 
-                    oa.status, 
-                    oa.created_at,
-                    pd.detail_floor,
-                    b.name AS building_name
-                FROM Order_Archive oa
-                LEFT JOIN Property_Detail pd ON oa.property_detail_id = pd.id
-                LEFT JOIN Properties b ON pd.property_id = b.id
-                WHERE oa.user_id = %s AND oa.status = %s
-                ORDER BY oa.created_at DESC
-                """,
-                (user_id, status)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT 
-                    oa.id,
-                    oa.order_type, 
-                    oa.price_per_token, 
-                    oa.quantity, 
-                    oa.status, 
-                    oa.created_at,
-                    pd.detail_floor,
-                    b.name AS building_name
-                FROM Order_Archive oa
-                LEFT JOIN Property_Detail pd ON oa.property_detail_id = pd.id
-                LEFT JOIN Properties b ON pd.property_id = b.id
-                WHERE oa.user_id = %s
-                ORDER BY oa.created_at DESC
-                """,
-                (user_id,)
-            )
+            results = await cursor.fetchall()
 
-        results = cursor.fetchall()
+            if not results:
+                raise HTTPException(status_code=404, detail="주문 기록을 찾을 수 없습니다.")
 
-        if not results:
-            raise HTTPException(status_code=404, detail="주문 기록을 찾을 수 없습니다.")
-
-        orders = [
-            {
-                "id": row[0],
-                "order_type": row[1],
-                "price_per_token": row[2],
-                "quantity": row[3],
-                "status": row[4],
-                "created_at": row[5],
-                "detail_floor": row[6],
-                "building_name": row[7],
-            }
-            for row in results
-        ]
+            orders = [
+                {
+                    "id": row[0],
+                    "order_type": row[1],
+                    "price_per_token": row[2],
+                    "quantity": row[3],
+                    "status": row[4],
+                    "created_at": row[5],
+                    "detail_floor": row[6],
+                    "building_name": row[7],
+                }
+                for row in results
+            ]
     except pymysql.MySQLError as e:
         raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
 
     return {
         "user_id": user_id,
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+def find_clearing_price(buy_levels, sell_levels, reference_price: int = None):
+    """
+    단일가(체결가) 계산.
+
+    가격 레벨마다 누적 매수 수량(해당 가격 이상 매수 합계)과 누적 매도 수량
+    (해당 가격 이하 매도 합계)을 누적합으로 한 번에 구하고, 체결 가능 수량
+    min(매수, 매도)이 최대가 되는 가격을 선택한다.
+
+    동일 체결 수량인 후보가 여러 개면 아래 순서로 결정:
+      1. 잔량 불균형 |누적 매수 - 누적 매도| 이 최소인 가격
+      2. 모든 후보에서 매수 잔량이 남으면 가장 높은 가격,
+         모든 후보에서 매도 잔량이 남으면 가장 낮은 가격
+      3. 기준가(reference_price, 직전 체결가)와 가장 가까운 가격
+      4. 가장 낮은 가격
+
+    Args:
+        buy_levels: [(가격, 수량)] 매수 가격 레벨
+        sell_levels: [(가격, 수량)] 매도 가격 레벨
+        reference_price: 기준가 (없으면 3번 규칙 생략)
+
+    Returns:
+        (체결가, 체결 수량). 체결 가능한 가격이 없으면 (None, 0).
+    """
+    if not buy_levels or not sell_levels:
+        return None, 0
+
+    buy = np.asarray(buy_levels, dtype=np.int64).reshape(-1, 2)
+    sell = np.asarray(sell_levels, dtype=np.int64).reshape(-1, 2)
+    buy = buy[np.argsort(buy[:, 0], kind="stable")]
+    sell = sell[np.argsort(sell[:, 0], kind="stable")]
+
+    # 매수 최고가 < 매도 최저가면 체결 불가
+    if buy[-1, 0] < sell[0, 0]:
+        return None, 0
+
+    # 후보 가격: 매도 최저가 ~ 매수 최고가 사이의 모든 레벨 가격
+    prices = np.union1d(buy[:, 0], sell[:, 0])
+    prices = prices[(prices >= sell[0, 0]) & (prices <= buy[-1, 0])]
+
+    buy_prefix = np.concatenate(([0], np.cumsum(buy[:, 1])))
+    sell_prefix = np.concatenate(([0], np.cumsum(sell[:, 1])))
+
+    demand = buy_prefix[-1] - buy_prefix[np.searchsorted(buy[:, 0], prices, side="left")]
+    supply = sell_prefix[np.searchsorted(sell[:, 0], prices, side="right")]
+    volume = np.minimum(demand, supply)
+
+    max_volume = volume.max()
+    if max_volume <= 0:
+        return None, 0
+
+    # 최대 체결 수량 후보
+    candidates = np.flatnonzero(volume == max_volume)
+
+    # 동점 규칙 1. 최소 불균형
+    surplus = demand[candidates] - supply[candidates]
+    imbalance = np.abs(surplus)
+    candidates = candidates[imbalance == imbalance.min()]
+    surplus = demand[candidates] - supply[candidates]
+
+    # 동점 규칙 2. 시장 압력 방향
+    if len(candidates) > 1:
+        if (surplus > 0).all():
+            candidates = candidates[-1:]
+        elif (surplus < 0).all():
+            candidates = candidates[:1]
+
+    # 동점 규칙 3. 기준가 근접
+    if len(candidates) > 1 and reference_price is not None:
+        distance = np.abs(prices[candidates] - reference_price)
+        candidates = candidates[distance == distance.min()]
+
+    # 동점 규칙 4. 최저가
+    index = candidates[0]
+    return int(prices[index]), int(volume[index])
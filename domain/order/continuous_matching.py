@@ -0,0 +1,106 @@
+import asyncio
+import os
+from datetime import datetime, time as dtime
+import pymysql
+from core.settings import REDIS_ASYNC_CLIENT
+from core.mysql_connector import fetch_all
+from domain.order.order_book import INCOMING_BOOKS_KEY, set_continuous_books, pop_incoming_books, mark_books_dirty
+from domain.order.order_matching_scheduler import run_matching, match_property, set_continuous_properties
+
+# 접속 매매 (Property_Detail.matching_mode = 'continuous')
+# - 접속 매매 시간(CONTINUOUS_SESSION) 동안 주문이 들어오면 리더가 즉시 대기 중인 주문과 체결 (가격-시간 우선)
+# - 장 시작 시 쌓인 주문은 단일가 매매로 한 번 체결한 뒤 접속 매매로 전환 (시가 단일가)
+# - 접속 매매 시간 외에는 다른 매물과 같이 주기적 단일가 매매로 체결 (장 마감 후/장 시작 전)
+CONTINUOUS_SESSION = os.getenv("CONTINUOUS_SESSION", "09:00-15:20")
+SESSION_REFRESH_INTERVAL = 30  # 초, 장 시작/마감 및 매매 방식 변경 확인 주기
+INCOMING_WAIT_TIMEOUT = 1  # 초
+
+
+def _parse_session(session: str):
+    start, end = (dtime.fromisoformat(part.strip()) for part in session.split("-"))
+    return start, end
+
+
+SESSION_START, SESSION_END = _parse_session(CONTINUOUS_SESSION)
+
+
+def in_continuous_session(now: datetime = None) -> bool:
+    current = (now or datetime.now()).time()
+    return SESSION_START <= current < SESSION_END
+
+
+def load_continuous_properties() -> set:
+    rows = fetch_all("SELECT id FROM Property_Detail WHERE matching_mode = 'continuous'")
+    return {row.id for row in rows}
+
+
+def _match_all(property_ids):
+    return asyncio.gather(
+        *(run_matching(match_property, pid) for pid in property_ids),
+        return_exceptions=True,
+    )
+
+
+async def refresh_session(current: set) -> set:
+    """
+    접속 매매 대상 매물 갱신, 새 목록 반환.
+    새로 접속 매매를 시작하는 매물은 전환 전에 단일가 매매로 쌓인 주문을 먼저 체결.
+    """
+    property_ids = set()
+    if in_continuous_session():
+        property_ids = await run_matching(load_continuous_properties)
+
+    opened = sorted(property_ids - current)
+    if opened:
+        print(f"[{datetime.now()}] 접속 매매 시작 전 단일가 매매: {opened}")
+        await _match_all(opened)
+    closed = sorted(current - property_ids)
+    if closed:
+        print(f"[{datetime.now()}] 접속 매매 종료 (단일가 매매로 전환): {closed}")
+
+    set_continuous_properties(property_ids)
+    await run_matching(set_continuous_books, property_ids)
+    return property_ids
+
+
+async def continuous_matching():
+    """주문이 추가된 접속 매매 매물을 즉시 매칭 (리더 워커에서 실행)."""
+    loop = asyncio.get_running_loop()
+    current = set()
+    next_refresh = 0.0
+    try:
+        while True:
+            if loop.time() >= next_refresh:
+                try:
+                    current = await refresh_session(current)
+                except pymysql.MySQLError as e:
+                    print(f"[{datetime.now()}] 접속 매매 대상 조회 DB 에러: {e}")
+                next_refresh = loop.time() + SESSION_REFRESH_INTERVAL
+
+            try:
+                popped = await REDIS_ASYNC_CLIENT.blpop([INCOMING_BOOKS_KEY], timeout=INCOMING_WAIT_TIMEOUT)
+                if popped is None:
+                    continue
+                property_ids = {int(popped[1])}
+                property_ids |= await run_matching(pop_incoming_books)
+
+                changed = sorted(property_ids)
+                results = await _match_all(changed)
+                failed = []
+                for property_id, result in zip(changed, results):
+                    if isinstance(result, Exception):
+                        print(f"[{datetime.now()}] 접속 매매 실패: property_id={property_id}, {result}")
+                    if result is not True:
+                        failed.append(property_id)
+                # 실패한 매물은 다음 단일가 매매 라운드에서 다시 매칭 (접속 매매 중이면 접속 매매로)
+                await run_matching(mark_books_dirty, failed)
+            except Exception as e:
+                print(f"[{datetime.now()}] 접속 매매 에러: {e}")
+                await asyncio.sleep(INCOMING_WAIT_TIMEOUT)
+    finally:
+        # 리더를 잃으면 다음 리더가 다시 설정할 때까지 모든 주문을 단일가 매매 대상으로
+        set_continuous_properties(set())
+        try:
+            await run_matching(set_continuous_books, set())
+        except Exception as e:
+            print(f"[{datetime.now()}] 접속 매매 목록 초기화 에러: {e}")
@@ -0,0 +1,90 @@
+from fastapi import HTTPException
+from typing import Optional
+from core.settings import REDIS_ASYNC_CLIENT
+import pymysql
+import hashlib
+import json
+import os
+
+# Idempotency-Key 헤더 처리
+# - 같은 사용자가 같은 키로 다시 요청하면 최초 응답을 그대로 반환 (주문 중복 생성 방지)
+# - Redis 캐시를 먼저 확인하고, 없으면 MySQL Idempotency_Keys 테이블(주문과 같은 트랜잭션)로 판단
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))  # 초
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+
+def _cache_key(user_id: int, key: str) -> str:
+    return f"idempotency:{user_id}:{key}"
+
+
+def request_fingerprint(*parts) -> str:
+    """요청 내용 해시: 같은 키로 다른 요청을 보내면 거부하기 위함."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def _check_fingerprint(stored: str, fingerprint: str):
+    if stored != fingerprint:
+        raise HTTPException(status_code=422, detail="같은 Idempotency-Key로 다른 요청을 보낼 수 없음")
+
+
+async def get_cached_response(user_id: int, key: str, fingerprint: str) -> Optional[dict]:
+    cached = await REDIS_ASYNC_CLIENT.get(_cache_key(user_id, key))
+    if cached is None:
+        return None
+    entry = json.loads(cached)
+    _check_fingerprint(entry["fingerprint"], fingerprint)
+    return entry["response"]
+
+
+async def cache_response(user_id: int, key: str, fingerprint: str, response: dict):
+    try:
+        await REDIS_ASYNC_CLIENT.set(
+            _cache_key(user_id, key),
+            json.dumps({"fingerprint": fingerprint, "response": response}),
+            ex=IDEMPOTENCY_TTL,
+        )
+    except Exception as e:
+        # 캐시는 빠른 경로일 뿐 (MySQL 기록이 기준)
+        print(f"Idempotency cache error: {e}")
+
+
+async def claim_key(cursor, user_id: int, key: str, fingerprint: str) -> Optional[dict]:
+    """
+    트랜잭션 안에서 키를 선점. 처음 보는 키면 None,
+    이미 처리된 키면 저장된 응답을 반환 (동시 재시도는 유니크 키 잠금으로 먼저 온 요청의 커밋을 기다림).
+    """
+    try:
+        await cursor.execute("""
+            INSERT INTO Idempotency_Keys (user_id, idempotency_key, request_hash, created_at)
+            VALUES (%s, %s, %s, NOW())
+        """, (user_id, key, fingerprint))
+        return None
+    except pymysql.err.IntegrityError:
+        pass
+
+    await cursor.execute("""
+        SELECT request_hash, response FROM Idempotency_Keys
+        WHERE user_id = %s AND idempotency_key = %s
+    """, (user_id, key))
+    stored = await cursor.fetchone()
+    if stored is None or stored.response is None:
+        raise HTTPException(status_code=409, detail="같은 Idempotency-Key 요청이 처리 중")
+    _check_fingerprint(stored.request_hash, fingerprint)
+    return json.loads(stored.response)
+
+
+async def store_response(cursor, user_id: int, key: str, response: dict):
+    """응답을 키와 함께 저장 (호출자의 트랜잭션에서 커밋)."""
+    await cursor.execute("""
+        UPDATE Idempotency_Keys SET response = %s
+        WHERE user_id = %s AND idempotency_key = %s
+    """, (json.dumps(response), user_id, key))
+
+
+def purge_expired_keys(cursor, limit: int = 1000) -> int:
+    """TTL이 지난 키 삭제 (동기 커서, 릴레이 작업에서 주기적으로 호출)."""
+    return cursor.execute("""
+        DELETE FROM Idempotency_Keys
+        WHERE created_at < NOW() - INTERVAL %s SECOND
+        LIMIT %s
+    """, (IDEMPOTENCY_TTL, limit))
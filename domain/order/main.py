@@ -1,29 +1,71 @@
-from fastapi import APIRouter, HTTPException, Request
-from core.settings import DB_CONFIG, REDIS_CLIENT
+from fastapi import APIRouter, HTTPException, Request, Query, Header
+from fastapi.concurrency import run_in_threadpool
+from core.async_mysql_connector import get_async_db_connection
 from core.jwt import extract_user_id
-from core.redis import update_order_book_in_redis
+from domain.order.order_book import BUY, SELL, ORDER_BOOK_DEPTH, get_order_book_snapshot
+from domain.order.reservation import reserve_and_record_order
+from domain.order.outbox import OUTBOX_ADD, enqueue_book_change, apply_added_order
+from domain.order.idempotency import (
+    IDEMPOTENCY_KEY_MAX_LENGTH, request_fingerprint, get_cached_response, cache_response, claim_key, store_response,
+)
+from typing import Optional
 import pymysql
-import json
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # 라우터 생성
 router = APIRouter()
 
 # Pydantic 모델 정의
+# 수량/가격이 0 이하이면 예약 UPDATE가 잔고를 늘리므로 입력 단계에서 거부
 class BuyOrderRequest(BaseModel):
-    quantity: int
-    price_per_token: int
+    quantity: int = Field(gt=0)
+    price_per_token: int = Field(gt=0)
 
 class SellOrderRequest(BaseModel):
-    quantity: int
-    price_per_token: int
+    quantity: int = Field(gt=0)
+    price_per_token: int = Field(gt=0)
+
+# 주문 접수 공통 처리
+# - 잔고/토큰 예약, 주문 기록, 아웃박스 행, 멱등키 응답을 한 트랜잭션으로 커밋
+# - 커밋 후 호가창 반영 (실패해도 아웃박스 릴레이가 재처리)
+async def place_order(user_id: int, property_id: int, side: str, order, idempotency_key: Optional[str], message: str):
+    fingerprint = request_fingerprint(side, property_id, order.price_per_token, order.quantity)
+    if idempotency_key:
+        cached = await get_cached_response(user_id, idempotency_key, fingerprint)
+        if cached is not None:
+            return cached
+
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            if idempotency_key:
+                stored = await claim_key(cursor, user_id, idempotency_key, fingerprint)
+                if stored is not None:
+                    await cache_response(user_id, idempotency_key, fingerprint, stored)
+                    return stored
+
+            order_id = await reserve_and_record_order(
+                cursor, user_id, property_id, side, order.price_per_token, order.quantity)
+            outbox_id = await enqueue_book_change(cursor, property_id, order_id, OUTBOX_ADD)
+            response = {"message": message, "order_id": order_id}
+            if idempotency_key:
+                await store_response(cursor, user_id, idempotency_key, response)
+            await conn.commit()
+    except pymysql.MySQLError as e:
+        raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
+
+    if idempotency_key:
+        await cache_response(user_id, idempotency_key, fingerprint, response)
+    # Redis 호가창 업데이트 (해당 가격 레벨만 갱신, 변경분 발행)
+    await apply_added_order(outbox_id, property_id, order_id, side, order.price_per_token, order.quantity)
+    return response
 
 # 주문 제출 API (매수)
 @router.post("/{property_id}/buy")
 async def submit_buy_order(
         order: BuyOrderRequest,
         property_id: int,
-        request: Request
+        request: Request,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
     # 쿠키에서 JWT 가져오기
     token = request.cookies.get("access_token")
@@ -36,60 +78,15 @@ async def submit_buy_order(
     except ValueError as e:
         raise HTTPException(status_code=401, detail=f"토큰 유효 X {e}")
 
-    try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        # 1. 사용자 주문 가능 금액(orderable_balance) 확인
-        cursor.execute("SELECT orderable_balance FROM Users WHERE id = %s", (user_id,))
-        result = cursor.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="유저 정보를 찾을 수 없습니다.")
-
-        orderable_balance = result[0]
-        total_cost = order.quantity * order.price_per_token
-
-        if orderable_balance < total_cost:
-            raise HTTPException(status_code=400, detail="주문 가능한 잔액 부족")
-
-        # 1-2. 주문 가능한 금액에서 제외 (update)
-        cursor.execute(
-            "UPDATE Users SET orderable_balance = orderable_balance - %s WHERE id = %s",
-            (total_cost, user_id)
-        )
-        conn.commit()
-
-        # 2. 주문 기록 저장 (Order_Archive 테이블)
-        query = """
-            INSERT INTO Order_Archive (property_detail_id, user_id, order_type, price_per_token, quantity, status, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-        """
-        cursor.execute(query, (
-            property_id, user_id, "buy", order.price_per_token, order.quantity, "normal"))
-        conn.commit()
-        order_id = cursor.lastrowid
-
-        # 3. Redis 호가창 업데이트
-        redis_key = f"order_book:{property_id}"
-        existing_order_book = REDIS_CLIENT.hget(redis_key, "order_book")
-        order_book = json.loads(existing_order_book) if existing_order_book else {"buy": {}, "sell": {}}
-        if str(order.price_per_token) not in order_book["buy"]:
-            order_book["buy"][str(order.price_per_token)] = []
-        order_book["buy"][str(order.price_per_token)].append({"order_id": order_id, "quantity": order.quantity})
-        update_order_book_in_redis(property_id, order_book)
-    except pymysql.MySQLError as e:
-        raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
-    return {"message": "매수 주문이 완료", "order_id": order_id}
+    return await place_order(user_id, property_id, BUY, order, idempotency_key, "매수 주문이 완료")
 
 # 주문 제출 API (매도)
 @router.post("/{property_id}/sell")
 async def submit_sell_order(
-        order: BuyOrderRequest,
+        order: SellOrderRequest,
         property_id: int,
-        request: Request
+        request: Request,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
     # 쿠키에서 JWT 가져오기
     token = request.cookies.get("access_token")
@@ -101,74 +98,21 @@ async def submit_sell_order(
         user_id = extract_user_id(token)
     except ValueError as e:
         raise HTTPException(status_code=401, detail=f"토큰 유효 X {e}")
-    try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        # 1. 거래 가능 토큰 확인
-        query = """
-            SELECT tradeable_tokens 
-            FROM Ownerships 
-            WHERE user_id = %s AND property_detail_id = %s
-        """
-        cursor.execute(query, (user_id, property_id))
-        result = cursor.fetchone()
-
-        if not result:
-            raise HTTPException(status_code=404, detail="해당 토큰을 소유하고 있지 않음")
-
-        tradeable_tokens = result[0]
-
-        if tradeable_tokens < order.quantity:
-            raise HTTPException(status_code=400, detail="매도에 필요한 거래 가능 토큰이 부족")
-
-        #1-2. 거래 가능 토큰 업데이트 (차감)
-        cursor.execute(
-            "UPDATE Ownerships SET tradeable_tokens = tradeable_tokens - %s WHERE user_id = %s AND property_detail_id = %s",
-            (order.quantity, user_id, property_id)
-        )
-        conn.commit()
-
-        # 2. 주문 기록 저장 (Order_Archive 테이블)
-        query = """
-            INSERT INTO Order_Archive (property_detail_id, user_id, order_type, price_per_token, quantity, status, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-        """
-        cursor.execute(query, (
-            property_id, user_id, "sell", order.price_per_token, order.quantity, "normal"))
-        conn.commit()
-        order_id = cursor.lastrowid
-
-        # 3. Redis 호가창 업데이트
-        redis_key = f"order_book:{property_id}"
-        existing_order_book = REDIS_CLIENT.hget(redis_key, "order_book")
-        order_book = json.loads(existing_order_book) if existing_order_book else {"buy": {}, "sell": {}}
-        if str(order.price_per_token) not in order_book["sell"]:
-            order_book["sell"][str(order.price_per_token)] = []
-        order_book["sell"][str(order.price_per_token)].append({"order_id": order_id, "quantity": order.quantity})
-        update_order_book_in_redis(property_id, order_book)
-    except pymysql.MySQLError as e:
-        raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
-    return {"message": "매도 주문이 완료", "order_id": order_id}
 
-# REST API: 호가창 조회
+    return await place_order(user_id, property_id, SELL, order, idempotency_key, "매도 주문이 완료")
+
+# REST API: 호가창 조회 (가격 레벨별 잔량 합계와 주문 수, 상위 depth개)
 @router.get("/{property_id}")
-async def get_order_book(property_id: int):
-    redis_key = f"order_book:{property_id}"
-    # Redis에서 전체 order_book 조회
-    existing_order_book = REDIS_CLIENT.hget(redis_key, "order_book")
-    if existing_order_book:
-        try:
-            order_book = json.loads(existing_order_book)  # JSON 디코딩
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=500, detail="Redis 데이터 디코딩 실패.")
-    else:
-        order_book = {"sell": {}, "buy": {}}
-        REDIS_CLIENT.hset(redis_key, "order_book", json.dumps(order_book))  # Redis에 저장
-    return {"property_id": property_id, "order_book": order_book}
+async def get_order_book(
+        property_id: int,
+        depth: int = Query(ORDER_BOOK_DEPTH, ge=1, le=100, description="매수/매도 각각 조회할 가격 레벨 수")
+):
+    snapshot = await run_in_threadpool(get_order_book_snapshot, property_id, depth)
+    return {
+        "property_id": property_id,
+        "seq": snapshot["seq"],
+        "order_book": {BUY: snapshot[BUY], SELL: snapshot[SELL]},
+    }
 
 
 # # FastAPI 앱 생성
@@ -0,0 +1,339 @@
+from bisect import bisect_left, insort
+from collections import deque
+from core.settings import REDIS_CLIENT
+from core.redis import order_book_channel
+from domain.order.order_book_scripts import add_order_script, remove_order_script, apply_fills_script
+import redis
+import os
+
+BUY = "buy"
+SELL = "sell"
+SIDES = (BUY, SELL)
+
+# 공개 호가창에 노출할 기본 가격 레벨 수 (매수/매도 각각)
+ORDER_BOOK_DEPTH = int(os.getenv("ORDER_BOOK_DEPTH", 10))
+
+
+class Order:
+    __slots__ = ("order_id", "side", "price", "quantity")
+
+    def __init__(self, order_id: int, side: str, price: int, quantity: int):
+        self.order_id = order_id
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+
+
+class PriceLevel:
+    """가격 레벨: FIFO 큐와 잔량 합계를 함께 관리."""
+    __slots__ = ("price", "orders", "quantity", "count")
+
+    def __init__(self, price: int):
+        self.price = price
+        self.orders = deque()
+        self.quantity = 0
+        self.count = 0
+
+    def _compact(self):
+        # 취소된 주문(quantity == 0)은 큐 앞쪽에 도달했을 때 정리
+        while self.orders and self.orders[0].quantity == 0:
+            self.orders.popleft()
+
+    def head(self):
+        self._compact()
+        return self.orders[0] if self.orders else None
+
+    def __iter__(self):
+        return (order for order in self.orders if order.quantity > 0)
+
+
+class OrderBook:
+    """
+    가격 레벨별 FIFO 큐와 주문 ID 인덱스로 구성된 호가창.
+    - 가격 레벨은 정렬된 리스트(오름차순)로 관리
+    - 주문 취소는 인덱스로 O(1) 조회 후 지연 삭제
+    """
+
+    def __init__(self, property_id: int):
+        self.property_id = property_id
+        self._prices = {BUY: [], SELL: []}
+        self._levels = {BUY: {}, SELL: {}}
+        self._index = {}
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, order_id: int):
+        return order_id in self._index
+
+    def add(self, order_id: int, side: str, price: int, quantity: int) -> Order:
+        """주문을 해당 가격 레벨의 끝에 추가."""
+        if order_id in self._index:
+            raise ValueError(f"이미 존재하는 주문: order_id={order_id}")
+        levels = self._levels[side]
+        level = levels.get(price)
+        if level is None:
+            level = levels[price] = PriceLevel(price)
+            insort(self._prices[side], price)
+        order = Order(order_id, side, price, quantity)
+        level.orders.append(order)
+        level.quantity += quantity
+        level.count += 1
+        self._index[order_id] = order
+        return order
+
+    def get(self, order_id: int):
+        return self._index.get(order_id)
+
+    def cancel(self, order_id: int):
+        """주문을 호가창에서 제거하고 제거된 주문을 반환 (없으면 None)."""
+        order = self._index.pop(order_id, None)
+        if order is None:
+            return None
+        level = self._levels[order.side][order.price]
+        level.quantity -= order.quantity
+        level.count -= 1
+        order.quantity = 0
+        if level.count == 0:
+            self._remove_level(order.side, order.price)
+        return order
+
+    def reduce(self, order_id: int, quantity: int):
+        """체결 수량만큼 주문 잔량을 차감. 잔량이 0이 되면 제거."""
+        order = self._index[order_id]
+        if quantity >= order.quantity:
+            return self.cancel(order_id)
+        order.quantity -= quantity
+        self._levels[order.side][order.price].quantity -= quantity
+        return order
+
+    def _remove_level(self, side: str, price: int):
+        del self._levels[side][price]
+        prices = self._prices[side]
+        del prices[bisect_left(prices, price)]
+
+    def prices(self, side: str):
+        """매수는 높은 가격 우선, 매도는 낮은 가격 우선으로 가격 목록 반환."""
+        prices = self._prices[side]
+        return list(reversed(prices)) if side == BUY else list(prices)
+
+    def level(self, side: str, price: int):
+        return self._levels[side].get(price)
+
+    def levels(self, side: str):
+        return [self._levels[side][price] for price in self.prices(side)]
+
+    def best_price(self, side: str):
+        prices = self._prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == BUY else prices[0]
+
+
+# ---------------------------------------------------------------------------
+# Redis 저장 구조
+#   order_book:{property_id}:{side}          ZSET  가격 레벨 (score = 가격)
+#   order_book:{property_id}:{side}:{price}  HASH  order_id -> 잔량
+#   order_book:{property_id}:orders          HASH  order_id -> "side:price"
+#   order_book:{property_id}:{side}:depth    HASH  가격 -> 레벨 잔량 합계 (쓰기 시점에 갱신)
+#   order_book:{property_id}:{side}:count    HASH  가격 -> 레벨 주문 수 (쓰기 시점에 갱신)
+#   order_book:{property_id}:version         STRING 변경 시마다 증가하는 버전 (= 변경분 시퀀스 번호)
+#   order_book:dirty                         SET   주문 추가/취소 후 매칭 대기 중인 property_id
+#   order_book:continuous                    SET   현재 접속 매매 중인 property_id (리더가 관리)
+#   order_book:incoming                      LIST  주문이 추가되어 즉시 매칭할 접속 매매 property_id
+# 주문 추가/취소는 해당 레벨 키만 건드리므로 호가창 깊이와 무관하게 일정한 비용.
+# 추가/취소/체결 반영은 Lua 스크립트(order_book_scripts.py)로 변경분 발행까지 원자적으로 처리.
+# 같은 레벨 안의 시간 우선순위는 order_id(AUTO_INCREMENT) 순서로 복원.
+# ---------------------------------------------------------------------------
+
+def _prices_key(property_id: int, side: str) -> str:
+    return f"order_book:{property_id}:{side}"
+
+
+def _level_key(property_id: int, side: str, price: int) -> str:
+    return f"order_book:{property_id}:{side}:{price}"
+
+
+def _index_key(property_id: int) -> str:
+    return f"order_book:{property_id}:orders"
+
+
+def _depth_key(property_id: int, side: str) -> str:
+    return f"order_book:{property_id}:{side}:depth"
+
+
+def _count_key(property_id: int, side: str) -> str:
+    return f"order_book:{property_id}:{side}:count"
+
+
+def _version_key(property_id: int) -> str:
+    return f"order_book:{property_id}:version"
+
+
+DIRTY_BOOKS_KEY = "order_book:dirty"
+CONTINUOUS_BOOKS_KEY = "order_book:continuous"
+INCOMING_BOOKS_KEY = "order_book:incoming"
+
+
+def add_order(property_id: int, order_id: int, side: str, price: int, quantity: int) -> bool:
+    """
+    Redis 호가창에 주문 추가 후 변경분 발행 (Lua 스크립트 1회).
+    이미 호가창에 있는 주문이면 아무것도 하지 않고 False (아웃박스 재처리 시 중복 반영 방지).
+    """
+    seq = add_order_script(
+        keys=[
+            _index_key(property_id), _prices_key(property_id, side), _level_key(property_id, side, price),
+            _depth_key(property_id, side), _count_key(property_id, side), _version_key(property_id),
+            DIRTY_BOOKS_KEY, CONTINUOUS_BOOKS_KEY, INCOMING_BOOKS_KEY,
+        ],
+        args=[property_id, order_id, side, price, quantity, order_book_channel(property_id), ORDER_BOOK_DEPTH],
+    )
+    return seq != 0
+
+
+def remove_order(property_id: int, order_id: int):
+    """
+    Redis 호가창에서 주문 제거 후 변경분 발행.
+    제거된 주문의 (side, price, quantity)를 반환하며, 없으면 None.
+    레벨 키를 KEYS로 넘기기 위해 주문 위치를 먼저 조회 (라운드트립 2회, 그 사이 위치가 바뀌면 재시도).
+    """
+    index_key = _index_key(property_id)
+    while True:
+        location = REDIS_CLIENT.hget(index_key, order_id)
+        if location is None:
+            return None
+        side, price = location.split(":")
+        removed = remove_order_script(
+            keys=[
+                index_key, _prices_key(property_id, side), _level_key(property_id, side, price),
+                _depth_key(property_id, side), _count_key(property_id, side), _version_key(property_id),
+                DIRTY_BOOKS_KEY,
+            ],
+            args=[property_id, order_id, location, order_book_channel(property_id), ORDER_BOOK_DEPTH],
+        )
+        if removed != -1:
+            break
+    if removed is None:
+        return None
+    side, price, quantity = removed
+    return side, int(price), int(quantity)
+
+
+def apply_fills(property_id: int, removed, updated):
+    """
+    매칭 결과를 Redis 호가창에 반영하고 변경분 발행 (Lua 스크립트 1회).
+    removed: [(side, price, order_id)] 전량 체결된 주문
+    updated: [(side, price, order_id, 남은 수량)] 부분 체결된 주문
+    매칭 중 취소된 주문은 건너뜀.
+    """
+    if not removed and not updated:
+        return
+    targets = sorted([(side, price, order_id, 0) for side, price, order_id in removed] + list(updated))
+    keys = [_index_key(property_id), _version_key(property_id)]
+    for side in SIDES:
+        keys.extend([_prices_key(property_id, side), _depth_key(property_id, side), _count_key(property_id, side)])
+    args = [property_id, order_book_channel(property_id), ORDER_BOOK_DEPTH]
+    for side, price, order_id, remaining in targets:
+        keys.append(_level_key(property_id, side, price))
+        args.extend((side, price, order_id, remaining))
+    apply_fills_script(keys=keys, args=args)
+
+
+def get_order_book_snapshot(property_id: int, depth: int = ORDER_BOOK_DEPTH) -> dict:
+    """
+    매수/매도 상위 depth개 가격 레벨의 (가격, 잔량 합계, 주문 수)와 시퀀스 번호를
+    일관된 시점으로 조회. 조회 도중 호가창이 바뀌면(버전 변경) 다시 조회.
+    """
+    version_key = _version_key(property_id)
+    with REDIS_CLIENT.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                pipe.watch(version_key)
+                read = REDIS_CLIENT.pipeline(transaction=False)
+                read.zrevrange(_prices_key(property_id, BUY), 0, depth - 1)
+                read.zrange(_prices_key(property_id, SELL), 0, depth - 1)
+                prices = dict(zip(SIDES, read.execute()))
+                for side in SIDES:
+                    if prices[side]:
+                        read.hmget(_depth_key(property_id, side), prices[side])
+                        read.hmget(_count_key(property_id, side), prices[side])
+                aggregates = iter(read.execute())
+                pipe.multi()
+                pipe.get(version_key)
+                seq = int(pipe.execute()[0] or 0)
+                break
+            except redis.WatchError:
+                continue
+
+    snapshot = {"type": "snapshot", "property_id": property_id, "seq": seq}
+    for side in SIDES:
+        quantities, counts = (next(aggregates), next(aggregates)) if prices[side] else ([], [])
+        snapshot[side] = [
+            {"price": int(price), "quantity": int(quantity or 0), "orders": int(orders or 0)}
+            for price, quantity, orders in zip(prices[side], quantities, counts)
+        ]
+    return snapshot
+
+
+def mark_books_dirty(property_ids):
+    """다음 매칭 라운드에서 다시 매칭하도록 표시."""
+    property_ids = list(property_ids)
+    if property_ids:
+        REDIS_CLIENT.sadd(DIRTY_BOOKS_KEY, *property_ids)
+
+
+def set_continuous_books(property_ids):
+    """접속 매매 중인 매물 목록 교체 (이후 추가되는 주문은 즉시 매칭 대기열로)."""
+    pipe = REDIS_CLIENT.pipeline(transaction=True)
+    pipe.delete(CONTINUOUS_BOOKS_KEY)
+    if property_ids:
+        pipe.sadd(CONTINUOUS_BOOKS_KEY, *property_ids)
+    pipe.execute()
+
+
+def pop_incoming_books(limit: int = 1000) -> set:
+    """즉시 매칭 대기열에서 property_id를 꺼냄 (중복 제거)."""
+    pipe = REDIS_CLIENT.pipeline(transaction=True)
+    pipe.lrange(INCOMING_BOOKS_KEY, 0, limit - 1)
+    pipe.ltrim(INCOMING_BOOKS_KEY, limit, -1)
+    members, _ = pipe.execute()
+    return {int(property_id) for property_id in members}
+
+
+def pop_dirty_books() -> set:
+    """매칭 대기 중인 property_id를 모두 꺼냄 (조회와 삭제를 한 트랜잭션으로)."""
+    pipe = REDIS_CLIENT.pipeline(transaction=True)
+    pipe.smembers(DIRTY_BOOKS_KEY)
+    pipe.delete(DIRTY_BOOKS_KEY)
+    members, _ = pipe.execute()
+    return {int(property_id) for property_id in members}
+
+
+def discover_active_books() -> set:
+    """미체결 주문이 있는 property_id 전체 조회 (시작 시 1회)."""
+    property_ids = set()
+    for key in REDIS_CLIENT.scan_iter(match="order_book:*:orders"):
+        property_id = key.split(":")[1]
+        if property_id.isdigit():
+            property_ids.add(int(property_id))
+    return property_ids
+
+
+def load_order_book(property_id: int) -> OrderBook:
+    """Redis에서 호가창 전체를 읽어 OrderBook으로 구성 (라운드트립 2회)."""
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for side in SIDES:
+        pipe.zrange(_prices_key(property_id, side), 0, -1)
+    prices_by_side = dict(zip(SIDES, pipe.execute()))
+
+    levels = [(side, int(price)) for side in SIDES for price in prices_by_side[side]]
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for side, price in levels:
+        pipe.hgetall(_level_key(property_id, side, price))
+    level_orders = pipe.execute()
+
+    book = OrderBook(property_id)
+    for (side, price), orders in zip(levels, level_orders):
+        for order_id in sorted(int(order_id) for order_id in orders):
+            book.add(order_id, side, price, int(orders[str(order_id)]))
+    return book
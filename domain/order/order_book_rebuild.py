@@ -0,0 +1,258 @@
+"""
+MySQL(Order_Archive)의 미체결 주문으로 Redis 호가창을 재구성하고, 두 저장소의 일치 여부를 검사.
+
+    python -m domain.order.order_book_rebuild --check          # 불일치만 출력
+    python -m domain.order.order_book_rebuild                  # 불일치한 호가창만 재구성
+    python -m domain.order.order_book_rebuild --all            # 전체 재구성
+    python -m domain.order.order_book_rebuild 12 34            # 지정한 매물만
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import os
+import time
+import redis
+from core.settings import REDIS_CLIENT
+from core.mysql_connector import get_db_connection, SSRowCursor
+from domain.order.order_book import (
+    SIDES, DIRTY_BOOKS_KEY, discover_active_books, get_order_book_snapshot,
+    _prices_key, _level_key, _index_key, _depth_key, _count_key, _version_key,
+)
+from core.redis import publish_order_book_message
+
+REBUILD_BATCH_SIZE = int(os.getenv("ORDER_BOOK_REBUILD_BATCH_SIZE", 500))
+_MAX_ATTEMPTS = 5
+
+# order_id -> (side, price, quantity)
+BookOrders = Dict[int, Tuple[str, int, int]]
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+def _chunks(items: List[int], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def open_book_ids() -> set:
+    """MySQL에 미체결 주문이 있는 매물 + Redis에 호가창이 있는 매물."""
+    with get_db_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT property_detail_id FROM Order_Archive
+            WHERE status = 'normal' AND quantity > 0
+        """)
+        property_ids = {row[0] for row in cursor.fetchall()}
+    return property_ids | discover_active_books()
+
+
+def load_open_orders(property_ids: List[int]) -> Dict[int, BookOrders]:
+    """미체결 주문을 매물, 주문 ID(시간 우선) 순으로 스트리밍 조회."""
+    books = defaultdict(dict)
+    with get_db_connection() as conn, conn.cursor(SSRowCursor) as cursor:
+        cursor.execute(f"""
+            SELECT id, property_detail_id, order_type, price_per_token, quantity
+            FROM Order_Archive
+            WHERE status = 'normal' AND quantity > 0
+              AND property_detail_id IN ({_placeholders(len(property_ids))})
+            ORDER BY property_detail_id, id
+        """, property_ids)
+        for row in cursor:
+            books[row.property_detail_id][row.id] = (row.order_type, row.price_per_token, row.quantity)
+    return books
+
+
+class RedisBook:
+    """Redis에 저장된 호가창 1개의 원본 내용 (검사/삭제용)."""
+    __slots__ = ("levels", "index", "depth", "count")
+
+    def __init__(self):
+        self.levels = {}  # (side, price) -> {order_id: quantity}
+        self.index = {}  # order_id -> "side:price"
+        self.depth = {}  # side -> {price: quantity}
+        self.count = {}  # side -> {price: orders}
+
+    def orders(self) -> BookOrders:
+        return {
+            order_id: (side, price, quantity)
+            for (side, price), level in self.levels.items()
+            for order_id, quantity in level.items()
+        }
+
+
+def read_redis_books(property_ids: List[int]) -> Dict[int, RedisBook]:
+    """여러 호가창을 파이프라인 2회로 읽음."""
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for property_id in property_ids:
+        pipe.hgetall(_index_key(property_id))
+        for side in SIDES:
+            pipe.zrange(_prices_key(property_id, side), 0, -1)
+            pipe.hgetall(_depth_key(property_id, side))
+            pipe.hgetall(_count_key(property_id, side))
+    results = iter(pipe.execute())
+
+    books = {}
+    level_keys = []
+    for property_id in property_ids:
+        book = books[property_id] = RedisBook()
+        book.index = {int(order_id): location for order_id, location in next(results).items()}
+        for side in SIDES:
+            for price in next(results):
+                level_keys.append((property_id, side, int(price)))
+            book.depth[side] = {int(price): int(quantity) for price, quantity in next(results).items()}
+            book.count[side] = {int(price): int(orders) for price, orders in next(results).items()}
+
+    for property_id, side, price in level_keys:
+        pipe.hgetall(_level_key(property_id, side, price))
+    for (property_id, side, price), level in zip(level_keys, pipe.execute()):
+        books[property_id].levels[(side, price)] = {
+            int(order_id): int(quantity) for order_id, quantity in level.items()
+        }
+    return books
+
+
+def diff_book(expected: BookOrders, book: RedisBook) -> List[str]:
+    """MySQL 기준 미체결 주문과 Redis 호가창의 차이 목록 (일치하면 빈 목록)."""
+    issues = []
+    actual = book.orders()
+    for order_id, order in expected.items():
+        if order_id not in actual:
+            issues.append(f"missing order {order_id} {order}")
+        elif actual[order_id] != order:
+            issues.append(f"order {order_id}: redis={actual[order_id]} mysql={order}")
+    for order_id in actual.keys() - expected.keys():
+        issues.append(f"stale order {order_id} {actual[order_id]}")
+
+    if book.index != {order_id: f"{side}:{price}" for order_id, (side, price, _) in actual.items()}:
+        issues.append("order index out of sync")
+    for side in SIDES:
+        levels = {price: level for (level_side, price), level in book.levels.items() if level_side == side}
+        if book.depth[side] != {price: sum(level.values()) for price, level in levels.items() if level}:
+            issues.append(f"{side} depth out of sync")
+        if book.count[side] != {price: len(level) for price, level in levels.items() if level}:
+            issues.append(f"{side} order counts out of sync")
+        if any(not level for level in levels.values()):
+            issues.append(f"{side} has empty price levels")
+    return issues
+
+
+def _queue_replace(pipe, property_id: int, orders: BookOrders, current: RedisBook):
+    """기존 호가창 키를 지우고 orders로 다시 채우는 명령을 MULTI에 추가."""
+    stale_keys = [_index_key(property_id), f"order_book:{property_id}"]  # 마지막은 예전 JSON 호가창 키
+    for side in SIDES:
+        stale_keys += [_prices_key(property_id, side), _depth_key(property_id, side), _count_key(property_id, side)]
+    stale_keys += [_level_key(property_id, side, price) for side, price in current.levels]
+    pipe.delete(*stale_keys)
+
+    levels = defaultdict(dict)
+    for order_id, (side, price, quantity) in orders.items():
+        levels[(side, price)][order_id] = quantity
+    for side in SIDES:
+        side_levels = {price: level for (level_side, price), level in levels.items() if level_side == side}
+        if not side_levels:
+            continue
+        pipe.zadd(_prices_key(property_id, side), {price: price for price in side_levels})
+        pipe.hset(_depth_key(property_id, side), mapping={
+            price: sum(level.values()) for price, level in side_levels.items()})
+        pipe.hset(_count_key(property_id, side), mapping={
+            price: len(level) for price, level in side_levels.items()})
+        for price, level in side_levels.items():
+            pipe.hset(_level_key(property_id, side, price), mapping=level)
+    if orders:
+        pipe.hset(_index_key(property_id), mapping={
+            order_id: f"{side}:{price}" for order_id, (side, price, _) in orders.items()})
+    pipe.incr(_version_key(property_id))
+    pipe.sadd(DIRTY_BOOKS_KEY, property_id)
+
+
+def _rebuild_batch(property_ids: List[int], only_inconsistent: bool) -> List[int]:
+    """
+    매물 묶음 하나를 재구성하고 재구성한 property_id 목록을 반환.
+    버전 키를 WATCH 한 뒤 MySQL을 읽으므로, 그 사이 주문/취소/체결이 반영되면 EXEC가 실패하고 다시 시도.
+    """
+    version_keys = [_version_key(property_id) for property_id in property_ids]
+    with REDIS_CLIENT.pipeline(transaction=True) as pipe:
+        for _ in range(_MAX_ATTEMPTS):
+            try:
+                pipe.watch(*version_keys)
+                current = read_redis_books(property_ids)
+                expected = load_open_orders(property_ids)
+                targets = [
+                    property_id for property_id in property_ids
+                    if not only_inconsistent or diff_book(expected.get(property_id, {}), current[property_id])
+                ]
+                if not targets:
+                    pipe.unwatch()
+                    return []
+                pipe.multi()
+                for property_id in targets:
+                    _queue_replace(pipe, property_id, expected.get(property_id, {}), current[property_id])
+                pipe.execute()
+                return targets
+            except redis.WatchError:
+                continue
+    raise RuntimeError(f"order book rebuild kept conflicting with live updates: {property_ids[0]}..{property_ids[-1]}")
+
+
+def rebuild_order_books(property_ids: Optional[Iterable[int]] = None, only_inconsistent: bool = False) -> List[int]:
+    """
+    MySQL 미체결 주문으로 Redis 호가창 재구성. 재구성한 property_id 목록을 반환.
+    재구성한 호가창은 최신 스냅샷을 발행하고(구독 중인 클라이언트 갱신) 다음 라운드에 매칭.
+    """
+    property_ids = sorted(set(property_ids) if property_ids is not None else open_book_ids())
+    rebuilt = []
+    for batch in _chunks(property_ids, REBUILD_BATCH_SIZE):
+        rebuilt += _rebuild_batch(batch, only_inconsistent)
+    for property_id in rebuilt:
+        publish_order_book_message(get_order_book_snapshot(property_id))
+    return rebuilt
+
+
+def check_order_books(property_ids: Optional[Iterable[int]] = None) -> Dict[int, List[str]]:
+    """Redis와 MySQL이 다른 호가창의 차이 목록."""
+    property_ids = sorted(set(property_ids) if property_ids is not None else open_book_ids())
+    report = {}
+    for batch in _chunks(property_ids, REBUILD_BATCH_SIZE):
+        expected = load_open_orders(batch)
+        current = read_redis_books(batch)
+        for property_id in batch:
+            issues = diff_book(expected.get(property_id, {}), current[property_id])
+            if issues:
+                report[property_id] = issues
+    return report
+
+
+def repair_order_books() -> List[int]:
+    """시작 시 실행: 불일치한 호가창만 재구성 (Redis 유실/재시작 복구)."""
+    started = time.perf_counter()
+    rebuilt = rebuild_order_books(only_inconsistent=True)
+    print(f"[{datetime.now()}] 호가창 복구: {len(rebuilt)}건 재구성, 소요 {time.perf_counter() - started:.3f}s")
+    return rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order_Archive 기준 Redis 호가창 검사/재구성")
+    parser.add_argument("property_ids", nargs="*", type=int, help="대상 매물 (생략 시 전체)")
+    parser.add_argument("--check", action="store_true", help="검사만 하고 재구성하지 않음")
+    parser.add_argument("--all", action="store_true", help="일치하는 호가창도 재구성")
+    args = parser.parse_args()
+    property_ids = args.property_ids or None
+
+    started = time.perf_counter()
+    if args.check:
+        report = check_order_books(property_ids)
+        for property_id, issues in sorted(report.items()):
+            print(f"property_id={property_id}")
+            for issue in issues:
+                print(f"  - {issue}")
+        print(f"불일치 {len(report)}건, 소요 {time.perf_counter() - started:.3f}s")
+        raise SystemExit(1 if report else 0)
+
+    rebuilt = rebuild_order_books(property_ids, only_inconsistent=not args.all)
+    print(f"재구성 {len(rebuilt)}건, 소요 {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from core.settings import REDIS_CLIENT
+
+# 호가창 변경용 Lua 스크립트
+# - 조회/변경/버전 증가/변경분 발행을 Redis 서버에서 한 번에 실행 → 연산 1회 = 라운드트립 1회
+# - 스크립트 실행 중에는 다른 명령이 끼어들지 않으므로 WATCH 재시도 없이 원자적으로 처리
+# - 버전 증가와 발행이 같은 스크립트 안에 있어 변경분이 seq 순서대로 발행됨
+# 키 이름은 order_book.py의 저장 구조와 같음 (prefix = order_book:{property_id})
+# 스크립트는 EVALSHA로 호출되고, 서버에 캐시가 없으면 redis-py가 자동으로 다시 적재
+# 스크립트가 접근하는 키는 모두 KEYS로 전달 (스크립트 안에서 키 이름을 만들지 않음)
+# 단, 매물 키와 함께 매물 공통 키(order_book:dirty/continuous/incoming)를 같은 스크립트에서 변경하므로
+# 단일 Redis(standalone, 복제 포함) 전용 — Redis Cluster에서는 CROSSSLOT 오류
+
+# 변경분 메시지: {type: delta, property_id, seq, ts, changes: [{side, price, quantity, orders}]}
+# quantity/orders는 변경 후 레벨 잔량 합계/주문 수, ts는 발행 시각(Redis 서버 시간, epoch ms)
+# 스냅샷은 상위 depth(ORDER_BOOK_DEPTH)개 레벨만 담으므로 변경분도 상위 depth개 창 기준으로 발행
+# - 창 안에서 바뀐 레벨과 창에 새로 들어온 레벨은 현재 값
+# - 삭제되었거나 창 밖으로 밀려난 레벨은 quantity 0 (클라이언트 화면에서 삭제)
+# - 창 밖에서만 바뀐 레벨은 보내지 않음 (seq 연속성을 위해 changes가 비어도 발행)
+# → 클라이언트는 변경분을 그대로 적용하면 항상 스냅샷과 같은 depth개 화면을 유지
+_PUBLISH_DELTA = """
+local function publish_delta(channel, property_id, seq, changes)
+    local now = redis.call('TIME')
+    local message = cjson.encode({
+        type = 'delta', property_id = tonumber(property_id), seq = seq,
+        ts = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000),
+    })
+    -- 빈 테이블은 cjson이 {}로 인코딩하므로 changes는 배열로 직접 붙임
+    local encoded = '[]'
+    if #changes > 0 then
+        encoded = cjson.encode(changes)
+    end
+    redis.call('PUBLISH', channel, string.sub(message, 1, -2) .. ',"changes":' .. encoded .. '}')
+end
+
+-- 상위 depth개 가격 (매수는 높은 가격부터, 매도는 낮은 가격부터)
+local function top_prices(prices, side, depth)
+    if side == 'buy' then
+        return redis.call('ZREVRANGE', prices, 0, depth - 1)
+    end
+    return redis.call('ZRANGE', prices, 0, depth - 1)
+end
+
+-- 변경 전/후 상위 depth개 창(before/after)을 비교해 changes에 추가
+-- 창에서 빠진 레벨은 quantity 0, 창에 새로 들어왔거나 창 안에서 바뀐(changed) 레벨은 현재 값
+local function append_window_changes(changes, changed, side, before, after, depth_key, count_key)
+    local previous, current = {}, {}
+    for _, price in ipairs(before) do
+        previous[price] = true
+    end
+    for _, price in ipairs(after) do
+        current[price] = true
+    end
+    for _, price in ipairs(before) do
+        if not current[price] then
+            table.insert(changes, {side = side, price = tonumber(price), quantity = 0, orders = 0})
+        end
+    end
+    for _, price in ipairs(after) do
+        if changed[price] or not previous[price] then
+            table.insert(changes, {
+                side = side, price = tonumber(price),
+                quantity = tonumber(redis.call('HGET', depth_key, price)),
+                orders = tonumber(redis.call('HGET', count_key, price)),
+            })
+        end
+    end
+end
+"""
+
+# KEYS: index, prices, level, depth, count, version, dirty, continuous, incoming
+# ARGV: property_id, order_id, side, price, quantity, channel, depth
+# 반환: 새 seq, 이미 호가창에 있는 주문이면 0
+# 접속 매매 중인 매물(continuous 집합)은 즉시 매칭 대기열(incoming)로, 나머지는 다음 단일가 매매 대상(dirty)으로 표시
+ADD_ORDER_LUA = _PUBLISH_DELTA + """
+local index, prices, level, depth, count, version, dirty, continuous, incoming = unpack(KEYS)
+local property_id, order_id, side, price, quantity, channel, window = unpack(ARGV)
+if redis.call('HEXISTS', index, order_id) == 1 then
+    return 0
+end
+window = tonumber(window)
+local before = top_prices(prices, side, window)
+redis.call('ZADD', prices, price, price)
+redis.call('HSET', level, order_id, quantity)
+redis.call('HSET', index, order_id, side .. ':' .. price)
+redis.call('HINCRBY', depth, price, quantity)
+redis.call('HINCRBY', count, price, 1)
+local seq = redis.call('INCR', version)
+if redis.call('SISMEMBER', continuous, property_id) == 1 then
+    redis.call('RPUSH', incoming, property_id)
+else
+    redis.call('SADD', dirty, property_id)
+end
+local changes = {}
+append_window_changes(changes, {[price] = true}, side, before, top_prices(prices, side, window), depth, count)
+publish_delta(channel, property_id, seq, changes)
+return seq
+"""
+
+# KEYS: index, prices, level, depth, count, version, dirty
+# ARGV: property_id, order_id, location(side:price), channel, depth
+# 반환: {side, price, quantity}, 호가창에 없는 주문이면 nil,
+#       호출 측이 조회한 위치(location)와 현재 위치가 다르면 -1 (키를 다시 구해 재시도)
+REMOVE_ORDER_LUA = _PUBLISH_DELTA + """
+local index, prices, level, depth, count, version, dirty = unpack(KEYS)
+local property_id, order_id, expected, channel, window = unpack(ARGV)
+local location = redis.call('HGET', index, order_id)
+if not location then
+    return nil
+end
+if location ~= expected then
+    return -1
+end
+window = tonumber(window)
+local side, price = string.match(location, '^(%a+):(%d+)$')
+local quantity = tonumber(redis.call('HGET', level, order_id) or '0')
+local before = top_prices(prices, side, window)
+
+redis.call('HDEL', level, order_id)
+redis.call('HDEL', index, order_id)
+if redis.call('EXISTS', level) == 0 then
+    redis.call('ZREM', prices, price)
+    redis.call('HDEL', depth, price)
+    redis.call('HDEL', count, price)
+else
+    redis.call('HINCRBY', depth, price, -quantity)
+    redis.call('HINCRBY', count, price, -1)
+end
+local seq = redis.call('INCR', version)
+redis.call('SADD', dirty, property_id)
+local changes = {}
+append_window_changes(changes, {[price] = true}, side, before, top_prices(prices, side, window), depth, count)
+publish_delta(channel, property_id, seq, changes)
+return {side, price, quantity}
+"""
+
+# KEYS: index, version, buy prices, buy depth, buy count, sell prices, sell depth, sell count,
+#       대상 주문별 level (ARGV 반복 순서와 같음)
+# ARGV: property_id, channel, depth, (side, price, order_id, 남은 수량) 반복
+# 잔량 0이면 제거, 아니면 잔량 갱신. 매칭 중 취소되어 호가창에 없는 주문은 건너뜀.
+# 반환: 새 seq
+APPLY_FILLS_LUA = _PUBLISH_DELTA + """
+local index, version = KEYS[1], KEYS[2]
+local side_keys = {
+    buy = {prices = KEYS[3], depth = KEYS[4], count = KEYS[5]},
+    sell = {prices = KEYS[6], depth = KEYS[7], count = KEYS[8]},
+}
+local property_id, channel, window = ARGV[1], ARGV[2], tonumber(ARGV[3])
+local levels, seen, before = {}, {}, {}
+for i = 4, #ARGV, 4 do
+    local side, price, order_id, remaining = ARGV[i], ARGV[i + 1], ARGV[i + 2], tonumber(ARGV[i + 3])
+    local level = KEYS[9 + (i - 4) / 4]
+    local keys = side_keys[side]
+    if not before[side] then
+        before[side] = top_prices(keys.prices, side, window)
+    end
+    local quantity = redis.call('HGET', level, order_id)
+    if quantity then
+        if remaining == 0 then
+            redis.call('HDEL', level, order_id)
+            redis.call('HDEL', index, order_id)
+            redis.call('HINCRBY', keys.count, price, -1)
+        else
+            redis.call('HSET', level, order_id, remaining)
+        end
+        redis.call('HINCRBY', keys.depth, price, remaining - tonumber(quantity))
+    end
+    if not seen[level] then
+        seen[level] = true
+        table.insert(levels, {side, price, level})
+    end
+end
+
+local changed = {buy = {}, sell = {}}
+for _, entry in ipairs(levels) do
+    local side, price, level = entry[1], entry[2], entry[3]
+    local keys = side_keys[side]
+    changed[side][price] = true
+    if redis.call('EXISTS', level) == 0 then
+        redis.call('ZREM', keys.prices, price)
+        redis.call('HDEL', keys.depth, price)
+        redis.call('HDEL', keys.count, price)
+    end
+end
+local changes = {}
+for _, side in ipairs({'buy', 'sell'}) do
+    if before[side] then
+        local keys = side_keys[side]
+        append_window_changes(changes, changed[side], side, before[side], top_prices(keys.prices, side, window),
+                              keys.depth, keys.count)
+    end
+end
+local seq = redis.call('INCR', version)
+publish_delta(channel, property_id, seq, changes)
+return seq
+"""
+
+add_order_script = REDIS_CLIENT.register_script(ADD_ORDER_LUA)
+remove_order_script = REDIS_CLIENT.register_script(REMOVE_ORDER_LUA)
+apply_fills_script = REDIS_CLIENT.register_script(APPLY_FILLS_LUA)
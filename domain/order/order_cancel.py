@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException, Request
-from core.settings import DB_CONFIG, REDIS_CLIENT
+from fastapi import APIRouter, HTTPException, Request, Header
+from core.async_mysql_connector import get_async_db_connection
 from core.jwt import extract_user_id
-from core.redis import update_order_book_in_redis
+from domain.order.outbox import OUTBOX_REMOVE, enqueue_book_change, apply_removed_order
+from domain.order.idempotency import (
+    IDEMPOTENCY_KEY_MAX_LENGTH, request_fingerprint, get_cached_response, cache_response, claim_key, store_response,
+)
+from typing import Optional
 import pymysql
-import json
 
 # 라우터 생성
 router = APIRouter()
 
 @router.delete("/{order_id}")
-async def cancel_order(order_id: int, request: Request):
+async def cancel_order(
+        order_id: int,
+        request: Request,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+):
     # 쿠키에서 JWT 가져오기
     token = request.cookies.get("access_token")
     if not token:
@@ -21,77 +28,75 @@ async def cancel_order(order_id: int, request: Request):
     except ValueError as e:
         raise HTTPException(status_code=401, detail=f"토큰 유효 X: {e}")
 
-    try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        # 1. 주문 정보 가져오기
-        query = """
-            SELECT property_detail_id, status, order_type, price_per_token, quantity 
-            FROM Order_Archive 
-            WHERE id = %s AND user_id = %s
-        """
-        cursor.execute(query, (order_id, user_id))
-        order = cursor.fetchone()
-
-        if not order:
-            raise HTTPException(status_code=404, detail="해당 주문을 찾을 수 없음")
-
-        property_id, status, order_type, price_per_token, quantity = order
-
-        if status != "normal":
-            raise HTTPException(status_code=400, detail="해당 주문은 취소할 수 없는 상태")
-
-        # 2. 주문 상태를 "cancelled"로 변경
-        cursor.execute(
-            "UPDATE Order_Archive SET status = 'cancelled' WHERE id = %s",
-            (order_id,)
-        )
-        conn.commit()
+    fingerprint = request_fingerprint("cancel", order_id)
+    if idempotency_key:
+        cached = await get_cached_response(user_id, idempotency_key, fingerprint)
+        if cached is not None:
+            return cached
 
-        # 3. 주문 복원 로직
-        if order_type == "buy":
-            # 매수 주문 취소 -> 주문가능금액 복원
-            total_cost = price_per_token * quantity
-            cursor.execute(
-                "UPDATE Users SET orderable_balance = orderable_balance + %s WHERE id = %s",
-                (total_cost, user_id)
-            )
-        elif order_type == "sell":
-            # 매도 주문 취소 -> 거래가능토큰수 복원
-            cursor.execute(
-                """
-                UPDATE Ownerships 
-                SET tradeable_tokens = tradeable_tokens + %s 
-                WHERE user_id = %s AND property_detail_id = %s
-                """,
-                (quantity, user_id, property_id)
-            )
-        conn.commit()
-
-        # 4. Redis 호가창에서 해당 주문 삭제
-        redis_key = f"order_book:{property_id}"
-        existing_order_book = REDIS_CLIENT.hget(redis_key, "order_book")
-        if existing_order_book:
-            order_book = json.loads(existing_order_book)
-            order_list = order_book.get(order_type, {}).get(str(price_per_token), [])
-
-            # 주문 ID로 해당 주문 제거
-            order_list = [o for o in order_list if o["order_id"] != order_id]
-
-            # 주문 목록이 비어 있으면 해당 가격 레벨 삭제
-            if order_list:
-                order_book[order_type][str(price_per_token)] = order_list
-            else:
-                del order_book[order_type][str(price_per_token)]
-
-            # Redis에 업데이트
-            update_order_book_in_redis(property_id, order_book)
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            if idempotency_key:
+                stored = await claim_key(cursor, user_id, idempotency_key, fingerprint)
+                if stored is not None:
+                    await cache_response(user_id, idempotency_key, fingerprint, stored)
+                    return stored
+
+            # 1. 주문 정보 가져오기 (행 잠금: 동시에 진행 중인 체결 정산이 끝난 뒤의 잔량 기준으로 복원)
+            query = """
+                SELECT property_detail_id, status, order_type, price_per_token, quantity 
+                FROM Order_Archive 
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE
+            """
+            await cursor.execute(query, (order_id, user_id))
+            order = await cursor.fetchone()
+
+            if not order:
+                raise HTTPException(status_code=404, detail="해당 주문을 찾을 수 없음")
+
+            property_id, status, order_type, price_per_token, quantity = order
+
+            if status != "normal":
+                raise HTTPException(status_code=400, detail="해당 주문은 취소할 수 없는 상태")
+
+            # 2. 주문 상태를 "cancelled"로 변경 (조건부 UPDATE: 동시 취소 시 한 번만 복원)
+            if not await cursor.execute(
+                "UPDATE Order_Archive SET status = 'cancelled' WHERE id = %s AND status = 'normal'",
+                (order_id,)
+            ):
+                raise HTTPException(status_code=400, detail="해당 주문은 취소할 수 없는 상태")
+
+            # 3. 주문 복원 로직
+            if order_type == "buy":
+                # 매수 주문 취소 -> 주문가능금액 복원
+                total_cost = price_per_token * quantity
+                await cursor.execute(
+                    "UPDATE Users SET orderable_balance = orderable_balance + %s WHERE id = %s",
+                    (total_cost, user_id)
+                )
+            elif order_type == "sell":
+                # 매도 주문 취소 -> 거래가능토큰수 복원
+                await cursor.execute(
+                    """
+                    UPDATE Ownerships 
+                    SET tradeable_tokens = tradeable_tokens + %s 
+                    WHERE user_id = %s AND property_detail_id = %s
+                    """,
+                    (quantity, user_id, property_id)
+                )
+            # 상태 변경, 복원, 아웃박스 행을 한 트랜잭션으로 커밋
+            outbox_id = await enqueue_book_change(cursor, property_id, order_id, OUTBOX_REMOVE)
+            response = {"message": "주문이 성공적으로 취소", "order_id": order_id}
+            if idempotency_key:
+                await store_response(cursor, user_id, idempotency_key, response)
+            await conn.commit()
 
     except pymysql.MySQLError as e:
         raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
 
-    return {"message": "주문이 성공적으로 취소", "order_id": order_id}
\ No newline at end of file
+    if idempotency_key:
+        await cache_response(user_id, idempotency_key, fingerprint, response)
+    # 4. Redis 호가창에서 해당 주문 삭제 (주문 ID 인덱스로 바로 조회, 변경분 발행)
+    await apply_removed_order(outbox_id, property_id, order_id)
+    return response
\ No newline at end of file
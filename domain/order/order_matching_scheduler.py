@@ -1,287 +1,273 @@
 import asyncio
-import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 import pymysql
-from core.settings import REDIS_CLIENT, DB_CONFIG
-from core.redis import update_order_book_in_redis
-
-def match_orders(property_id: int):
+from core.leader import ensure_leader
+from core.mysql_connector import get_db_connection, fetch_all
+from domain.order.order_book import (
+    BUY, SELL, load_order_book, apply_fills, remove_order,
+    mark_books_dirty, pop_dirty_books, discover_active_books,
+)
+from domain.order.clearing_price import find_clearing_price
+from domain.order.settlement import StaleOrdersError, compute_fills, compute_continuous_fills, settle_fills
+
+# 매칭 워커 풀: 블로킹 DB/Redis 작업을 이벤트 루프 밖에서 실행
+MATCHING_WORKERS = int(os.getenv("MATCHING_WORKERS", 4))
+matching_executor = ThreadPoolExecutor(max_workers=MATCHING_WORKERS, thread_name_prefix="matching")
+# 매칭 워커 풀에 제출되어 아직 끝나지 않은 작업 (리더 상실/종료 시 모두 끝날 때까지 대기)
+_pending_jobs = set()
+
+# 매물별 락: 하나의 호가창은 동시에 하나의 워커만 매칭
+_property_locks = {}
+_property_locks_guard = threading.Lock()
+
+# 이전 기록(Property_History) 일괄 저장 단위 (매물 수)
+HISTORY_BATCH_SIZE = 1000
+
+# 현재 접속 매매 중인 매물 (continuous_matching에서 장 시작/마감 시 갱신)
+_continuous_property_ids = frozenset()
+
+
+def run_matching(func, *args):
+    """매칭 워커 풀에서 func 실행 (awaitable 반환). 취소하면 아직 시작하지 않은 작업은 실행되지 않음."""
+    future = matching_executor.submit(func, *args)
+    _pending_jobs.add(future)
+    future.add_done_callback(_pending_jobs.discard)
+    return asyncio.wrap_future(future)
+
+
+def wait_matching_idle():
+    """매칭 워커 풀에서 진행 중인 작업이 모두 끝날 때까지 대기 (리더 상실/종료 시 run_as_leader on_stop)."""
+    wait(list(_pending_jobs))
+
+
+def get_property_lock(property_id: int) -> threading.Lock:
+    with _property_locks_guard:
+        lock = _property_locks.get(property_id)
+        if lock is None:
+            lock = _property_locks[property_id] = threading.Lock()
+        return lock
+
+def fix_stale_orders(property_id: int, error: StaleOrdersError, touched):
+    """
+    DB와 다른 호가창 주문 정리: 미체결이 아닌 주문은 제거, 수량이 다른 주문은 DB 수량으로 갱신 (순서 유지).
+    """
+    orders = {order.order_id: order for order in touched}
+    updated = [(orders[order_id].side, orders[order_id].price, order_id, quantity)
+               for order_id, quantity in error.quantities.items()]
+    if updated:
+        apply_fills(property_id, [], updated)
+    for order_id in error.order_ids:
+        if order_id not in error.quantities:
+            remove_order(property_id, order_id)
+
+def match_orders(property_id: int) -> bool:
+    """단일가 매매 1회 실행. DB 에러로 처리하지 못하면 False."""
     # 1. 호가창 정보 가져오기
-    redis_key = f"order_book:{property_id}"
-    order_book_data = REDIS_CLIENT.hget(redis_key, "order_book")
+    book = load_order_book(property_id)
 
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        # 2. 호가창에 주문이 없을 경우
-        if not order_book_data:
-            print(f"[{datetime.now()}] 호가창에 주문이 없음: property_id={property_id}")
-            save_previous_record_if_needed(cursor, property_id)
-            conn.commit()
-            return
-
-        order_book = json.loads(order_book_data)
-        buy_orders = order_book.get("buy", {})
-        sell_orders = order_book.get("sell", {})
-
-        # 3. 단일가 찾기
-        print(f"[{datetime.now()}] 단일가 매매 실행: property_id={property_id}")
-        max_traded_price, max_quantity = find_single_price(buy_orders, sell_orders)
-
-        # 3-1. 단일가 매칭이 없는 경우
-        if max_traded_price is None:
-            print(f"[{datetime.now()}] 매칭 가능한 단일가가 없음: property_id={property_id}")
-            save_previous_record_if_needed(cursor, property_id)
-            conn.commit()
-            return
-
-        print(f"[{datetime.now()}] property_id={property_id} 단일가: {max_traded_price}")
-
-        max_traded_price = int(max_traded_price)
-
-        # 4. 단일가 이상/이하 주문 필터링 및 정렬
-        sell_prices = sorted(
-            [price for price in sell_orders.keys() if int(price) <= int(max_traded_price)]
-        )  # 낮은 가격 우선
-        buy_prices = sorted(
-            [price for price in buy_orders.keys() if int(price) >= int(max_traded_price)],
-            reverse=True
-        )  # 높은 가격 우선
-
-        # 5. 매칭 실행
-        for sell_price in sell_prices:
-            for buy_price in buy_prices:
-                sell_orders_at_price = sell_orders[sell_price]
-                buy_orders_at_price = buy_orders[buy_price]
-
-                while sell_orders_at_price and buy_orders_at_price:
-                    sell_order = sell_orders_at_price[0]  # FIFO: 첫 번째 매도 주문
-                    buy_order = buy_orders_at_price[0]  # FIFO: 첫 번째 매수 주문
-
-                    matched_quantity = min(sell_order["quantity"], buy_order["quantity"])
-                    total_transaction_value = matched_quantity * max_traded_price
-
-                    # 5-1. 매수자 정보 조회
-                    cursor.execute("""
-                        SELECT user_id, price_per_token
-                        FROM Order_Archive
-                        WHERE id = %s
-                    """, (buy_order["order_id"],))
-                    buy_order_details = cursor.fetchone()
-                    buy_user_id, buy_price_per_token = buy_order_details
-
-                    # 5-2. 매도자 정보 조회
-                    cursor.execute("""
-                        SELECT user_id
-                        FROM Order_Archive
-                        WHERE id = %s
-                    """, (sell_order["order_id"],))
-                    sell_order_details = cursor.fetchone()
-                    sell_user_id = sell_order_details[0]
-
-                    # 5-3. 매수자 업데이트
-                    refund_amount = (buy_price_per_token - int(max_traded_price)) * matched_quantity
-                    cursor.execute("""
-                        UPDATE Users
-                        SET total_balance = total_balance - %s,
-                            orderable_balance = orderable_balance + %s
-                        WHERE id = %s
-                    """, (total_transaction_value, refund_amount, buy_user_id))
-
-                    # 매수자 소유권 업데이트: 존재 여부 확인
-                    cursor.execute("""
-                        SELECT quantity, tradeable_tokens, buy_price
-                        FROM Ownerships
-                        WHERE user_id = %s AND property_detail_id = %s
-                    """, (buy_user_id, property_id))
-                    ownership = cursor.fetchone()
-
-                    if ownership:
-                        # 기존 소유권이 있으면 UPDATE
-                        existing_quantity = ownership[0]
-                        existing_buy_price = ownership[2]
-
-                        # 가중 평균 계산: 새로운 평단가
-                        total_quantity = existing_quantity + matched_quantity
-                        new_buy_price = (
-                                                (existing_quantity * existing_buy_price) + (
-                                                    matched_quantity * max_traded_price)
-                                        ) / total_quantity
-
-                        cursor.execute("""
-                            UPDATE Ownerships
-                            SET quantity = quantity + %s,
-                                tradeable_tokens = tradeable_tokens + %s,
-                                buy_price = %s
-                            WHERE user_id = %s AND property_detail_id = %s
-                        """, (matched_quantity, matched_quantity, new_buy_price, buy_user_id, property_id))
-                    else:
-                        # 기존 소유권이 없으면 INSERT
-                        cursor.execute("""
-                            INSERT INTO Ownerships (user_id, property_detail_id, quantity, tradeable_tokens, buy_price, created_at)
-                            VALUES (%s, %s, %s, %s, %s, NOW())
-                        """, (buy_user_id, property_id, matched_quantity, matched_quantity, max_traded_price))
-
-                    # 5-4. 매도자 업데이트
-                    cursor.execute("""
-                        UPDATE Users
-                        SET total_balance = total_balance + %s,
-                            orderable_balance = orderable_balance + %s
-                        WHERE id = %s
-                    """, (total_transaction_value, total_transaction_value, sell_user_id))
-
-                    # 매도자 소유권 업데이트: 남은 수량 확인
-                    cursor.execute("""
-                        SELECT quantity
-                        FROM Ownerships
-                        WHERE user_id = %s AND property_detail_id = %s
-                    """, (sell_user_id, property_id))
-                    sell_ownership = cursor.fetchone()
-
-                    if sell_ownership:
-                        remaining_quantity = sell_ownership[0] - matched_quantity
-                        if remaining_quantity > 0:
-                            # 남은 소유량 업데이트
-                            cursor.execute("""
-                                UPDATE Ownerships
-                                SET quantity = %s
-                                WHERE user_id = %s AND property_detail_id = %s
-                            """, (remaining_quantity, sell_user_id, property_id))
-                        else:
-                            # 남은 소유량이 0이면 소유권 삭제
-                            cursor.execute("""
-                                DELETE FROM Ownerships
-                                WHERE user_id = %s AND property_detail_id = %s
-                            """, (sell_user_id, property_id))
-
-                    # 5-5. 체결된 주문 새로 생성 (매수자)
-                    cursor.execute("""
-                        INSERT INTO Order_Archive (property_detail_id, user_id, order_type, price_per_token, quantity, status, created_at)
-                        SELECT property_detail_id, user_id, 'buy', %s, %s, 'fulfilled', NOW()
-                        FROM Order_Archive WHERE id = %s
-                    """, (max_traded_price, matched_quantity, buy_order["order_id"]))
-
-                    # 5-6. 체결된 주문 새로 생성 (매도자)
-                    cursor.execute("""
-                        INSERT INTO Order_Archive (property_detail_id, user_id, order_type, price_per_token, quantity, status, created_at)
-                        SELECT property_detail_id, user_id, 'sell', %s, %s, 'fulfilled', NOW()
-                        FROM Order_Archive WHERE id = %s
-                    """, (max_traded_price, matched_quantity, sell_order["order_id"]))
-
-
-                    # 5-7. 주문 수량 업데이트
-                    sell_order["quantity"] -= matched_quantity
-                    buy_order["quantity"] -= matched_quantity
-
-                    if sell_order["quantity"] == 0:
-                        sell_orders_at_price.pop(0)  # 매도 주문 완료 → 제거
-                        cursor.execute("DELETE FROM Order_Archive WHERE id = %s", (sell_order["order_id"],))
-                    else:
-                        cursor.execute("""
-                            UPDATE Order_Archive
-                            SET quantity = %s
-                            WHERE id = %s
-                        """, (sell_order["quantity"], sell_order["order_id"]))
-                        sell_orders[sell_price][0]["quantity"] = sell_order["quantity"]  # Redis 호가창 업데이트
-
-                    if buy_order["quantity"] == 0:
-                        buy_orders_at_price.pop(0)  # 매수 주문 완료 → 제거
-                        cursor.execute("DELETE FROM Order_Archive WHERE id = %s", (buy_order["order_id"],))
-                    else:
-                        cursor.execute("""
-                            UPDATE Order_Archive
-                            SET quantity = %s
-                            WHERE id = %s
-                        """, (buy_order["quantity"], buy_order["order_id"]))
-                        buy_orders[buy_price][0]["quantity"] = buy_order["quantity"]  # Redis 호가창 업데이트
-
-                    conn.commit()
-
-        # Redis 업데이트
-        REDIS_CLIENT.hset(redis_key, "order_book", json.dumps(order_book))
-
-        # 6. 체결된 단일가 기록 저장
-        cursor.execute("""
-            INSERT INTO Property_History (recorded_date, price, quantity, property_detail_id)
-            VALUES (NOW(), %s, %s, %s)
-        """, (max_traded_price, max_quantity, property_id))
-        conn.commit()
-
-        # 7. Redis Pub/Sub 메시지 발행
-        update_order_book_in_redis(property_id, order_book)
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            # 2. 호가창에 주문이 없을 경우
+            if not len(book):
+                print(f"[{datetime.now()}] 호가창에 주문이 없음: property_id={property_id}")
+                save_previous_record_if_needed(cursor, property_id)
+                conn.commit()
+                return True
+
+            # 3. 단일가 찾기
+            print(f"[{datetime.now()}] 단일가 매매 실행: property_id={property_id}")
+            max_traded_price, max_quantity = find_clearing_price(
+                [(level.price, level.quantity) for level in book.levels(BUY)],
+                [(level.price, level.quantity) for level in book.levels(SELL)],
+                reference_price=get_reference_price(cursor, property_id),
+            )
+
+            # 3-1. 단일가 매칭이 없는 경우
+            if max_traded_price is None:
+                print(f"[{datetime.now()}] 매칭 가능한 단일가가 없음: property_id={property_id}")
+                save_previous_record_if_needed(cursor, property_id)
+                conn.commit()
+                return True
+
+            print(f"[{datetime.now()}] property_id={property_id} 단일가: {max_traded_price}")
+
+            # 4. 메모리에서 전체 체결 계산 (가격-시간 우선)
+            fills, touched = compute_fills(book, max_traded_price)
+
+            # 5. 한 트랜잭션으로 일괄 정산
+            try:
+                removed, updated = settle_fills(cursor, property_id, max_traded_price, max_quantity, fills, touched)
+                ensure_leader()
+                conn.commit()
+            except StaleOrdersError as e:
+                # 호가창이 DB와 다른 경우: 정산하지 않고 호가창을 DB 기준으로 고침 (dirty 표시되어 다음 라운드에 재매칭)
+                conn.rollback()
+                print(f"[{datetime.now()}] property_id={property_id} 무효 주문 정리 후 재매칭: {e.order_ids}")
+                fix_stale_orders(property_id, e, touched)
+                return True
+            except Exception:
+                conn.rollback()
+                raise
+            print(f"[{datetime.now()}] property_id={property_id} 체결 {len(fills)}건 정산 완료")
+
+            # 6. Redis 호가창 반영 (체결된 주문만) 및 변경분 발행
+            apply_fills(property_id, removed, updated)
 
     except pymysql.MySQLError as e:
         print(f"[{datetime.now()}] DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+        return False
 
     # 체결 내역 출력
     print(f"[{datetime.now()}] 매칭된 주문이 처리되었습니다.")
+    return True
+
+def match_continuous(property_id: int) -> bool:
+    """
+    접속 매매: 교차된 호가를 먼저 들어온 주문 가격으로 즉시 체결.
+    처리하지 못하면 False (호출자가 다시 매칭하도록 표시).
+    """
+    book = load_order_book(property_id)
+    fills, touched = compute_continuous_fills(book)
+    if not fills:
+        return True
+
+    try:
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            volume = sum(fill.quantity for fill in fills)
+            try:
+                removed, updated = settle_fills(cursor, property_id, fills[-1].price, volume, fills, touched)
+                ensure_leader()
+                conn.commit()
+            except StaleOrdersError as e:
+                conn.rollback()
+                print(f"[{datetime.now()}] property_id={property_id} 무효 주문 정리 후 재매칭: {e.order_ids}")
+                fix_stale_orders(property_id, e, touched)
+                return False
+            except Exception:
+                conn.rollback()
+                raise
+            apply_fills(property_id, removed, updated)
+    except pymysql.MySQLError as e:
+        print(f"[{datetime.now()}] DB 에러: {e}")
+        return False
 
-# 단일가 찾는 함수
-def find_single_price(buy_orders, sell_orders):
-    # 매수/매도 가격 정렬
-    sorted_buy_prices = sorted(buy_orders.keys(), key=lambda x: int(x), reverse=True)  # 높은 가격 우선
-    sorted_sell_prices = sorted(sell_orders.keys(), key=lambda x: int(x))  # 낮은 가격 우선
-
-    max_traded_price = None
-    max_quantity = 0
-
-    # 단일가매매 가격 찾기
-    for buy_price in sorted_buy_prices:
-        buy_quantity = sum(order["quantity"] for order in buy_orders[buy_price])
-        for sell_price in sorted_sell_prices:
-            sell_quantity = sum(order["quantity"] for order in sell_orders[sell_price])
-            if int(buy_price) >= int(sell_price):  # 매칭 가능 조건
-                traded_quantity = min(buy_quantity, sell_quantity)
-                if traded_quantity > max_quantity:
-                    max_quantity = traded_quantity
-                    max_traded_price = sell_price
-            else:
-                break  # 매칭 불가
-
-    return max_traded_price, max_quantity
+    print(f"[{datetime.now()}] property_id={property_id} 접속 매매 체결 {len(fills)}건, 마지막 체결가 {fills[-1].price}")
+    return True
 
-# 이전 기록 저장 함수
-# 단일가 매칭이 없거나 호가창이 비어있는 경우 호출됩니다.
-def save_previous_record_if_needed(cursor, property_id):
-    print(f"[{datetime.now()}] 이전 기록 저장: property_id={property_id}")
+# 기준가(직전 체결가) 조회 함수
+def get_reference_price(cursor, property_id):
     cursor.execute("""
         SELECT price FROM Property_History
         WHERE property_detail_id = %s
         ORDER BY recorded_date DESC LIMIT 1
     """, (property_id,))
     last_record = cursor.fetchone()
+    return last_record[0] if last_record else None
 
-    price_to_record = last_record[0] if last_record else 0
+# 이전 기록 저장 함수
+# 단일가 매칭이 없거나 호가창이 비어있는 경우 호출됩니다.
+def save_previous_record_if_needed(cursor, property_id):
+    print(f"[{datetime.now()}] 이전 기록 저장: property_id={property_id}")
+    price_to_record = get_reference_price(cursor, property_id) or 0
 
     cursor.execute("""
         INSERT INTO Property_History (recorded_date, price, property_detail_id)
         VALUES (NOW(), %s, %s)
     """, (price_to_record, property_id))
 
+# 매칭을 생략한 매물 (전체 매물 중 이번 라운드에 매칭하지 않은 매물)
+def load_unmatched_property_ids(matched) -> list:
+    rows = fetch_all("SELECT id FROM Property_Detail")
+    return sorted({row.id for row in rows} - set(matched))
+
+# 여러 매물의 이전 기록을 한 번에 저장 (호가창 변경이 없어 매칭을 생략한 매물)
+# 매 라운드 전체 매물에 기록을 남김 (주문이 없는 매물도 포함, 차트/기준가 조회용)
+def save_previous_records(property_ids):
+    for start in range(0, len(property_ids), HISTORY_BATCH_SIZE):
+        _save_previous_records(property_ids[start:start + HISTORY_BATCH_SIZE])
+
+def _save_previous_records(property_ids):
+    placeholders = ", ".join(["%s"] * len(property_ids))
+    try:
+        with get_db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT ph.property_detail_id, ph.price
+                FROM Property_History ph
+                JOIN (
+                    SELECT property_detail_id, MAX(recorded_date) AS recorded_date
+                    FROM Property_History
+                    WHERE property_detail_id IN ({placeholders})
+                    GROUP BY property_detail_id
+                ) latest USING (property_detail_id, recorded_date)
+            """, property_ids)
+            last_prices = dict(cursor.fetchall())
+            cursor.executemany("""
+                INSERT INTO Property_History (recorded_date, price, property_detail_id)
+                VALUES (NOW(), %s, %s)
+            """, [(last_prices.get(property_id) or 0, property_id) for property_id in property_ids])
+            conn.commit()
+    except pymysql.MySQLError as e:
+        print(f"[{datetime.now()}] DB 에러: {e}")
+
+
+def set_continuous_properties(property_ids):
+    global _continuous_property_ids
+    _continuous_property_ids = frozenset(property_ids)
+
+
+# 워커에서 실행: 매물 락을 잡고 매칭 (접속 매매 중인 매물은 접속 매매, 나머지는 단일가 매매)
+def match_property(property_id: int) -> bool:
+    with get_property_lock(property_id):
+        if property_id in _continuous_property_ids:
+            return match_continuous(property_id)
+        return match_orders(property_id)
+
+
+# 매칭 라운드 1회: 주문 추가/취소가 있었던(dirty) 매물만 워커 풀에 분배
+# 나머지 매물은 매칭 없이 이전 기록만 일괄 저장 (매칭 결과가 같으므로)
+async def run_matching_round():
+    dirty = await run_matching(pop_dirty_books)
+    changed = sorted(dirty)
+
+    results = await asyncio.gather(
+        *(run_matching(match_property, pid) for pid in changed),
+        return_exceptions=True,
+    )
+    failed = []
+    for property_id, result in zip(changed, results):
+        if isinstance(result, Exception):
+            print(f"[{datetime.now()}] 매칭 실패: property_id={property_id}, {result}")
+        if result is not True:
+            failed.append(property_id)
+    # 실패한 매물은 다음 라운드에 다시 매칭
+    await run_matching(mark_books_dirty, failed)
+
+    unchanged = await run_matching(load_unmatched_property_ids, changed)
+    await run_matching(save_previous_records, unchanged)
+    return changed, unchanged
 
 
 # 단일가 매매 스케줄러
 async def periodic_matching(interval: int = 300):
-    conn = pymysql.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute("SELECT id FROM Property_Detail")
-        property_ids = [row[0] for row in cursor.fetchall()]
-    finally:
-        cursor.close()
-        conn.close()
+    # 시작 시 미체결 주문이 있는 매물을 모두 매칭 대상으로 표시
+    active = await run_matching(discover_active_books)
+    await run_matching(mark_books_dirty, active)
 
     while True:
-        for property_id in property_ids:
-            match_orders(property_id)
+        started = time.perf_counter()
+        try:
+            changed, unchanged = await run_matching_round()
+            elapsed = time.perf_counter() - started
+            print(f"[{datetime.now()}] 매칭 라운드 완료: 매칭 {len(changed)}건, 생략 {len(unchanged)}건, 소요 {elapsed:.3f}s")
+        except Exception as e:
+            print(f"[{datetime.now()}] 매칭 라운드 에러: {e}")
         await asyncio.sleep(interval)
 
 # 메인 실행
 if __name__ == "__main__":
     print(f"단일가 매매 스크립트 실행 중...")
-    asyncio.run(periodic_matching())
\ No newline at end of file
+    asyncio.run(periodic_matching())
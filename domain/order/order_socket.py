@@ -1,18 +1,58 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from core.websockets import manager
+from domain.order.order_book import get_order_book_snapshot
+from domain.subscription.progress import get_progress
+import json
 
 # 라우터 생성
 router = APIRouter()
 
+
+async def load_snapshot_message(property_id: int) -> str:
+    snapshot = await run_in_threadpool(get_order_book_snapshot, property_id)
+    # 청약 진행 현황도 함께 전송 (대기열이 넘쳐 버려진 subscription 메시지 복구용)
+    snapshot["subscription"] = await get_progress(property_id)
+    return json.dumps(snapshot)
+
+
+# 느린 연결의 대기열이 넘치거나 재동기화 요청 시 전송할 스냅샷
+manager.snapshot_provider = load_snapshot_message
+
+
 # WebSocket 엔드포인트
+# 프로토콜:
+#   서버 → 클라이언트
+#     {"type": "snapshot", "seq", "buy": [{"price", "quantity", "orders"}], "sell": [...],
+#      "subscription": {"quantity", "subscribers", "supply", "remaining"} | null}
+#         연결 직후 / 재동기화 요청 시 / 전송이 밀린 경우. 매수/매도 각각 상위 ORDER_BOOK_DEPTH개 레벨
+#     {"type": "delta", "seq", "ts", "changes": [{"side", "price", "quantity", "orders"}]}
+#         호가 변경 시, ts = 발행 시각 (epoch ms). 스냅샷과 같은 상위 ORDER_BOOK_DEPTH개 창 기준:
+#         창 안의 변경/창에 새로 들어온 레벨은 현재 값, 삭제되었거나 창 밖으로 밀려난 레벨은 quantity 0(레벨 삭제),
+#         창 밖에서만 바뀐 경우 changes는 빈 배열 → 클라이언트는 그대로 적용하면 되고 따로 자를 필요 없음
+#     {"type": "subscription", "ts", "quantity", "subscribers", "supply", "remaining"}
+#         청약 진행 현황 변경 시 (누적 값, seq 없음 → 호가 delta의 seq 누락 검사 대상이 아님)
+#   클라이언트 → 서버
+#     {"type": "resync"}  수신한 delta의 seq가 (마지막 seq + 1)보다 크면(누락) 스냅샷 재요청
+#   클라이언트는 첫 스냅샷 이전의 delta와 seq가 마지막 seq 이하인 delta를 무시.
 @router.websocket("/{property_id}")
 async def websocket_endpoint(websocket: WebSocket, property_id: int):
     await manager.connect(websocket, property_id)
+    manager.send_snapshot(websocket, property_id)
     try:
         while True:
             data = await websocket.receive_text()  # WebSocket 연결 유지
-            print(f"Received WebSocket message from client: {data}")
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                message = None
+            if isinstance(message, dict) and message.get("type") == "resync":
+                manager.send_snapshot(websocket, property_id)
+            else:
+                print(f"Received WebSocket message from client: {data}")
     except WebSocketDisconnect:
-        manager.disconnect(websocket, property_id)
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
\ No newline at end of file
+        print(f"WebSocket error: {e}")
+    finally:
+        manager.disconnect(websocket, property_id)
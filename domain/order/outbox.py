@@ -0,0 +1,130 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+import pymysql
+import redis
+from core.mysql_connector import get_db_connection
+from core.async_mysql_connector import execute
+from domain.order.order_book import add_order, remove_order
+from domain.order.order_matching_scheduler import get_property_lock
+from domain.order.idempotency import purge_expired_keys
+
+# 트랜잭셔널 아웃박스: 주문/취소와 같은 트랜잭션에 "호가창 반영 대기" 행을 기록
+# - 커밋 직후 요청 처리 중에 바로 반영하고 행을 삭제 (정상 경로)
+# - 반영 전에 프로세스가 죽거나 Redis 오류가 나면 릴레이 작업이 남은 행을 순서대로 재처리
+#   릴레이는 OUTBOX_GRACE_SECONDS보다 오래된 행만 처리 (요청 처리 중 반영 중인 행을 다시 반영하지 않도록)
+OUTBOX_ADD = "add"
+OUTBOX_REMOVE = "remove"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_GRACE_SECONDS = int(os.getenv("OUTBOX_GRACE_SECONDS", 5))
+IDEMPOTENCY_PURGE_INTERVAL = 3600  # 초
+
+
+async def enqueue_book_change(cursor, property_id: int, order_id: int, action: str) -> int:
+    """호출자의 트랜잭션 안에서 아웃박스 행 추가, 행 ID 반환."""
+    await cursor.execute("""
+        INSERT INTO Order_Book_Outbox (action, order_id, property_detail_id, created_at)
+        VALUES (%s, %s, %s, NOW())
+    """, (action, order_id, property_id))
+    return cursor.lastrowid
+
+
+async def _complete(outbox_id: int):
+    await execute("DELETE FROM Order_Book_Outbox WHERE id = %s", (outbox_id,))
+
+
+async def apply_added_order(outbox_id: int, property_id: int, order_id: int, side: str, price: int, quantity: int):
+    """주문 커밋 직후 호가창 반영. 실패해도 주문은 유효하며 릴레이가 재처리."""
+    try:
+        await run_in_threadpool(add_order, property_id, order_id, side, price, quantity)
+        await _complete(outbox_id)
+    except (redis.RedisError, pymysql.MySQLError) as e:
+        print(f"[{datetime.now()}] 호가창 반영 지연 (릴레이 재처리): order_id={order_id}, {e}")
+
+
+async def apply_removed_order(outbox_id: int, property_id: int, order_id: int):
+    """
+    취소 커밋 직후 호가창에서 제거.
+    호가창에 아직 없던 주문(추가가 릴레이 대기 중)이면 행을 남겨 두어, 릴레이가 추가 이후에 제거하도록 함.
+    """
+    try:
+        removed = await run_in_threadpool(remove_order, property_id, order_id)
+        if removed is not None:
+            await _complete(outbox_id)
+    except (redis.RedisError, pymysql.MySQLError) as e:
+        print(f"[{datetime.now()}] 호가창 제거 지연 (릴레이 재처리): order_id={order_id}, {e}")
+
+
+def _relay_add(cursor, property_id: int, order_id: int):
+    # 매칭과 겹치지 않도록 매물 락 안에서 현재 주문 상태를 확인 후 반영
+    # (체결/취소된 주문은 건너뜀, 부분 체결 주문은 이미 호가창에 있으므로 add_order가 무시)
+    with get_property_lock(property_id):
+        cursor.execute(
+            "SELECT order_type, price_per_token, quantity, status FROM Order_Archive WHERE id = %s",
+            (order_id,)
+        )
+        order = cursor.fetchone()
+        cursor.connection.rollback()  # 다음 조회가 최신 상태를 보도록 읽기 트랜잭션 종료
+        if order is not None and order.status == "normal" and order.quantity > 0:
+            add_order(property_id, order_id, order.order_type, order.price_per_token, order.quantity)
+
+
+def drain_outbox(batch_size: int = OUTBOX_BATCH_SIZE, grace: int = OUTBOX_GRACE_SECONDS) -> int:
+    """grace초보다 오래 남은 아웃박스 행을 ID 순서대로 반영하고 삭제. 처리한 행 수 반환."""
+    with get_db_connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT id, action, order_id, property_detail_id
+            FROM Order_Book_Outbox
+            WHERE created_at < NOW() - INTERVAL %s SECOND
+            ORDER BY id
+            LIMIT %s
+        """, (grace, batch_size))
+        entries = cursor.fetchall()
+        conn.rollback()
+
+        done = []
+        for entry in entries:
+            try:
+                if entry.action == OUTBOX_ADD:
+                    _relay_add(cursor, entry.property_detail_id, entry.order_id)
+                else:
+                    remove_order(entry.property_detail_id, entry.order_id)
+            except redis.RedisError as e:
+                # 순서를 지키기 위해 실패 지점에서 중단하고 다음 주기에 이어서 처리
+                print(f"[{datetime.now()}] 아웃박스 릴레이 중단: outbox_id={entry.id}, {e}")
+                break
+            done.append(entry.id)
+
+        if done:
+            placeholders = ", ".join(["%s"] * len(done))
+            cursor.execute(f"DELETE FROM Order_Book_Outbox WHERE id IN ({placeholders})", done)
+            conn.commit()
+        return len(done)
+
+
+def purge_idempotency_keys() -> int:
+    with get_db_connection() as conn, conn.cursor() as cursor:
+        purged = purge_expired_keys(cursor)
+        conn.commit()
+        return purged
+
+
+# 아웃박스 릴레이 (리더 워커에서 실행)
+async def relay_order_book_outbox(interval: float = 1.0):
+    last_purge = 0.0
+    while True:
+        relayed = 0
+        try:
+            relayed = await run_in_threadpool(drain_outbox)
+            if relayed:
+                print(f"[{datetime.now()}] 아웃박스 재처리: {relayed}건")
+            if time.monotonic() - last_purge > IDEMPOTENCY_PURGE_INTERVAL:
+                await run_in_threadpool(purge_idempotency_keys)
+                last_purge = time.monotonic()
+        except pymysql.MySQLError as e:
+            print(f"[{datetime.now()}] 아웃박스 릴레이 DB 에러: {e}")
+        # 가득 찬 배치면 바로 이어서 처리
+        if relayed < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(interval)
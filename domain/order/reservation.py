@@ -0,0 +1,64 @@
+from fastapi import HTTPException
+from domain.order.order_book import BUY, SELL
+
+# 주문 접수: 잔고/토큰 예약(조건부 UPDATE)과 주문 기록을 한 트랜잭션으로 처리
+# - SELECT 후 비교하지 않고 UPDATE ... WHERE 잔고 >= 필요량 으로 차감 → 동시 주문에도 초과 사용 불가
+# - 영향받은 행이 0이면 예약 실패 (실패 원인 구분용 조회는 실패 경로에서만 실행)
+
+RESERVE_BALANCE_QUERY = """
+    UPDATE Users
+    SET orderable_balance = orderable_balance - %s
+    WHERE id = %s AND orderable_balance >= %s
+"""
+
+RESERVE_TOKENS_QUERY = """
+    UPDATE Ownerships
+    SET tradeable_tokens = tradeable_tokens - %s
+    WHERE user_id = %s AND property_detail_id = %s AND tradeable_tokens >= %s
+"""
+
+INSERT_ORDER_QUERY = """
+    INSERT INTO Order_Archive (property_detail_id, user_id, order_type, price_per_token, quantity, status, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, NOW())
+"""
+
+
+async def reserve_buy(cursor, user_id: int, total_cost: int):
+    """주문가능금액 예약. 부족하면 HTTPException."""
+    if await cursor.execute(RESERVE_BALANCE_QUERY, (total_cost, user_id, total_cost)):
+        return
+    await cursor.execute("SELECT 1 FROM Users WHERE id = %s", (user_id,))
+    if not await cursor.fetchone():
+        raise HTTPException(status_code=404, detail="유저 정보를 찾을 수 없습니다.")
+    raise HTTPException(status_code=400, detail="주문 가능한 잔액 부족")
+
+
+async def reserve_sell(cursor, user_id: int, property_id: int, quantity: int):
+    """거래가능토큰 예약. 부족하면 HTTPException."""
+    if await cursor.execute(RESERVE_TOKENS_QUERY, (quantity, user_id, property_id, quantity)):
+        return
+    await cursor.execute(
+        "SELECT 1 FROM Ownerships WHERE user_id = %s AND property_detail_id = %s",
+        (user_id, property_id)
+    )
+    if not await cursor.fetchone():
+        raise HTTPException(status_code=404, detail="해당 토큰을 소유하고 있지 않음")
+    raise HTTPException(status_code=400, detail="매도에 필요한 거래 가능 토큰이 부족")
+
+
+async def reserve_and_record_order(cursor, user_id: int, property_id: int, side: str,
+                                   price_per_token: int, quantity: int) -> int:
+    """
+    잔고/토큰 예약 + Order_Archive 기록, 주문 ID 반환 (커밋은 호출자가 수행).
+    예약에 실패하면 HTTPException (커밋 전이므로 연결 반납 시 rollback).
+    """
+    if side == BUY:
+        await reserve_buy(cursor, user_id, price_per_token * quantity)
+    elif side == SELL:
+        await reserve_sell(cursor, user_id, property_id, quantity)
+    else:
+        raise ValueError(f"unknown side: {side}")
+
+    await cursor.execute(INSERT_ORDER_QUERY, (
+        property_id, user_id, side, price_per_token, quantity, "normal"))
+    return cursor.lastrowid
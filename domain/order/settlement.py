@@ -0,0 +1,210 @@
+from collections import defaultdict
+from domain.order.order_book import BUY, SELL, OrderBook
+
+
+class StaleOrdersError(Exception):
+    """
+    호가창(Redis)에는 남아 있지만 DB와 다른 주문.
+    order_ids: 더 이상 미체결이 아니거나(정산 직전에 취소됨 등) 수량이 다른 주문 전체,
+    quantities: 그중 미체결이지만 DB 수량이 호가창과 다른 주문의 DB 수량 (이미 다른 정산에서 일부 체결됨 등).
+    """
+
+    def __init__(self, order_ids, quantities=None):
+        super().__init__(f"stale orders: {order_ids}")
+        self.order_ids = order_ids
+        self.quantities = quantities or {}
+
+
+class Fill:
+    __slots__ = ("buy_order_id", "sell_order_id", "buy_limit_price", "quantity", "price")
+
+    def __init__(self, buy_order_id: int, sell_order_id: int, buy_limit_price: int, quantity: int, price: int):
+        self.buy_order_id = buy_order_id
+        self.sell_order_id = sell_order_id
+        self.buy_limit_price = buy_limit_price
+        self.quantity = quantity
+        self.price = price
+
+
+def compute_fills(book: OrderBook, price: int):
+    """
+    단일가(price)로 체결 가능한 주문을 가격-시간 우선순위로 메모리에서 매칭.
+    book은 체결 결과가 반영된 상태로 변경되며, 변경된 주문 목록을 함께 반환.
+
+    Returns:
+        (fills, touched): 체결 목록과 체결에 참여한 주문(Order) 목록
+    """
+    buys = [order for level in book.levels(BUY) if level.price >= price for order in level]
+    sells = [order for level in book.levels(SELL) if level.price <= price for order in level]
+
+    fills = []
+    touched = {}
+    i = j = 0
+    while i < len(buys) and j < len(sells):
+        buy, sell = buys[i], sells[j]
+        quantity = min(buy.quantity, sell.quantity)
+        fills.append(Fill(buy.order_id, sell.order_id, buy.price, quantity, price))
+        touched[buy.order_id] = buy
+        touched[sell.order_id] = sell
+        book.reduce(buy.order_id, quantity)
+        book.reduce(sell.order_id, quantity)
+        if buy.quantity == 0:
+            i += 1
+        if sell.quantity == 0:
+            j += 1
+    return fills, list(touched.values())
+
+
+def compute_continuous_fills(book: OrderBook):
+    """
+    접속 매매: 최우선 매수가 >= 최우선 매도가인 동안 각 가격 레벨의 맨 앞 주문끼리 체결.
+    체결가는 먼저 접수된 주문(호가창에 대기 중이던 주문)의 가격.
+    book은 체결 결과가 반영된 상태로 변경되며, 반환 형식은 compute_fills와 같음.
+    """
+    fills = []
+    touched = {}
+    while True:
+        bid, ask = book.best_price(BUY), book.best_price(SELL)
+        if bid is None or ask is None or bid < ask:
+            break
+        buy, sell = book.level(BUY, bid).head(), book.level(SELL, ask).head()
+        price = buy.price if buy.order_id < sell.order_id else sell.price
+        quantity = min(buy.quantity, sell.quantity)
+        fills.append(Fill(buy.order_id, sell.order_id, buy.price, quantity, price))
+        touched[buy.order_id] = buy
+        touched[sell.order_id] = sell
+        book.reduce(buy.order_id, quantity)
+        book.reduce(sell.order_id, quantity)
+    return fills, list(touched.values())
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+def settle_fills(cursor, property_id: int, price: int, volume: int, fills, touched):
+    """
+    체결 목록을 한 트랜잭션 안에서 일괄 정산 (commit은 호출자가 수행).
+    SQL 실행 횟수는 체결 건수가 아니라 관련 사용자 수에 비례.
+
+    Args:
+        cursor: 트랜잭션 중인 커서
+        price, volume: Property_History에 기록할 체결가(접속 매매는 마지막 체결가)와 체결 수량
+        fills: compute_fills 결과 체결 목록
+        touched: compute_fills 결과 체결에 참여한 주문 목록 (체결 후 잔량 반영)
+    """
+    order_ids = [order.order_id for order in touched]
+
+    # 체결 전 수량 = 체결 후 잔량 + 체결 수량 (호가창 기준)
+    expected = {order.order_id: order.quantity for order in touched}
+    for fill in fills:
+        expected[fill.buy_order_id] += fill.quantity
+        expected[fill.sell_order_id] += fill.quantity
+
+    # 1. 주문자/수량 조회 (한 번에). 미체결 상태인 주문만 행 잠금 후 정산 (동시 취소/다른 정산과 직렬화)
+    cursor.execute(
+        f"""
+        SELECT id, user_id, quantity FROM Order_Archive
+        WHERE id IN ({_placeholders(len(order_ids))}) AND status = 'normal'
+        FOR UPDATE
+        """,
+        order_ids,
+    )
+    rows = cursor.fetchall()
+    order_users = {row[0]: row[1] for row in rows}
+    # 호가창과 DB 수량이 다르면 이미 다른 정산에 반영된 주문 → 중복 체결하지 않도록 정산 중단
+    quantities = {row[0]: row[2] for row in rows if row[2] != expected[row[0]]}
+    if len(order_users) != len(order_ids) or quantities:
+        raise StaleOrdersError(
+            [order_id for order_id in order_ids if order_id not in order_users or order_id in quantities],
+            quantities,
+        )
+
+    # 2. 사용자별 증감 집계
+    balance_deltas = defaultdict(lambda: [0, 0])  # user_id -> [보유금액 증감, 주문가능금액 증감]
+    bought = defaultdict(lambda: [0, 0])  # user_id -> [매수 수량, 매수 금액]
+    sold = defaultdict(int)  # user_id -> 매도 수량
+    archive_rows = []
+    for fill in fills:
+        buy_user_id = order_users[fill.buy_order_id]
+        sell_user_id = order_users[fill.sell_order_id]
+        value = fill.quantity * fill.price
+
+        # 매수자: 체결 금액 차감, 주문 시 묶어둔 금액과 체결가 차액 환급
+        balance_deltas[buy_user_id][0] -= value
+        balance_deltas[buy_user_id][1] += (fill.buy_limit_price - fill.price) * fill.quantity
+        bought[buy_user_id][0] += fill.quantity
+        bought[buy_user_id][1] += value
+
+        # 매도자: 체결 금액 입금
+        balance_deltas[sell_user_id][0] += value
+        balance_deltas[sell_user_id][1] += value
+        sold[sell_user_id] += fill.quantity
+
+        archive_rows.append((property_id, buy_user_id, "buy", fill.price, fill.quantity))
+        archive_rows.append((property_id, sell_user_id, "sell", fill.price, fill.quantity))
+
+    # 3. 잔액 업데이트
+    cursor.executemany("""
+        UPDATE Users
+        SET total_balance = total_balance + %s,
+            orderable_balance = orderable_balance + %s
+        WHERE id = %s
+    """, [(total, orderable, user_id) for user_id, (total, orderable) in balance_deltas.items()])
+
+    # 4. 매수자 소유권: 신규 생성 또는 가중 평균 평단가로 갱신
+    # (buy_price는 기존 quantity 기준으로 계산해야 하므로 가장 먼저 갱신)
+    if bought:
+        cursor.executemany("""
+            INSERT INTO Ownerships (user_id, property_detail_id, quantity, tradeable_tokens, buy_price, created_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                buy_price = (quantity * buy_price + VALUES(quantity) * VALUES(buy_price)) / (quantity + VALUES(quantity)),
+                quantity = quantity + VALUES(quantity),
+                tradeable_tokens = tradeable_tokens + VALUES(tradeable_tokens)
+        """, [(user_id, property_id, quantity, quantity, cost // quantity)
+              for user_id, (quantity, cost) in bought.items()])
+
+    # 5. 매도자 소유권 차감 및 소진된 소유권 삭제
+    if sold:
+        cursor.executemany("""
+            UPDATE Ownerships
+            SET quantity = quantity - %s
+            WHERE user_id = %s AND property_detail_id = %s
+        """, [(quantity, user_id, property_id) for user_id, quantity in sold.items()])
+        cursor.execute(
+            f"""
+            DELETE FROM Ownerships
+            WHERE property_detail_id = %s AND quantity <= 0
+              AND user_id IN ({_placeholders(len(sold))})
+            """,
+            [property_id, *sold],
+        )
+
+    # 6. 체결 기록 일괄 생성
+    cursor.executemany("""
+        INSERT INTO Order_Archive (property_detail_id, user_id, order_type, price_per_token, quantity, status, created_at)
+        VALUES (%s, %s, %s, %s, %s, 'fulfilled', NOW())
+    """, archive_rows)
+
+    # 7. 미체결 주문 잔량 반영: 전량 체결은 삭제, 부분 체결은 수량 갱신
+    filled_ids = [order.order_id for order in touched if order.quantity == 0]
+    partial = [(order.quantity, order.order_id) for order in touched if order.quantity > 0]
+    if filled_ids:
+        cursor.execute(
+            f"DELETE FROM Order_Archive WHERE id IN ({_placeholders(len(filled_ids))})",
+            filled_ids,
+        )
+    if partial:
+        cursor.executemany("UPDATE Order_Archive SET quantity = %s WHERE id = %s", partial)
+
+    # 8. 체결된 단일가 기록 저장
+    cursor.execute("""
+        INSERT INTO Property_History (recorded_date, price, quantity, property_detail_id)
+        VALUES (NOW(), %s, %s, %s)
+    """, (price, volume, property_id))
+
+    # Redis 호가창 반영용 변경 목록
+    removed = [(order.side, order.price, order.order_id) for order in touched if order.quantity == 0]
+    updated = [(order.side, order.price, order.order_id, order.quantity) for order in touched if order.quantity > 0]
+    return removed, updated
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Request
-from core.settings import DB_CONFIG
+from core.async_mysql_connector import fetch_all
 from core.jwt import extract_user_id
 import pymysql
 
@@ -20,11 +20,8 @@ async def get_user_ownerships(request: Request):
         raise HTTPException(status_code=401, detail=f"유효하지 않은 토큰: {e}")
 
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
         # 한 번의 쿼리로 데이터 가져오기
-        cursor.execute(
+        results = await fetch_all(
             """
             SELECT 
                 o.property_detail_id,
@@ -46,30 +43,25 @@ async def get_user_ownerships(request: Request):
             """,
             (user_id,)
         )
-        results = cursor.fetchall()
-
-        if not results:
-            raise HTTPException(status_code=404, detail="보유 토큰 정보를 찾을 수 없습니다.")
-
-        # 데이터를 리스트로 변환
-        ownerships = [
-            {
-                "property_detail_id": row[0],
-                "quantity": row[1],
-                "buy_price": row[2],
-                "detail_floor": row[3],
-                "building_name": row[4],
-                "latest_price": row[5] if row[5] else 0,
-                "eval_value": (row[5] * row[1]) if row[5] else 0
-            }
-            for row in results
-        ]
-
     except pymysql.MySQLError as e:
         raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
+
+    if not results:
+        raise HTTPException(status_code=404, detail="보유 토큰 정보를 찾을 수 없습니다.")
+
+    # 데이터를 리스트로 변환
+    ownerships = [
+        {
+            "property_detail_id": row.property_detail_id,
+            "quantity": row.quantity,
+            "buy_price": row.buy_price,
+            "detail_floor": row.detail_floor,
+            "building_name": row.building_name,
+            "latest_price": row.latest_price if row.latest_price else 0,
+            "eval_value": (row.latest_price * row.quantity) if row.latest_price else 0
+        }
+        for row in results
+    ]
 
     return {
         "user_id": user_id,
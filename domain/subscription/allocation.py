@@ -0,0 +1,54 @@
+import numpy as np
+import os
+
+PRO_RATA = "pro_rata"
+LOTTERY = "lottery"
+
+# 초과 청약 시 배정 방식 (pro_rata: 청약 수량 비례, lottery: 무작위 순서로 전량 배정)
+ALLOCATION_METHOD = os.getenv("SUBSCRIPTION_ALLOCATION", PRO_RATA)
+
+
+def allocate(quantities, supply: int, subscription_ids=None, method: str = ALLOCATION_METHOD, seed: int = 0):
+    """
+    청약 전체에 대한 배정 수량 계산 (한 번에 벡터 연산).
+
+    청약 합계가 공급량 이하면 전량 배정. 초과 청약이면
+      - pro_rata: floor(청약 수량 × 공급량 / 청약 합계)를 배정하고, 남은 토큰은 소수점 이하가 큰 순서
+                  (같으면 먼저 접수된 청약) 으로 1개씩 추가 배정
+      - lottery:  seed로 섞은 순서대로 전량 배정, 공급량이 부족해지는 청약은 남은 수량만 배정
+    어느 방식이든 배정 합계는 min(공급량, 청약 합계)이고 청약 수량을 넘지 않음.
+
+    Args:
+        quantities: 청약 수량 배열
+        supply: 공급량 (token_supply)
+        subscription_ids: 청약 ID 배열 (pro_rata 동점 처리용, 생략 시 입력 순서)
+        seed: lottery 난수 seed (같은 매물이면 재실행해도 같은 결과가 나오도록 property_id 사용)
+
+    Returns:
+        배정 수량 배열 (int64)
+    """
+    quantities = np.asarray(quantities, dtype=np.int64)
+    supply = max(int(supply), 0)
+    demand = int(quantities.sum())
+    if demand <= supply:
+        return quantities.copy()
+
+    if method == LOTTERY:
+        order = np.random.default_rng(seed).permutation(len(quantities))
+        filled_before = np.cumsum(quantities[order]) - quantities[order]
+        allocated = np.empty_like(quantities)
+        allocated[order] = np.clip(supply - filled_before, 0, quantities[order])
+        return allocated
+
+    if method != PRO_RATA:
+        raise ValueError(f"unknown allocation method: {method}")
+
+    scaled = quantities * supply
+    allocated = scaled // demand
+    remainder = supply - int(allocated.sum())
+    if remainder:
+        ids = np.arange(len(quantities)) if subscription_ids is None else np.asarray(subscription_ids)
+        # 소수점 이하 큰 순, 같으면 ID 작은 순
+        order = np.lexsort((ids, -(scaled % demand)))
+        allocated[order[:remainder]] += 1
+    return allocated
@@ -0,0 +1,109 @@
+from core.settings import REDIS_CLIENT, REDIS_ASYNC_CLIENT
+from core.mysql_connector import get_db_connection, fetch_all
+from domain.subscription.settlement import settle_property
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 청약 마감 스케줄러
+# - subscription:deadlines (ZSET, score = 마감 시각 epoch 초, member = property_detail_id) 를 마감 시각 순 대기열로 사용
+#   score는 DB의 UNIX_TIMESTAMP(subscription_end_date) → 앱 서버 시간대와 무관, 앱 시계는 깨어날 시점 계산에만 사용
+#   매물/청약 생성 시 API 워커가 매물의 마감 시각(Property_Detail.subscription_end_date)으로 등록하고,
+#   리더 시작 시 DB에서 다시 적재 (청약별 마감 시각은 사용하지 않음)
+# - 리더는 가장 이른 마감까지 대기열 깨우기 신호(BLPOP)로 기다렸다가 마감된 매물만 정산 → 주기적 전체 조회 없음
+DEADLINES_KEY = "subscription:deadlines"
+WAKEUP_KEY = "subscription:deadlines:wakeup"
+MAX_WAIT = 60  # 초, 등록 신호를 놓쳐도 이 주기로 대기열 확인 (DB 조회 없음)
+RETRY_DELAY = 30  # 초, 정산 실패 시 재시도 간격
+NOT_DUE_DELAY = 1  # 초, DB 시계 기준으로 아직 마감 전일 때 재시도 간격
+
+
+def schedule_subscription_close(property_id: int, close_at: float):
+    """
+    매물의 청약 마감 시각 등록 후 리더를 깨움.
+    close_at은 DB에서 읽은 UNIX_TIMESTAMP(Property_Detail.subscription_end_date) (앱 서버 시간대/시계와 무관).
+    """
+    pipe = REDIS_CLIENT.pipeline(transaction=True)
+    pipe.zadd(DEADLINES_KEY, {property_id: float(close_at)})
+    pipe.lpush(WAKEUP_KEY, 1)
+    pipe.ltrim(WAKEUP_KEY, 0, 0)
+    pipe.execute()
+
+
+def load_deadlines() -> Dict[int, float]:
+    """
+    정산할 매물별 마감 시각(epoch 초, DB 기준): 청약 중인 매물, 그리고 마감 처리 후 정산이 끝나지 않은 청약이 남은 매물.
+    """
+    rows = fetch_all("""
+        SELECT id AS property_detail_id, UNIX_TIMESTAMP(subscription_end_date) AS close_at
+        FROM Property_Detail
+        WHERE subscription_status = 'pending'
+        UNION
+        SELECT DISTINCT pd.id, UNIX_TIMESTAMP(pd.subscription_end_date)
+        FROM Subscriptions s
+        JOIN Property_Detail pd ON s.property_detail_id = pd.id
+        WHERE s.status = 'pending' AND pd.subscription_status = 'fulfilled'
+    """)
+    return {row.property_detail_id: float(row.close_at) for row in rows}
+
+
+def reload_deadlines() -> int:
+    """DB 기준으로 대기열 다시 적재 (리더 시작 시)."""
+    deadlines = load_deadlines()
+    pipe = REDIS_CLIENT.pipeline(transaction=True)
+    pipe.delete(DEADLINES_KEY)
+    if deadlines:
+        pipe.zadd(DEADLINES_KEY, deadlines)
+    pipe.execute()
+    return len(deadlines)
+
+
+def settle_closed_property(property_id: int) -> Optional[int]:
+    with get_db_connection() as connection:
+        return settle_property(connection, property_id)
+
+
+async def _settle_due(now: float):
+    due = await REDIS_ASYNC_CLIENT.zrangebyscore(DEADLINES_KEY, "-inf", now)
+    for member in due:
+        property_id = int(member)
+        try:
+            # 마감 여부는 청약 접수와 같은 DB 시계로 판단 (앱 서버 시계가 빠르면 잠시 뒤 다시 시도)
+            settled = await run_in_threadpool(settle_closed_property, property_id)
+            if settled is None:
+                await REDIS_ASYNC_CLIENT.zadd(DEADLINES_KEY, {member: now + NOT_DUE_DELAY}, xx=True)
+                continue
+            await REDIS_ASYNC_CLIENT.zrem(DEADLINES_KEY, member)
+            logger.info(f"Subscription closed: property_detail_id={property_id}, {settled} subscriptions settled")
+        except Exception as e:
+            logger.error(f"Error settling subscriptions for property_detail_id={property_id}: {e}")
+            await REDIS_ASYNC_CLIENT.zadd(DEADLINES_KEY, {member: now + RETRY_DELAY}, xx=True)
+
+
+async def run_subscription_deadlines():
+    """마감 시각마다 해당 매물의 청약을 정산 (리더 워커에서 실행)."""
+    while True:
+        try:
+            loaded = await run_in_threadpool(reload_deadlines)
+            logger.info(f"Subscription deadlines loaded: {loaded} properties")
+            break
+        except Exception as e:
+            logger.error(f"Error loading subscription deadlines: {e}")
+            await asyncio.sleep(RETRY_DELAY)
+
+    while True:
+        try:
+            await _settle_due(time.time())
+            # 가장 이른 마감까지 대기 (새 마감이 등록되면 깨어나 다시 계산)
+            earliest = await REDIS_ASYNC_CLIENT.zrange(DEADLINES_KEY, 0, 0, withscores=True)
+            wait = MAX_WAIT
+            if earliest:
+                wait = min(MAX_WAIT, max(0.01, earliest[0][1] - time.time()))
+            await REDIS_ASYNC_CLIENT.blpop([WAKEUP_KEY], timeout=wait)
+        except Exception as e:
+            logger.error(f"Error in subscription deadline scheduler: {e}")
+            await asyncio.sleep(1)
@@ -1,34 +1,58 @@
 from fastapi import APIRouter, HTTPException, Request;
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 from fastapi.concurrency import run_in_threadpool
 from core.mysql_connector import get_db_connection
+from core.async_mysql_connector import get_async_db_connection
 from datetime import datetime
-import pymysql.cursors
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.base import STATE_RUNNING
-import asyncio
 from core.jwt import extract_user_id
+from domain.subscription.deadlines import schedule_subscription_close
+from domain.subscription.progress import get_progress, record_subscription
+from domain.subscription.reservation import reserve_and_record_subscription
 import logging
+import pymysql
 
 router = APIRouter()
 
 # 데이터 모델
+# 수량/가격이 0 이하이면 차감 UPDATE가 잔액을 늘리므로 입력 단계에서 거부
+# 청약 마감 시각은 매물의 마감 시각만 사용 (요청에 포함되어도 무시)
 class OwnershipRequest(BaseModel):
     property_detail_id: int
-    quantity: int
+    quantity: int = Field(gt=0)
     tradeable_tokens: int
-    buy_price: int
-    subscription_end_date: datetime
+    buy_price: int = Field(gt=0)
 
 class OwnershipRecord(OwnershipRequest):
     id: int
+    subscription_end_date: datetime
     created_at: str
 
+
+def after_subscription_commit(property_id: int, user_id: int, quantity: int, close_at: float):
+    """커밋된 청약의 Redis 후처리 (실패해도 청약은 유지). close_at은 DB 기준 마감 시각 epoch 초."""
+    # 마감 시각에 정산되도록 등록 (실패해도 매물 마감 시각 또는 리더 재시작 시 DB에서 다시 적재)
+    try:
+        schedule_subscription_close(property_id, close_at)
+    except Exception as e:
+        logger.error(f"Error scheduling subscription close: {e}")
+    # 청약 진행 현황 카운터 증가 + WebSocket 발행 (실패해도 주기적 보정에서 반영)
+    try:
+        record_subscription(property_id, user_id, quantity)
+    except Exception as e:
+        logger.error(f"Error recording subscription progress: {e}")
+
+
+# 청약 접수
+# - 잔액 차감, 남은 공급량 예약, 청약 기록을 커넥션 풀의 연결 1개, 트랜잭션 1개로 커밋
+# - 커밋 후 마감 등록/진행 현황 갱신 (Redis)
 @router.post("/subscribe", response_model=OwnershipRecord)
 async def subscribe(request: OwnershipRequest, jwt: Request):
     """
     Subscriptions 테이블에 청약 데이터를 추가하고 사용자의 주문 가능 금액과 보유 금액을 감소
+    (미배정 수량의 금액은 마감 정산 시 환급)
     """
     # 쿠키에서 JWT 가져오기
     token = jwt.cookies.get("access_token")
@@ -41,115 +65,54 @@ async def subscribe(request: OwnershipRequest, jwt: Request):
     except ValueError as e:
         raise HTTPException(status_code=401, detail=f"토큰 유효 X {e}")
 
-    total_cost = request.buy_price * request.quantity
-
-    def check_and_update_user_balance():
-        """
-        사용자의 잔액을 확인하고 주문 가능 금액과 보유 금액을 감소시킴
-        """
-        select_query = """
-            SELECT total_balance, orderable_balance
-            FROM Users
-            WHERE id = %s
-        """
-        update_query = """
-            UPDATE Users
-            SET total_balance = total_balance - %s,
-                orderable_balance = orderable_balance - %s
-            WHERE id = %s
-        """
-        try:
-            with get_db_connection() as connection:
-                with connection.cursor() as cursor:
-                    # 1. 사용자 잔액 확인
-                    cursor.execute(select_query, (user_id,))
-                    result = cursor.fetchone()
-
-                    # 2. 결과 데이터 검증
-                    if not result or len(result) != 2:
-                        raise HTTPException(status_code=404, detail="사용자 정보 없음")
-
-                    # 3. 데이터 추출 및 타입 검증
-                    total_balance, orderable_balance = result
-
-                    # 4. 잔액 비교
-                    if total_balance < total_cost or orderable_balance < total_cost:
-                        raise HTTPException(status_code=400, detail="잔액 부족")
-
-                    # 5. 사용자 잔액 업데이트
-                    cursor.execute(update_query, (total_cost, total_cost, user_id))
-                    connection.commit()
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"잔액 업데이트 실패: {e}")
-
-    def insert_subscription():
-        """
-        Subscriptions 테이블에 청약 데이터 삽입
-        """
-        query = """
-            INSERT INTO Subscriptions (user_id, property_detail_id, price_per_token, quantity, status, subscription_end_date)
-            VALUES (%s, %s, %s, %s, 'pending', %s)
-        """
-        values = (
-            user_id,
-            request.property_detail_id,
-            request.buy_price,
-            request.quantity,
-            request.subscription_end_date,
-        )
-        try:
-            with get_db_connection() as connection:
-                with connection.cursor() as cursor:
-                    cursor.execute(query, values)
-                    connection.commit()
-                    return cursor.lastrowid
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database insertion failed: {e}")
-
     try:
-        # 2. 청약 데이터 삽입
-        subscription_id = await run_in_threadpool(insert_subscription)
-
-        # 3. 응답 반환
-        return OwnershipRecord(
-            id=subscription_id,
-            property_detail_id=request.property_detail_id,
-            quantity=request.quantity,
-            tradeable_tokens=request.tradeable_tokens,
-            buy_price=request.buy_price,
-            subscription_end_date=request.subscription_end_date,
-            created_at="NOW()",
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# 특정 청약 토큰에서 청약이 완료된 토큰 합산하여 반환
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            subscription_id, deadline = await reserve_and_record_subscription(
+                cursor, user_id, request.property_detail_id, request.buy_price, request.quantity)
+            await conn.commit()
+    except pymysql.MySQLError as e:
+        raise HTTPException(status_code=500, detail=f"Database insertion failed: {e}")
+
+    await run_in_threadpool(after_subscription_commit, request.property_detail_id, user_id,
+                            request.quantity, deadline.close_at)
+
+    return OwnershipRecord(
+        id=subscription_id,
+        property_detail_id=request.property_detail_id,
+        quantity=request.quantity,
+        tradeable_tokens=request.tradeable_tokens,
+        buy_price=request.buy_price,
+        subscription_end_date=deadline.end_date,
+        created_at="NOW()",
+    )
+
+
+# 특정 청약 토큰의 청약 진행 현황 반환 (Redis 카운터, 청약마다 SUM 조회 없음)
 @router.get("/tokens/{property_detail_id}")
 async def get_total_quantity(property_detail_id: int):
     """
-    특정 property_detail_id에 해당하는 모든 quantity 합산 반환
+    특정 property_detail_id의 누적 청약 수량, 청약자 수, 남은 공급량 반환
     """
-    def fetch_total_quantity():
-        query = """
-            SELECT SUM(quantity) AS total_quantity
-            FROM Subscriptions
-            WHERE property_detail_id = %s
-        """
-        try:
-            with get_db_connection() as connection:
-                with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                    cursor.execute(query, (property_detail_id,))
-                    result = cursor.fetchone()
-                    if result and result['total_quantity'] is not None:
-                        return result['total_quantity']
-                    return 0
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
-
-    total_quantity = await run_in_threadpool(fetch_total_quantity)
-    return {"property_detail_id": property_detail_id, "total_quantity": total_quantity}
+    try:
+        progress = await get_progress(property_detail_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Progress query failed: {e}")
+    if progress is None:
+        raise HTTPException(status_code=404, detail="매물 정보 없음")
+
+    total_quantity, token_supply = progress["quantity"], progress["supply"]
+    # 초과 청약이면 마감 시 청약 수량 대비 배정 비율 (pro_rata 기준 예상치)
+    allocation_ratio = 1.0
+    if token_supply is not None and total_quantity > token_supply:
+        allocation_ratio = round(token_supply / total_quantity, 4)
+    return {
+        "property_detail_id": property_detail_id,
+        "total_quantity": total_quantity,
+        "subscribers": progress["subscribers"],
+        "token_supply": token_supply,
+        "remaining_supply": progress["remaining"],
+        "allocation_ratio": allocation_ratio,
+    }
 
 # 사용자 id를 기준으로 청약된 테이블 조회 
 @router.get("/subscriptions")
@@ -184,11 +147,11 @@ async def get_subscriptions(request: Request):
     """
     try:
         with get_db_connection() as connection:
-            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            with connection.cursor() as cursor:
                 # user_id만으로 조회
                 cursor.execute(query, (user_id))
                 subscriptions = cursor.fetchall()
-                return {"subscriptions": subscriptions}
+                return {"subscriptions": [row._asdict() for row in subscriptions]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {e}")
 
@@ -198,76 +161,3 @@ logger = logging.getLogger(__name__)
 
 # 스케줄러 초기화
 scheduler = BackgroundScheduler()
-async def move_subscriptions_to_ownerships(interval: int = 60):
-    """
-    주기적으로 Subscriptions 데이터를 확인하고 Ownerships로 이동하며, Property_Detail 상태를 업데이트.
-    """
-    while True:
-        try:
-            logging.info("Checking for subscriptions to move to ownerships...")
-            with get_db_connection() as connection:
-                with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-                    # 1. 'pending' 상태의 청약 데이터를 조회
-                    query_select = """
-                        SELECT s.id AS subscription_id, s.user_id, s.property_detail_id, s.quantity, s.price_per_token,
-                               pd.subscription_status
-                        FROM Subscriptions s
-                        JOIN Property_Detail pd ON s.property_detail_id = pd.id
-                        WHERE s.subscription_end_date <= NOW() 
-                          AND s.status = 'pending'
-                          AND pd.subscription_status = 'pending'
-                    """
-                    cursor.execute(query_select)
-                    subscriptions = cursor.fetchall()
-
-                    if not subscriptions:
-                        logging.info("No subscriptions to process.")
-                    else:
-                        for subscription in subscriptions:
-                            try:
-                                # 2. Ownerships 테이블로 데이터 이동
-                                query_insert = """
-                                    INSERT INTO Ownerships (user_id, property_detail_id, quantity, tradeable_tokens, buy_price, created_at)
-                                    VALUES (%s, %s, %s, %s, %s, %s)
-                                """
-                                cursor.execute(
-                                    query_insert,
-                                    (
-                                        subscription['user_id'],
-                                        subscription['property_detail_id'],
-                                        subscription['quantity'],
-                                        subscription['quantity'],  # tradeable_tokens
-                                        subscription['price_per_token'],
-                                        datetime.now(),  # Python에서 현재 시간 추가
-                                    ),
-                                )
-
-                                # 3. Subscriptions 상태 업데이트
-                                query_update_subscription = """
-                                    UPDATE Subscriptions
-                                    SET status = 'fulfilled'
-                                    WHERE id = %s
-                                """
-                                cursor.execute(query_update_subscription, (subscription['subscription_id'],))
-
-                                # 4. Property_Detail 상태 업데이트
-                                query_update_property = """
-                                    UPDATE Property_Detail
-                                    SET subscription_status = 'fulfilled'
-                                    WHERE id = %s
-                                """
-                                cursor.execute(query_update_property, (subscription['property_detail_id'],))
-
-                                logging.info(f"Processed subscription ID: {subscription['subscription_id']}")
-                            except Exception as e:
-                                logging.error(f"Error processing subscription ID {subscription['subscription_id']}: {e}")
-                                continue
-
-                        # 5. 변경사항 커밋
-                        connection.commit()
-                        logging.info("All subscriptions processed successfully.")
-        except Exception as e:
-            logging.error(f"Error in move_subscriptions_to_ownerships: {e}")
-
-        # 6. 주기적으로 실행
-        await asyncio.sleep(interval)
\ No newline at end of file
@@ -0,0 +1,175 @@
+from core.settings import REDIS_CLIENT, REDIS_ASYNC_CLIENT
+from core.mysql_connector import fetch_all
+from core.redis import order_book_channel
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# 청약 진행 현황 (매물별 누적 청약 수량, 청약자 수, 남은 공급량)
+# - subscription:progress:{property_id} (HASH: quantity, subscribers, supply) 에 누적 → 조회는 HMGET 1회
+# - subscription:progress:{property_id}:users (SET) 로 청약자 중복 제거
+# - 청약 시 Lua 스크립트로 증가/발행을 한 번에 처리, 리더가 주기적으로 MySQL 기준으로 다시 맞춤
+#   (청약 커밋과 카운터 증가 사이에 맞추면 최대 한 주기 동안 중복 집계될 수 있음)
+#   보정은 매물별 누적 수량(Property_Detail.subscribed_quantity)/청약자 수(COUNT DISTINCT)만 비교하고,
+#   다른 매물만 청약자 집합을 다시 적재 (청약자 수에 비례하는 작업은 어긋난 매물에서만)
+# - 변경 시 매물의 WebSocket 채널(order_book_updates:{property_id})로 발행
+#   {type: subscription, property_id, ts, quantity, subscribers, supply, remaining}
+#   호가 delta의 seq 흐름과 섞이지 않도록 seq 없이 누적 값만 전송 (스냅샷에도 같은 값 포함, order_socket.py)
+PROGRESS_PREFIX = "subscription:progress"
+PROGRESS_TTL = 24 * 60 * 60  # 초, 청약이 끝난 매물은 만료 후 조회 시 DB에서 다시 적재
+RECONCILE_INTERVAL = float(os.getenv("SUBSCRIPTION_PROGRESS_RECONCILE_INTERVAL", 30))
+
+_PUBLISH_PROGRESS = """
+local function publish_progress(channel, property_id, progress)
+    local values = redis.call('HMGET', progress, 'quantity', 'subscribers', 'supply')
+    local quantity, subscribers = tonumber(values[1]), tonumber(values[2])
+    local supply, remaining = cjson.null, cjson.null
+    if values[3] then
+        supply = tonumber(values[3])
+        remaining = math.max(supply - quantity, 0)
+    end
+    local now = redis.call('TIME')
+    redis.call('PUBLISH', channel, cjson.encode({
+        type = 'subscription', property_id = tonumber(property_id),
+        ts = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000),
+        quantity = quantity, subscribers = subscribers, supply = supply, remaining = remaining,
+    }))
+end
+"""
+
+# KEYS: progress, users
+# ARGV: property_id, user_id, quantity, channel, ttl
+# 반환: 1, 카운터가 없으면(만료/Redis 재시작) 0 → 호출 측이 DB에서 다시 적재
+RECORD_SUBSCRIPTION_LUA = _PUBLISH_PROGRESS + """
+local progress, users = unpack(KEYS)
+local property_id, user_id, quantity, channel, ttl = unpack(ARGV)
+if redis.call('EXISTS', progress) == 0 then
+    return 0
+end
+redis.call('HINCRBY', progress, 'quantity', quantity)
+if redis.call('SADD', users, user_id) == 1 then
+    redis.call('HINCRBY', progress, 'subscribers', 1)
+end
+redis.call('EXPIRE', progress, ttl)
+redis.call('EXPIRE', users, ttl)
+publish_progress(channel, property_id, progress)
+return 1
+"""
+
+# KEYS: progress, users
+# ARGV: property_id, quantity, supply('' = 정보 없음), channel, ttl, user_id...
+# 반환: 값이 바뀌었으면 1 (바뀐 경우에만 발행), 아니면 0
+RESET_PROGRESS_LUA = _PUBLISH_PROGRESS + """
+local progress, users = unpack(KEYS)
+local property_id, quantity, supply, channel, ttl = unpack(ARGV, 1, 5)
+local before = redis.call('HMGET', progress, 'quantity', 'subscribers', 'supply')
+redis.call('DEL', users)
+for i = 6, #ARGV, 1000 do
+    redis.call('SADD', users, unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+local subscribers = redis.call('SCARD', users)
+redis.call('HSET', progress, 'quantity', quantity, 'subscribers', subscribers)
+if supply == '' then
+    redis.call('HDEL', progress, 'supply')
+else
+    redis.call('HSET', progress, 'supply', supply)
+end
+redis.call('EXPIRE', progress, ttl)
+if subscribers > 0 then
+    redis.call('EXPIRE', users, ttl)
+end
+if before[1] == quantity and tonumber(before[2]) == subscribers and (before[3] or '') == supply then
+    return 0
+end
+publish_progress(channel, property_id, progress)
+return 1
+"""
+
+record_subscription_script = REDIS_CLIENT.register_script(RECORD_SUBSCRIPTION_LUA)
+reset_progress_script = REDIS_CLIENT.register_script(RESET_PROGRESS_LUA)
+
+
+def _progress_keys(property_id: int):
+    prefix = f"{PROGRESS_PREFIX}:{property_id}"
+    return [prefix, f"{prefix}:users"]
+
+
+def _progress(quantity: int, subscribers: int, supply: Optional[int]) -> dict:
+    remaining = None if supply is None else max(supply - quantity, 0)
+    return {"quantity": quantity, "subscribers": subscribers, "supply": supply, "remaining": remaining}
+
+
+def load_progress(property_id: int) -> Optional[dict]:
+    """MySQL 기준으로 매물 1개의 카운터를 다시 적재, 매물이 없으면 None."""
+    rows = fetch_all("""
+        SELECT DISTINCT pd.token_supply, pd.subscribed_quantity, s.user_id
+        FROM Property_Detail pd
+        LEFT JOIN Subscriptions s ON s.property_detail_id = pd.id
+        WHERE pd.id = %s
+    """, (property_id,))
+    if not rows:
+        return None
+    supply = rows[0].token_supply
+    user_ids = [row.user_id for row in rows if row.user_id is not None]
+    quantity = int(rows[0].subscribed_quantity)
+    reset_progress_script(
+        keys=_progress_keys(property_id),
+        args=[property_id, quantity, "" if supply is None else supply, order_book_channel(property_id),
+              PROGRESS_TTL, *user_ids],
+    )
+    return _progress(quantity, len(user_ids), supply)
+
+
+def record_subscription(property_id: int, user_id: int, quantity: int):
+    """커밋된 청약을 카운터에 반영하고 WebSocket으로 발행 (카운터가 없으면 DB에서 다시 적재)."""
+    recorded = record_subscription_script(
+        keys=_progress_keys(property_id),
+        args=[property_id, user_id, quantity, order_book_channel(property_id), PROGRESS_TTL],
+    )
+    if not recorded:
+        load_progress(property_id)
+
+
+async def get_progress(property_id: int) -> Optional[dict]:
+    """청약 진행 현황 조회 (Redis HMGET 1회, 카운터가 없을 때만 DB 조회)."""
+    quantity, subscribers, supply = await REDIS_ASYNC_CLIENT.hmget(
+        _progress_keys(property_id)[0], "quantity", "subscribers", "supply")
+    if quantity is None:
+        return await run_in_threadpool(load_progress, property_id)
+    return _progress(int(quantity), int(subscribers or 0), None if supply is None else int(supply))
+
+
+def reconcile_progress() -> int:
+    """청약 중인 매물 전체의 카운터를 MySQL 기준과 비교해 어긋난 매물만 다시 적재, 다시 적재한 매물 수 반환."""
+    rows = fetch_all("""
+        SELECT pd.id, pd.token_supply, pd.subscribed_quantity, COUNT(DISTINCT s.user_id) AS subscribers
+        FROM Property_Detail pd
+        LEFT JOIN Subscriptions s ON s.property_detail_id = pd.id
+        WHERE pd.subscription_status = 'pending'
+        GROUP BY pd.id, pd.token_supply, pd.subscribed_quantity
+    """)
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for row in rows:
+        pipe.hmget(_progress_keys(row.id)[0], "quantity", "subscribers", "supply")
+    drifted = 0
+    for row, (quantity, subscribers, supply) in zip(rows, pipe.execute()):
+        expected = (str(row.subscribed_quantity), str(row.subscribers),
+                    None if row.token_supply is None else str(row.token_supply))
+        if (quantity, subscribers, supply) != expected:
+            load_progress(row.id)
+            drifted += 1
+    return drifted
+
+
+async def run_progress_reconciler(interval: float = RECONCILE_INTERVAL):
+    """청약 카운터 주기적 보정 (리더 워커에서 실행)."""
+    while True:
+        try:
+            await run_in_threadpool(reconcile_progress)
+        except Exception as e:
+            logger.error(f"Error reconciling subscription progress: {e}")
+        await asyncio.sleep(interval)
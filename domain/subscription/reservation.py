@@ -0,0 +1,90 @@
+from fastapi import HTTPException
+from datetime import datetime
+from typing import NamedTuple, Tuple
+import math
+import os
+
+# 청약 접수: 잔액 차감, 공급량 예약과 청약 기록을 한 트랜잭션으로 처리
+# - 잔액은 SELECT 후 비교하지 않고 UPDATE ... WHERE 잔액 >= 필요량 으로 차감 → 동시 청약에도 초과 사용 불가
+#   (영향받은 행이 0이면 실패, 실패 원인 구분용 조회는 실패 경로에서만 실행)
+# - 청약 수량은 매물 행을 잠그고(FOR UPDATE) 상태/마감 시각/청약 한도를 확인한 뒤 증가
+#   → 같은 조회로 매물의 청약 마감 시각을 얻어 청약 기록에 사용
+# - 청약 한도는 공급량 × SUBSCRIPTION_DEMAND_LIMIT (초과 청약은 마감 시 배정(allocation.py)하고 나머지 환급)
+#   1이면 공급량을 넘는 청약을 받지 않음 (배정 없이 전량 배정)
+# - 매물 행은 청약이 몰리는 행이므로 사용자 잔액 차감 뒤에 잠가 잠금 시간을 줄이고,
+#   청약 INSERT(외래키 검사로 매물 행 공유 잠금)보다 먼저 배타 잠금을 잡아 공유 → 배타 잠금 교착을 피함
+
+class SubscriptionDeadline(NamedTuple):
+    end_date: datetime  # Property_Detail.subscription_end_date
+    close_at: float  # 같은 시각의 epoch 초 (DB UNIX_TIMESTAMP, 마감 대기열 score)
+
+
+DEMAND_LIMIT = max(float(os.getenv("SUBSCRIPTION_DEMAND_LIMIT", 5)), 1.0)
+
+RESERVE_BALANCE_QUERY = """
+    UPDATE Users
+    SET total_balance = total_balance - %s,
+        orderable_balance = orderable_balance - %s
+    WHERE id = %s AND total_balance >= %s AND orderable_balance >= %s
+"""
+
+# 청약 마감 시각은 요청 값이 아닌 매물의 마감 시각(Property_Detail.subscription_end_date, NOT NULL)만 사용
+# (마감 판단은 settlement.close_property와 같은 규칙: DB 시계 기준 마감 시각 이전까지 접수)
+LOCK_PROPERTY_QUERY = """
+    SELECT subscription_status, subscription_end_date, subscription_end_date > NOW() AS is_open,
+           UNIX_TIMESTAMP(subscription_end_date) AS close_at, token_supply, subscribed_quantity
+    FROM Property_Detail
+    WHERE id = %s
+    FOR UPDATE
+"""
+
+RESERVE_SUPPLY_QUERY = """
+    UPDATE Property_Detail
+    SET subscribed_quantity = subscribed_quantity + %s
+    WHERE id = %s
+"""
+
+INSERT_SUBSCRIPTION_QUERY = """
+    INSERT INTO Subscriptions (user_id, property_detail_id, price_per_token, quantity, status, subscription_end_date)
+    VALUES (%s, %s, %s, %s, 'pending', %s)
+"""
+
+
+async def reserve_balance(cursor, user_id: int, total_cost: int):
+    """보유 금액/주문 가능 금액 차감. 부족하면 HTTPException."""
+    if await cursor.execute(RESERVE_BALANCE_QUERY, (total_cost, total_cost, user_id, total_cost, total_cost)):
+        return
+    await cursor.execute("SELECT 1 FROM Users WHERE id = %s", (user_id,))
+    if not await cursor.fetchone():
+        raise HTTPException(status_code=404, detail="사용자 정보 없음")
+    raise HTTPException(status_code=400, detail="잔액 부족")
+
+
+async def reserve_supply(cursor, property_id: int, quantity: int) -> SubscriptionDeadline:
+    """청약 수량 예약 후 매물의 청약 마감 시각 반환. 청약 중이 아니거나 청약 한도를 넘으면 HTTPException."""
+    await cursor.execute(LOCK_PROPERTY_QUERY, (property_id,))
+    detail = await cursor.fetchone()
+    if not detail:
+        raise HTTPException(status_code=404, detail="매물 정보 없음")
+    if detail.subscription_status != 'pending' or not detail.is_open:
+        raise HTTPException(status_code=400, detail="청약 마감")
+    if detail.token_supply is not None:
+        limit = math.floor(detail.token_supply * DEMAND_LIMIT)
+        if detail.subscribed_quantity + quantity > limit:
+            remaining = max(limit - detail.subscribed_quantity, 0)
+            raise HTTPException(status_code=400, detail=f"청약 한도 초과 (남은 청약 가능 수량 {remaining})")
+    await cursor.execute(RESERVE_SUPPLY_QUERY, (quantity, property_id))
+    return SubscriptionDeadline(detail.subscription_end_date, float(detail.close_at))
+
+
+async def reserve_and_record_subscription(cursor, user_id: int, property_id: int, price_per_token: int,
+                                          quantity: int) -> Tuple[int, SubscriptionDeadline]:
+    """
+    잔액 차감 + 공급량 예약 + Subscriptions 기록, (청약 ID, 매물 청약 마감 시각) 반환 (커밋은 호출자가 수행).
+    실패하면 HTTPException (커밋 전이므로 연결 반납 시 rollback).
+    """
+    await reserve_balance(cursor, user_id, price_per_token * quantity)
+    deadline = await reserve_supply(cursor, property_id, quantity)
+    await cursor.execute(INSERT_SUBSCRIPTION_QUERY, (
+        user_id, property_id, price_per_token, quantity, deadline.end_date))
+    return cursor.lastrowid, deadline
@@ -0,0 +1,200 @@
+from core.leader import ensure_leader
+from domain.subscription.allocation import ALLOCATION_METHOD, allocate
+from typing import Optional
+import numpy as np
+import os
+
+# 청약 마감 정산: 매물별로 청약을 묶음 단위 집합 연산으로 처리
+# 1. 마감: 매물의 마감 시각(Property_Detail.subscription_end_date, DB 시계 기준)이 지났으면 매물 상태를 먼저
+#    'fulfilled'로 바꿔 커밋 → 이후 청약 접수는 거부되므로(reservation.py) 정산 대상이 더 늘지 않음
+# 2. 배정: 매물의 정산되지 않은 청약 전체를 한 번에 읽어 공급량(token_supply) 대비 배정 수량을 계산하고 한 트랜잭션으로 저장
+#    (중간에 실패해도 저장된 배정을 그대로 사용하므로 재실행 결과가 같음)
+# 3. 정산: 묶음마다 INSERT ... SELECT(사용자별 배정 합산) 1회 + 미배정 금액 환급 1회 + 청약 상태 UPDATE 1회 후 커밋
+#    → 행 잠금은 묶음 단위로 짧게 유지, 커밋된 묶음은 완료 상태이므로 다음 실행 때 남은 청약부터 이어서 처리
+# 청약별 마감 시각(Subscriptions.subscription_end_date)은 정산 대상 판단에 사용하지 않음
+# 리더 작업이므로 커밋 직전마다 리더 락을 다시 확인 (ensure_leader, 리더를 잃은 뒤 끝난 스레드는 커밋하지 않음)
+SETTLE_CHUNK_SIZE = int(os.getenv("SUBSCRIPTION_SETTLE_CHUNK_SIZE", 5000))
+
+# 매물의 아직 정산되지 않은 청약 조건
+DUE_CONDITION = """
+    s.property_detail_id = %s
+    AND s.status = 'pending'
+"""
+
+SELECT_UNALLOCATED_QUERY = f"""
+    SELECT s.id, s.quantity FROM Subscriptions s
+    WHERE {DUE_CONDITION} AND s.allocated_quantity IS NULL
+    ORDER BY s.id
+"""
+
+SELECT_CHUNK_QUERY = f"""
+    SELECT s.id FROM Subscriptions s
+    WHERE {DUE_CONDITION} AND s.id > %s
+    ORDER BY s.id
+    LIMIT %s
+    FOR UPDATE
+"""
+
+# 같은 사용자의 여러 청약은 배정 수량을 합산하고 평단가는 금액 가중 평균
+# (buy_price는 기존 quantity 기준으로 계산해야 하므로 가장 먼저 갱신)
+MOVE_TO_OWNERSHIPS_QUERY = f"""
+    INSERT INTO Ownerships (user_id, property_detail_id, quantity, tradeable_tokens, buy_price, created_at)
+    SELECT user_id, property_detail_id, quantity, quantity, buy_price, NOW()
+    FROM (
+        SELECT s.user_id, s.property_detail_id,
+               SUM(s.allocated_quantity) AS quantity,
+               SUM(s.allocated_quantity * s.price_per_token) DIV SUM(s.allocated_quantity) AS buy_price
+        FROM Subscriptions s
+        WHERE {DUE_CONDITION} AND s.id BETWEEN %s AND %s AND s.allocated_quantity > 0
+        GROUP BY s.user_id, s.property_detail_id
+    ) AS allocated
+    ON DUPLICATE KEY UPDATE
+        buy_price = (Ownerships.quantity * Ownerships.buy_price + VALUES(quantity) * VALUES(buy_price))
+                    / (Ownerships.quantity + VALUES(quantity)),
+        quantity = Ownerships.quantity + VALUES(quantity),
+        tradeable_tokens = Ownerships.tradeable_tokens + VALUES(tradeable_tokens)
+"""
+
+# 배정받지 못한 수량의 청약 금액 환급
+REFUND_QUERY = f"""
+    UPDATE Users u
+    JOIN (
+        SELECT s.user_id,
+               SUM((s.quantity - COALESCE(s.allocated_quantity, 0)) * s.price_per_token) AS refund
+        FROM Subscriptions s
+        WHERE {DUE_CONDITION} AND s.id BETWEEN %s AND %s
+        GROUP BY s.user_id
+    ) r ON r.user_id = u.id
+    SET u.total_balance = u.total_balance + r.refund,
+        u.orderable_balance = u.orderable_balance + r.refund
+    WHERE r.refund > 0
+"""
+
+FULFILL_SUBSCRIPTIONS_QUERY = f"""
+    UPDATE Subscriptions s
+    SET s.allocated_quantity = COALESCE(s.allocated_quantity, 0),
+        s.status = 'fulfilled'
+    WHERE {DUE_CONDITION} AND s.id BETWEEN %s AND %s
+"""
+
+
+def close_property(connection, property_id: int) -> Optional[bool]:
+    """
+    매물의 청약 마감 처리. 마감 시각이 지나 마감했거나 이미 마감된 매물이면 True,
+    아직 마감 시각 전이면 False, 매물이 없으면 None.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT subscription_status, subscription_end_date <= NOW() AS is_due
+            FROM Property_Detail
+            WHERE id = %s
+            FOR UPDATE
+        """, (property_id,))
+        detail = cursor.fetchone()
+        if detail is None:
+            connection.rollback()
+            return None
+        if detail.subscription_status == 'fulfilled':
+            connection.rollback()
+            return True
+        if not detail.is_due:
+            connection.rollback()
+            return False
+        cursor.execute("""
+            UPDATE Property_Detail
+            SET subscription_status = 'fulfilled'
+            WHERE id = %s
+        """, (property_id,))
+        ensure_leader()
+        connection.commit()
+    return True
+
+
+def allocate_property(connection, property_id: int) -> int:
+    """
+    배정 수량이 정해지지 않은 청약 전체에 남은 공급량을 배정하고 한 트랜잭션으로 저장, 배정한 청약 수 반환.
+    배정이 커밋된 뒤 정산 도중 실패하면 재실행 시 저장된 배정을 그대로 사용.
+    """
+    with connection.cursor() as cursor:
+        # 매물 행 잠금: 동시에 실행된 정산이 같은 공급량을 두 번 배정하지 않도록
+        cursor.execute("SELECT token_supply FROM Property_Detail WHERE id = %s FOR UPDATE", (property_id,))
+        detail = cursor.fetchone()
+        cursor.execute(SELECT_UNALLOCATED_QUERY, (property_id,))
+        rows = cursor.fetchall()
+        if not rows:
+            connection.rollback()
+            return 0
+        # 이미 배정된 수량은 공급량에서 제외
+        cursor.execute("""
+            SELECT COALESCE(SUM(allocated_quantity), 0) AS allocated
+            FROM Subscriptions
+            WHERE property_detail_id = %s AND allocated_quantity IS NOT NULL
+        """, (property_id,))
+        already_allocated = int(cursor.fetchone().allocated)
+
+    subscription_ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    quantities = np.fromiter((row.quantity for row in rows), dtype=np.int64, count=len(rows))
+    # 공급량 정보가 없는 예전 매물은 전량 배정
+    if detail is None or detail.token_supply is None:
+        supply = int(quantities.sum())
+    else:
+        supply = detail.token_supply - already_allocated
+    allocated = allocate(quantities, supply, subscription_ids, method=ALLOCATION_METHOD, seed=property_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS Subscription_Allocation (
+                subscription_id BIGINT NOT NULL PRIMARY KEY,
+                allocated_quantity INT NOT NULL
+            )
+        """)
+        cursor.execute("DELETE FROM Subscription_Allocation")
+        for start in range(0, len(rows), SETTLE_CHUNK_SIZE):
+            cursor.executemany(
+                "INSERT INTO Subscription_Allocation (subscription_id, allocated_quantity) VALUES (%s, %s)",
+                list(zip(subscription_ids[start:start + SETTLE_CHUNK_SIZE].tolist(),
+                         allocated[start:start + SETTLE_CHUNK_SIZE].tolist())),
+            )
+        cursor.execute("""
+            UPDATE Subscriptions s
+            JOIN Subscription_Allocation a ON a.subscription_id = s.id
+            SET s.allocated_quantity = a.allocated_quantity
+        """)
+        cursor.execute("DROP TEMPORARY TABLE Subscription_Allocation")
+        ensure_leader()
+        connection.commit()
+    return len(rows)
+
+
+def settle_property(connection, property_id: int, chunk_size: int = SETTLE_CHUNK_SIZE) -> Optional[int]:
+    """
+    마감 시각이 지난 매물 1개를 마감하고 정산되지 않은 청약 전체를 배정 후 묶음 단위로 소유권 이동/환급.
+    처리한 청약 수 반환 (매물이 없으면 0), 아직 마감 시각 전이면 None.
+    """
+    closed = close_property(connection, property_id)
+    if closed is None:
+        return 0
+    if not closed:
+        return None
+    allocate_property(connection, property_id)
+
+    settled = 0
+    last_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            # 묶음의 청약 행을 잠그고 ID 범위를 정함 (동시에 다른 정산이 같은 행을 처리하지 않도록)
+            cursor.execute(SELECT_CHUNK_QUERY, (property_id, last_id, chunk_size))
+            ids = [row.id for row in cursor.fetchall()]
+            if not ids:
+                connection.rollback()
+                break
+            first_id, last_id = ids[0], ids[-1]
+            cursor.execute(MOVE_TO_OWNERSHIPS_QUERY, (property_id, first_id, last_id))
+            cursor.execute(REFUND_QUERY, (property_id, first_id, last_id))
+            cursor.execute(FULFILL_SUBSCRIPTIONS_QUERY, (property_id, first_id, last_id))
+            ensure_leader()
+            connection.commit()
+            settled += len(ids)
+            if len(ids) < chunk_size:
+                break
+    return settled
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Request
-from core.settings import DB_CONFIG
+from core.async_mysql_connector import get_async_db_connection
 from core.jwt import extract_user_id
 import pymysql
 
@@ -20,25 +20,20 @@ async def get_user_orderable_balance(request: Request):
         raise HTTPException(status_code=401, detail=f"유효하지 않은 토큰: {e}")
 
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            # Users 테이블에서 유저의 보유금액(total_balance)와 주문가능금액(orderable_balance) 조회
+            await cursor.execute(
+                "SELECT total_balance, orderable_balance FROM Users WHERE id = %s",
+                (user_id,)
+            )
+            result = await cursor.fetchone()
 
-        # Users 테이블에서 유저의 보유금액(total_balance)와 주문가능금액(orderable_balance) 조회
-        cursor.execute(
-            "SELECT total_balance, orderable_balance FROM Users WHERE id = %s",
-            (user_id,)
-        )
-        result = cursor.fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="유저 정보를 찾을 수 없습니다.")
 
-        if not result:
-            raise HTTPException(status_code=404, detail="유저 정보를 찾을 수 없습니다.")
-
-        total_balance, orderable_balance = result
+            total_balance, orderable_balance = result
     except pymysql.MySQLError as e:
         raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
 
     return {
         "user_id": user_id,
@@ -60,29 +55,24 @@ async def get_user_tradeable_tokens(property_id: int, request: Request):
         raise HTTPException(status_code=401, detail=f"유효하지 않은 토큰: {e}")
 
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        # Ownerships 테이블에서 유저의 특정 방에 대한 거래가능토큰(tradeable_tokens) 조회
-        cursor.execute(
-            """
-            SELECT quantity, tradeable_tokens 
-            FROM Ownerships 
-            WHERE user_id = %s AND property_detail_id = %s
-            """,
-            (user_id, property_id)
-        )
-        result = cursor.fetchone()
+        async with get_async_db_connection() as conn, conn.cursor() as cursor:
+            # Ownerships 테이블에서 유저의 특정 방에 대한 거래가능토큰(tradeable_tokens) 조회
+            await cursor.execute(
+                """
+                SELECT quantity, tradeable_tokens 
+                FROM Ownerships 
+                WHERE user_id = %s AND property_detail_id = %s
+                """,
+                (user_id, property_id)
+            )
+            result = await cursor.fetchone()
 
-        if not result:
-            raise HTTPException(status_code=404, detail="거래가능토큰 정보를 찾을 수 없습니다.")
+            if not result:
+                raise HTTPException(status_code=404, detail="거래가능토큰 정보를 찾을 수 없습니다.")
 
-        quantity, tradeable_tokens = result
+            quantity, tradeable_tokens = result
     except pymysql.MySQLError as e:
         raise HTTPException(status_code=500, detail=f"DB 에러: {e}")
-    finally:
-        cursor.close()
-        conn.close()
 
     return {
         "user_id": user_id,
@@ -14,9 +14,13 @@ from domain.ownerships.ownerships import router as ownerships_router
 from domain.order.main import router as order_router
 from domain.order.order_cancel import router as order_cancel_router
 from domain.order.order_socket import router as order_socket_router
-from domain.order.order_matching_scheduler import periodic_matching
+from domain.order.order_matching_scheduler import periodic_matching, wait_matching_idle
+from domain.order.continuous_matching import continuous_matching
+from domain.order.order_book_rebuild import repair_order_books
+from domain.order.outbox import relay_order_book_outbox
 from domain.buildings.main import router as buildings_router
-from domain.subscription.main import move_subscriptions_to_ownerships
+from domain.subscription.deadlines import run_subscription_deadlines
+from domain.subscription.progress import run_progress_reconciler
 from domain.side_detail.chatgpt import router as gpt_router
 from domain.side_detail.newssection import router as news_router
 from domain.side_detail.discussion import router as discussion_router
@@ -26,6 +30,10 @@ from domain.properties.property_history import router as property_history_router
 from domain.archives.archives import router as archives_router
 from domain.subscription.main import router as subscription_router 
 from core.redis import redis_listener 
+from core.leader import run_as_leader
+from core.mysql_connector import db_pool
+from core.async_mysql_connector import get_async_pool, close_async_pool, async_pool_metrics
+from fastapi.concurrency import run_in_threadpool
 import asyncio
 from starlette.middleware.base import BaseHTTPMiddleware
 import httpx
@@ -91,23 +99,66 @@ app.include_router(archives_router, prefix="/api/order_archives", tags=["archive
 app.include_router(property_router, prefix="/api/property/details", tags=["property_router"])
 app.include_router(ownerships_router, prefix="/api/ownerships", tags=["ownerships_router"])
 
+# 매칭 작업: Redis 호가창을 MySQL 미체결 주문과 맞춘 뒤 단일가 매매 스케줄러와 접속 매매 실행
+async def matching_job():
+    # Redis 유실/재시작, 예전 JSON 호가창 등 불일치한 호가창을 Order_Archive 기준으로 재구성
+    try:
+        await run_in_threadpool(repair_order_books)
+    except Exception as e:
+        print(f"Order book repair error: {e}")
+    await asyncio.gather(periodic_matching(interval=100), continuous_matching())
+
+
+# 아웃박스 릴레이: 커밋됐지만 호가창에 반영되지 못한 주문/취소 재처리
+async def outbox_job():
+    await relay_order_book_outbox(interval=1)
+
+
+# 청약 처리 작업
+async def subscription_job():
+    await asyncio.gather(run_subscription_deadlines(), run_progress_reconciler())
+
+
+background_tasks = []
+
 # 애플리케이션 시작 시 Redis Listener와 스케줄러 실행
+# - Redis Listener: 모든 워커에서 실행 (각 워커는 자신에게 연결된 WebSocket에만 전송)
+# - 매칭/아웃박스 릴레이/청약 처리: Redis 리더 락을 얻은 워커 1개에서만 실행
 @app.on_event("startup")
 async def startup_event():
     await asyncio.sleep(8)
     loop = asyncio.get_event_loop()
+    # DB 커넥션 풀 미리 채우기 (실패해도 요청 시 다시 연결)
+    try:
+        await run_in_threadpool(db_pool.warm)
+        await get_async_pool()
+    except Exception as e:
+        print(f"DB pool warm-up error: {e}")
     # Redis Listener 실행
-    loop.create_task(redis_listener())
-    # 스케줄러 실행
-    loop.create_task(periodic_matching(interval=100))
-    # 청약 처리 작업 실행
-    loop.create_task(move_subscriptions_to_ownerships(interval=60))
+    background_tasks.append(loop.create_task(redis_listener()))
+    # 스케줄러 / 청약 처리 작업 실행 (리더 워커에서만, 리더 상실/종료 시 매칭 스레드 작업이 끝난 뒤 넘겨줌)
+    background_tasks.append(loop.create_task(run_as_leader([matching_job, outbox_job, subscription_job],
+                                                           on_stop=[wait_matching_idle])))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_async_pool()
 
 
 @app.get("/")
 async def root():
     return {"message": "Hello, FastAPI!"}
 
+
+# DB 커넥션 풀 사용 현황
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    return {"sync": db_pool.metrics(), "async": async_pool_metrics()}
+
 # swagger http://127.0.0.1:8000/docs
 
 
@@ -2,7 +2,6 @@ import requests
 import os
 from datetime import datetime, timedelta
 from core.mysql_connector import get_db_connection
-from pymysql.cursors import DictCursor
 import xml.etree.ElementTree as ET
 from dotenv import load_dotenv
 
@@ -115,7 +114,7 @@ def update_property_transactions():
     """
     try:
         with get_db_connection() as connection:
-            with connection.cursor(DictCursor) as cursor:
+            with connection.cursor() as cursor:
                 # Properties 테이블에서 모든 property_id 가져오기
                 cursor.execute("SELECT id, building_code FROM Properties")
                 properties = cursor.fetchall()
@@ -0,0 +1,65 @@
+"""
+초과 청약 배정(allocate) 규칙 검사: 배정 합계, 나머지 토큰 배정 순서, lottery 재현성.
+"""
+import numpy as np
+import pytest
+
+from domain.subscription.allocation import LOTTERY, PRO_RATA, allocate
+
+
+@pytest.mark.parametrize("quantities, supply, subscription_ids, expected", [
+    # 청약 합계 <= 공급량 → 전량 배정
+    ([3, 4], 10, None, [3, 4]),
+    ([3, 4], 7, None, [3, 4]),
+    # 나누어떨어지면 비례 배정만
+    ([10, 20, 30], 30, None, [5, 10, 15]),
+    # 나머지 1개는 소수점 이하가 가장 큰 청약 (2.1, 2.1, 2.8 → 세 번째)
+    ([3, 3, 4], 7, None, [2, 2, 3]),
+    # 소수점 이하가 같으면 ID가 작은(먼저 접수된) 청약, 입력 순서와 무관
+    ([5, 5, 5], 10, [30, 10, 20], [3, 4, 3]),
+    ([1, 2, 7], 5, None, [1, 1, 3]),
+    ([1, 2, 7], 5, [3, 2, 1], [0, 1, 4]),
+    # 공급량 0 이하 → 배정 없음
+    ([5, 5], 0, None, [0, 0]),
+    ([5, 5], -3, None, [0, 0]),
+])
+def test_pro_rata_table(quantities, supply, subscription_ids, expected):
+    allocated = allocate(quantities, supply, subscription_ids, method=PRO_RATA)
+    assert allocated.tolist() == expected
+    assert allocated.dtype == np.int64
+
+
+@pytest.mark.parametrize("method", [PRO_RATA, LOTTERY])
+def test_total_equals_supply_and_never_exceeds_request(method):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        quantities = rng.integers(1, 50, size=rng.integers(1, 40))
+        supply = int(rng.integers(0, quantities.sum() * 2))
+        allocated = allocate(quantities, supply, method=method, seed=7)
+        assert allocated.sum() == min(supply, quantities.sum())
+        assert ((allocated >= 0) & (allocated <= quantities)).all()
+
+
+def test_lottery_is_deterministic_per_property():
+    quantities = [4, 9, 2, 7, 5, 3, 8]
+    first = allocate(quantities, 15, method=LOTTERY, seed=42)
+    assert allocate(quantities, 15, method=LOTTERY, seed=42).tolist() == first.tolist()
+
+    # seed(property_id)로 섞은 순서대로 전량 배정, 공급량이 모자란 청약은 남은 수량만
+    order = np.random.default_rng(42).permutation(len(quantities))
+    remaining, expected = 15, [0] * len(quantities)
+    for index in order:
+        expected[index] = min(quantities[index], remaining)
+        remaining -= expected[index]
+    assert first.tolist() == expected
+
+
+def test_lottery_differs_between_properties():
+    quantities = [1] * 20
+    results = {tuple(allocate(quantities, 5, method=LOTTERY, seed=seed).tolist()) for seed in range(10)}
+    assert len(results) > 1
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        allocate([5, 5], 5, method="first_come")
@@ -0,0 +1,42 @@
+"""
+단일가(find_clearing_price) 계산 규칙 검사: 최대 체결 수량, 동점 규칙, 체결 불가/빈 호가창.
+"""
+import pytest
+
+from domain.order.clearing_price import find_clearing_price
+
+
+@pytest.mark.parametrize("buy_levels, sell_levels, reference_price, expected", [
+    # 빈 호가창 / 한쪽만 있는 호가창
+    ([], [], None, (None, 0)),
+    ([], [(100, 5)], None, (None, 0)),
+    ([(100, 5)], [], None, (None, 0)),
+    # 곡선이 교차하지 않음 (매수 최고가 < 매도 최저가)
+    ([(99, 5), (98, 3)], [(100, 5), (101, 2)], None, (None, 0)),
+    # 가격은 맞지만 수량이 없음
+    ([(100, 0)], [(100, 0)], None, (None, 0)),
+    # 단순 교차: 체결 수량은 min(누적 매수, 누적 매도)
+    ([(100, 5)], [(100, 3)], None, (100, 3)),
+    # 최대 체결 수량 가격 (입력 순서와 무관)
+    ([(100, 4), (102, 3), (101, 2)], [(101, 4), (99, 1), (100, 2)], None, (101, 5)),
+    # 동점 규칙 1. 불균형 최소 (100: 6/5, 101: 5/8 → 100)
+    ([(101, 5), (100, 1)], [(100, 5), (101, 3)], None, (100, 5)),
+    # 동점 규칙 2. 모든 후보에서 매수 잔량 → 가장 높은 가격
+    ([(102, 10)], [(100, 3)], None, (102, 3)),
+    # 동점 규칙 2. 모든 후보에서 매도 잔량 → 가장 낮은 가격
+    ([(102, 5), (100, 5)], [(100, 4), (101, 4)], None, (101, 5)),
+    # 동점 규칙 3. 불균형 0으로 같으면 기준가에 가까운 가격
+    ([(101, 5)], [(100, 5)], 101, (101, 5)),
+    ([(101, 5)], [(100, 5)], 250, (101, 5)),
+    ([(101, 5)], [(100, 5)], 100, (100, 5)),
+    # 동점 규칙 4. 기준가가 없거나 기준가와 거리도 같으면 가장 낮은 가격
+    ([(101, 5)], [(100, 5)], None, (100, 5)),
+    ([(102, 5)], [(100, 5)], 101, (100, 5)),
+])
+def test_clearing_price_table(buy_levels, sell_levels, reference_price, expected):
+    assert find_clearing_price(buy_levels, sell_levels, reference_price=reference_price) == expected
+
+
+def test_result_is_plain_int():
+    price, volume = find_clearing_price([(100, 5)], [(100, 3)])
+    assert type(price) is int and type(volume) is int
@@ -0,0 +1,116 @@
+"""
+호가창 변경분이 상위 ORDER_BOOK_DEPTH개 레벨 창을 유지하는지 검사.
+스냅샷 + 변경분을 적용한 클라이언트 화면이 새 스냅샷과 같아야 함 (fakeredis + lupa 필요).
+"""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("lupa")
+fakeredis = pytest.importorskip("fakeredis")
+
+for name, value in (("REDIS_HOST", "localhost"), ("REDIS_PORT", "6379"), ("REDIS_DB", "0")):
+    os.environ.setdefault(name, value)
+
+from domain.order import order_book, order_book_scripts  # noqa: E402
+
+DEPTH = 3
+PROPERTY_ID = 1
+
+
+@pytest.fixture
+def book(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(order_book, "REDIS_CLIENT", client)
+    monkeypatch.setattr(order_book, "ORDER_BOOK_DEPTH", DEPTH)
+    for name, lua in (("add_order_script", order_book_scripts.ADD_ORDER_LUA),
+                      ("remove_order_script", order_book_scripts.REMOVE_ORDER_LUA),
+                      ("apply_fills_script", order_book_scripts.APPLY_FILLS_LUA)):
+        monkeypatch.setattr(order_book, name, client.register_script(lua))
+
+    # 매수 100~105 (6개 레벨), 매도 110~115 (6개 레벨) → DEPTH보다 깊은 호가창
+    order_id = 0
+    for offset in range(6):
+        order_id += 1
+        order_book.add_order(PROPERTY_ID, order_id, order_book.BUY, 100 + offset, 10)
+        order_id += 1
+        order_book.add_order(PROPERTY_ID, order_id, order_book.SELL, 110 + offset, 10)
+
+    pubsub = client.pubsub()
+    pubsub.subscribe(order_book.order_book_channel(PROPERTY_ID))
+    pubsub.get_message()
+    yield pubsub
+    pubsub.close()
+
+
+def _view(snapshot):
+    return {side: {level["price"]: level for level in snapshot[side]} for side in order_book.SIDES}
+
+
+def _apply(view, pubsub):
+    """수신한 변경분을 그대로 적용 (order_socket.py 프로토콜, 클라이언트가 따로 자르지 않음)."""
+    deltas = []
+    while (message := pubsub.get_message()) is not None:
+        if message["type"] == "message":
+            deltas.append(json.loads(message["data"]))
+    for delta in deltas:
+        for change in delta["changes"]:
+            levels = view[change["side"]]
+            if change["quantity"] == 0:
+                levels.pop(change["price"], None)
+            else:
+                levels[change["price"]] = {key: change[key] for key in ("price", "quantity", "orders")}
+    return deltas
+
+
+def test_removing_top_level_sends_level_entering_window(book):
+    view = _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+    assert sorted(view[order_book.BUY]) == [103, 104, 105]
+
+    # 최우선 매수 레벨(105)의 유일한 주문 취소 → 102가 창으로 올라옴
+    assert order_book.remove_order(PROPERTY_ID, 11) == (order_book.BUY, 105, 10)
+    deltas = _apply(view, book)
+
+    assert [(change["price"], change["quantity"]) for change in deltas[0]["changes"]] == [(105, 0), (102, 10)]
+    assert view == _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+
+
+def test_fills_emptying_several_top_levels_refill_window(book):
+    view = _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+
+    # 매도 110, 111 전량 체결, 112 부분 체결 → 113, 114가 창으로 올라옴
+    order_book.apply_fills(PROPERTY_ID, [(order_book.SELL, 110, 2), (order_book.SELL, 111, 4)],
+                           [(order_book.SELL, 112, 6, 4)])
+    deltas = _apply(view, book)
+
+    assert len(deltas) == 1
+    assert sorted(view[order_book.SELL]) == [112, 113, 114]
+    assert view == _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+
+
+def test_changes_outside_window_publish_empty_delta(book):
+    view = _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+
+    order_book.remove_order(PROPERTY_ID, 1)  # 매수 100 (창 밖)
+    order_book.add_order(PROPERTY_ID, 100, order_book.SELL, 120, 5)  # 매도 120 (창 밖)
+    deltas = _apply(view, book)
+
+    # seq 연속성을 위해 변경분은 발행하되 창 밖 레벨은 보내지 않음
+    assert [delta["changes"] for delta in deltas] == [[], []]
+    assert [delta["seq"] for delta in deltas] == [deltas[0]["seq"], deltas[0]["seq"] + 1]
+    assert view == _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+
+
+def test_adding_top_level_sends_level_leaving_window(book):
+    view = _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
+
+    # 매수 106 추가 → 103이 창 밖으로 밀려남, 같은 레벨(105) 추가는 창이 그대로
+    order_book.add_order(PROPERTY_ID, 100, order_book.BUY, 106, 3)
+    order_book.add_order(PROPERTY_ID, 102, order_book.BUY, 105, 2)
+    deltas = _apply(view, book)
+
+    assert [(change["price"], change["quantity"]) for change in deltas[0]["changes"]] == [(103, 0), (106, 3)]
+    assert [(change["price"], change["quantity"]) for change in deltas[1]["changes"]] == [(105, 12)]
+    assert sorted(view[order_book.BUY]) == [104, 105, 106]
+    assert view == _view(order_book.get_order_book_snapshot(PROPERTY_ID, DEPTH))
@@ -0,0 +1,105 @@
+"""
+주문 접수 예약(reserve_buy/reserve_sell) 검사: 조건부 UPDATE가 실패하면 잔고/토큰/주문 기록이 바뀌지 않아야 함.
+MySQL 대신 예약 쿼리의 WHERE 조건을 그대로 흉내 내는 메모리 커서를 사용.
+"""
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+for name, value in (("REDIS_HOST", "localhost"), ("REDIS_PORT", "6379"), ("REDIS_DB", "0")):
+    os.environ.setdefault(name, value)
+
+from domain.order import reservation  # noqa: E402
+from domain.order.order_book import BUY, SELL  # noqa: E402
+
+USER_ID = 1
+PROPERTY_ID = 7
+
+
+class FakeCursor:
+    """reservation.py 쿼리만 처리하는 메모리 커서 (users: 주문가능금액, tokens: (user, 매물) → 거래가능토큰)."""
+
+    def __init__(self, balance=None, tokens=None):
+        self.balances = {} if balance is None else {USER_ID: balance}
+        self.tokens = {} if tokens is None else {(USER_ID, PROPERTY_ID): tokens}
+        self.orders = []
+        self.lastrowid = None
+        self._row = None
+
+    async def execute(self, query, params=()):
+        if query is reservation.RESERVE_BALANCE_QUERY:
+            cost, user_id, required = params
+            if self.balances.get(user_id, -1) >= required:
+                self.balances[user_id] -= cost
+                return 1
+            return 0
+        if query is reservation.RESERVE_TOKENS_QUERY:
+            quantity, user_id, property_id, required = params
+            if self.tokens.get((user_id, property_id), -1) >= required:
+                self.tokens[(user_id, property_id)] -= quantity
+                return 1
+            return 0
+        if query is reservation.INSERT_ORDER_QUERY:
+            self.orders.append(params)
+            self.lastrowid = len(self.orders)
+            return 1
+        if "FROM Users" in query:
+            self._row = (1,) if params[0] in self.balances else None
+            return int(self._row is not None)
+        if "FROM Ownerships" in query:
+            self._row = (1,) if tuple(params) in self.tokens else None
+            return int(self._row is not None)
+        raise AssertionError(f"unexpected query: {query}")
+
+    async def fetchone(self):
+        return self._row
+
+
+def _reserve(cursor, side, price, quantity):
+    return asyncio.run(reservation.reserve_and_record_order(cursor, USER_ID, PROPERTY_ID, side, price, quantity))
+
+
+@pytest.mark.parametrize("balance, price, quantity, remaining", [
+    (1000, 50, 10, 500),
+    (500, 50, 10, 0),  # 잔액과 정확히 같은 금액
+])
+def test_buy_reserves_balance_and_records_order(balance, price, quantity, remaining):
+    cursor = FakeCursor(balance=balance)
+    assert _reserve(cursor, BUY, price, quantity) == 1
+    assert cursor.balances == {USER_ID: remaining}
+    assert cursor.orders == [(PROPERTY_ID, USER_ID, BUY, price, quantity, "normal")]
+
+
+@pytest.mark.parametrize("tokens, quantity, remaining", [(10, 4, 6), (4, 4, 0)])
+def test_sell_reserves_tokens_and_records_order(tokens, quantity, remaining):
+    cursor = FakeCursor(tokens=tokens)
+    assert _reserve(cursor, SELL, 100, quantity) == 1
+    assert cursor.tokens == {(USER_ID, PROPERTY_ID): remaining}
+    assert cursor.orders == [(PROPERTY_ID, USER_ID, SELL, 100, quantity, "normal")]
+
+
+@pytest.mark.parametrize("cursor, side, status_code", [
+    (FakeCursor(balance=499), BUY, 400),  # 잔액 부족 (필요 500)
+    (FakeCursor(), BUY, 404),  # 사용자 없음
+    (FakeCursor(tokens=9), SELL, 400),  # 토큰 부족 (필요 10)
+    (FakeCursor(), SELL, 404),  # 소유 내역 없음
+])
+def test_failed_reservation_has_no_side_effects(cursor, side, status_code):
+    balances, tokens = dict(cursor.balances), dict(cursor.tokens)
+    with pytest.raises(HTTPException) as error:
+        _reserve(cursor, side, 50, 10)
+    assert error.value.status_code == status_code
+    assert cursor.balances == balances
+    assert cursor.tokens == tokens
+    assert cursor.orders == []
+
+
+def test_unknown_side_is_rejected_before_any_write():
+    cursor = FakeCursor(balance=1000, tokens=10)
+    with pytest.raises(ValueError):
+        _reserve(cursor, "hold", 50, 10)
+    assert cursor.balances == {USER_ID: 1000}
+    assert cursor.tokens == {(USER_ID, PROPERTY_ID): 10}
+    assert cursor.orders == []
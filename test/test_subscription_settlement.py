@@ -0,0 +1,192 @@
+"""
+청약 정산(settle_property/allocate_property) 재실행 검사.
+묶음 도중 실패 후 다시 실행해도 소유권 이동/환급이 한 번만 반영되어야 함.
+MySQL 대신 settlement.py 쿼리의 의미를 그대로 흉내 내는 트랜잭션 메모리 연결을 사용.
+"""
+import copy
+import os
+
+import pytest
+
+for name, value in (("REDIS_HOST", "localhost"), ("REDIS_PORT", "6379"), ("REDIS_DB", "0")):
+    os.environ.setdefault(name, value)
+
+from domain.subscription import settlement  # noqa: E402
+
+PROPERTY_ID = 3
+PRICE = 100
+TOKEN_SUPPLY = 6
+# (청약 ID, 사용자, 청약 수량): 청약 합계 15 > 공급량 6, 같은 사용자가 여러 묶음에 걸쳐 있음
+SUBSCRIPTIONS = [(1, 10, 4), (2, 20, 2), (3, 10, 3), (4, 30, 5), (5, 20, 1)]
+
+
+class Row:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class FakeConnection:
+    """커밋된 상태(committed)와 진행 중 트랜잭션(working)을 나눠 commit/rollback을 흉내 냄."""
+
+    def __init__(self, is_due=True):
+        self.committed = {
+            "property": {"status": "pending", "is_due": is_due, "token_supply": TOKEN_SUPPLY},
+            "subscriptions": {sid: {"user_id": user_id, "quantity": quantity, "price": PRICE,
+                                    "status": "pending", "allocated": None}
+                              for sid, user_id, quantity in SUBSCRIPTIONS},
+            "balances": {user_id: 0 for _, user_id, _ in SUBSCRIPTIONS},  # 청약 시 전액 차감된 상태
+            "ownerships": {},
+        }
+        self.working = None
+        self.fail_on = {}  # 쿼리 이름 → 몇 번째 실행에서 실패할지
+        self.executed = {}
+
+    @property
+    def state(self):
+        if self.working is None:
+            self.working = copy.deepcopy(self.committed)
+        return self.working
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        if self.working is not None:
+            self.committed = self.working
+        self.working = None
+
+    def rollback(self):
+        self.working = None
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.temp = {}
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _count(self, name):
+        executed = self.connection.executed[name] = self.connection.executed.get(name, 0) + 1
+        if self.connection.fail_on.get(name) == executed:
+            raise RuntimeError(f"injected failure: {name}")
+
+    def _pending(self, first_id=None, last_id=None):
+        subscriptions = self.connection.state["subscriptions"]
+        return [(sid, row) for sid, row in sorted(subscriptions.items())
+                if row["status"] == "pending"
+                and (first_id is None or first_id <= sid <= last_id)]
+
+    def execute(self, query, params=()):
+        state = self.connection.state
+        if query is settlement.SELECT_UNALLOCATED_QUERY:
+            self._rows = [Row(id=sid, quantity=row["quantity"]) for sid, row in self._pending()
+                          if row["allocated"] is None]
+        elif query is settlement.SELECT_CHUNK_QUERY:
+            _, last_id, limit = params
+            self._rows = [Row(id=sid) for sid, _ in self._pending() if sid > last_id][:limit]
+        elif query is settlement.MOVE_TO_OWNERSHIPS_QUERY:
+            self._count("move")
+            allocated = {}
+            for _, row in self._pending(*params[1:]):
+                if row["allocated"]:
+                    quantity, cost = allocated.get(row["user_id"], (0, 0))
+                    allocated[row["user_id"]] = (quantity + row["allocated"], cost + row["allocated"] * row["price"])
+            for user_id, (quantity, cost) in allocated.items():
+                held, _, _ = state["ownerships"].get(user_id, (0, 0, 0))
+                state["ownerships"][user_id] = (held + quantity, held + quantity, cost // quantity)
+        elif query is settlement.REFUND_QUERY:
+            self._count("refund")
+            for _, row in self._pending(*params[1:]):
+                refund = (row["quantity"] - (row["allocated"] or 0)) * row["price"]
+                state["balances"][row["user_id"]] += refund
+        elif query is settlement.FULFILL_SUBSCRIPTIONS_QUERY:
+            for _, row in self._pending(*params[1:]):
+                row["allocated"] = row["allocated"] or 0
+                row["status"] = "fulfilled"
+        elif "is_due" in query:
+            detail = state["property"]
+            self._rows = [Row(subscription_status=detail["status"], is_due=detail["is_due"])]
+        elif query.strip().startswith("UPDATE Property_Detail"):
+            state["property"]["status"] = "fulfilled"
+        elif "SELECT token_supply" in query:
+            self._rows = [Row(token_supply=state["property"]["token_supply"])]
+        elif "SUM(allocated_quantity)" in query:
+            self._rows = [Row(allocated=sum(row["allocated"] for row in state["subscriptions"].values()
+                                            if row["allocated"] is not None))]
+        elif "UPDATE Subscriptions s" in query and "Subscription_Allocation" in query:
+            self._count("allocate")
+            for sid, allocated in self.temp.items():
+                state["subscriptions"][sid]["allocated"] = allocated
+        elif "Subscription_Allocation" in query:
+            self.temp.clear()
+        else:
+            raise AssertionError(f"unexpected query: {query}")
+
+    def executemany(self, query, rows):
+        assert "INSERT INTO Subscription_Allocation" in query
+        self.temp.update(rows)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture(autouse=True)
+def leader(monkeypatch):
+    monkeypatch.setattr(settlement, "ensure_leader", lambda: None)
+
+
+def _settled_once():
+    connection = FakeConnection()
+    assert settlement.settle_property(connection, PROPERTY_ID, chunk_size=2) == len(SUBSCRIPTIONS)
+    return connection.committed
+
+
+def test_settlement_moves_supply_and_refunds_the_rest():
+    state = _settled_once()
+    allocated = {sid: row["allocated"] for sid, row in state["subscriptions"].items()}
+    assert sum(allocated.values()) == TOKEN_SUPPLY
+    assert sum(quantity for quantity, _, _ in state["ownerships"].values()) == TOKEN_SUPPLY
+    paid = sum(quantity for _, _, quantity in SUBSCRIPTIONS) * PRICE
+    assert sum(state["balances"].values()) == paid - TOKEN_SUPPLY * PRICE
+    assert state["property"]["status"] == "fulfilled"
+    assert all(row["status"] == "fulfilled" for row in state["subscriptions"].values())
+
+
+@pytest.mark.parametrize("failure", [
+    {"move": 2},  # 두 번째 묶음 소유권 이동 중 실패
+    {"refund": 2},  # 두 번째 묶음 환급 중 실패 (소유권 이동은 같은 트랜잭션이므로 롤백)
+    {"refund": 3},  # 마지막 묶음에서 실패
+    {"allocate": 1},  # 배정 저장 중 실패 (마감만 커밋된 상태)
+])
+def test_rerun_after_partial_failure_applies_each_chunk_once(failure):
+    connection = FakeConnection()
+    connection.fail_on = failure
+    with pytest.raises(RuntimeError):
+        settlement.settle_property(connection, PROPERTY_ID, chunk_size=2)
+    connection.rollback()  # 연결 반납 시 진행 중 트랜잭션 롤백
+
+    settlement.settle_property(connection, PROPERTY_ID, chunk_size=2)
+    expected = _settled_once()
+    assert connection.committed["ownerships"] == expected["ownerships"]
+    assert connection.committed["balances"] == expected["balances"]
+    assert connection.committed["subscriptions"] == expected["subscriptions"]
+
+    # 모두 정산된 뒤 다시 실행해도 바뀌지 않음
+    assert settlement.settle_property(connection, PROPERTY_ID, chunk_size=2) == 0
+    assert connection.committed == expected
+
+
+def test_not_due_property_is_left_untouched():
+    connection = FakeConnection(is_due=False)
+    before = copy.deepcopy(connection.committed)
+    assert settlement.settle_property(connection, PROPERTY_ID, chunk_size=2) is None
+    assert connection.committed == before